@@ -0,0 +1,267 @@
+'''
+Frame time benchmarks over synthetic stress levels. Runs headless
+with SDL's dummy drivers and writes the results as JSON.
+
+    python benchmark.py                       Run every scenario
+    python benchmark.py --save-baseline       Run and store the results as the baseline
+    python benchmark.py --scenario enemies    Run one scenario
+
+Results are compared against the baseline if there is one. The exit
+code is 1 if any scenario got slower than the allowed threshold. The
+baseline in benchmark_baseline.json was recorded on an x86_64 Linux
+machine; save a new one before comparing on other hardware.
+'''
+
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+
+# Has to be set before pygame is initialized
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+# pylint: disable=wrong-import-position
+import numpy
+import pygame
+from jackit.config import JackitConfig
+from jackit.core.level import Level, LevelMap
+from deploy import SiteDeployment
+
+# Name -> SyntheticLevel arguments for each scenario
+SCENARIOS = {
+    "small": {"columns": 60, "rows": 30, "tiles": 300, "enemies": 10, "coin_density": 0.02},
+    "tiles": {"columns": 240, "rows": 80, "tiles": 6000, "enemies": 10, "coin_density": 0.02},
+    "enemies": {"columns": 120, "rows": 40, "tiles": 1000, "enemies": 150, "coin_density": 0.02},
+    "coins": {"columns": 120, "rows": 40, "tiles": 1000, "enemies": 10, "coin_density": 0.25},
+}
+
+# Frame phases that are compared against the baseline
+COMPARED_PHASES = ("level_update", "draw_level", "total")
+
+class SyntheticLevel(Level):
+    '''
+    Randomly generated level. The same arguments always generate the same map
+    '''
+    def __init__(self, game_engine, player, columns=60, rows=30, tiles=300,
+                 enemies=10, coin_density=0.02, seed=0):
+        level_map = self.generate(columns, rows, tiles, enemies, coin_density, seed)
+        super(SyntheticLevel, self).__init__(game_engine, level_map, player)
+
+    @staticmethod
+    def generate(columns, rows, tiles, enemies, coin_density, seed):
+        '''
+        Generate a map walled in on all sides with tiles scattered as
+        floating platforms, enemies standing on them and coins in the gaps
+        '''
+        rand = random.Random(seed)
+        grid = [[" "] * columns for _ in range(rows)]
+
+        for col in range(columns):
+            grid[0][col] = LevelMap.WALL
+            grid[rows - 1][col] = LevelMap.FLOOR
+        for row in range(rows):
+            grid[row][0] = grid[row][columns - 1] = LevelMap.WALL
+
+        # Platforms. Give up if the map is too full to place them all
+        placed = 0
+        for _ in range(tiles * 10):
+            if placed >= tiles:
+                break
+            length = rand.randint(3, 10)
+            row = rand.randint(3, rows - 3)
+            col = rand.randint(1, max(1, columns - length - 1))
+            for i in range(col, min(col + length, columns - 1)):
+                if grid[row][i] == " " and placed < tiles:
+                    grid[row][i] = LevelMap.FLOOR
+                    placed += 1
+
+        grid[rows - 2][2] = LevelMap.SPAWN
+
+        def is_free(row, col):
+            return grid[row][col] == " " and abs(col - 2) > 2
+
+        # Enemies stand on top of something
+        ledges = [
+            (row, col) for row in range(1, rows - 1) for col in range(1, columns - 1)
+            if is_free(row, col) and grid[row + 1][col] != " "
+        ]
+        rand.shuffle(ledges)
+        kinds = (LevelMap.BASIC_ENEMY, LevelMap.LEDGE_SENSE_ENEMY,
+                 LevelMap.RANDOM_ENEMY, LevelMap.LEDGE_SENSE_RND_ENEMY)
+        for row, col in ledges[:enemies]:
+            grid[row][col] = rand.choice(kinds)
+
+        coins = (LevelMap.ONE_POINT_COIN, LevelMap.FIVE_POINT_COIN, LevelMap.TEN_POINT_COIN)
+        for row in range(1, rows - 1):
+            for col in range(1, columns - 1):
+                if is_free(row, col) and rand.random() < coin_density:
+                    grid[row][col] = rand.choice(coins)
+
+        return ["".join(line) for line in grid]
+
+def setup_engine(vectorized_enemies=False):
+    '''
+    Create the game engine with a default config. The user's config isn't used
+    so results are comparable between machines and runs
+    '''
+    config = JackitConfig(SiteDeployment.config_path)
+    config.sound_enabled = False
+    config.vectorized_enemies = vectorized_enemies
+    # Nothing is sent to the leaderboard or written to the submission journal
+    config.leaderboard.enabled = False
+    SiteDeployment.config = config
+
+    from jackit.core.engine import GameEngine
+
+    # Skip the name and welcome screens and don't wait on the clock
+    GameEngine.name_enter.running = False
+    GameEngine.welcome.stop()
+    GameEngine.fixed_timestep = True
+    return GameEngine
+
+def post_key(event_type, key):
+    '''
+    Post a key event as if the player pressed it
+    '''
+    pygame.event.post(pygame.event.Event(event_type, {"key": key, "mod": 0}))
+
+def run_scenario(engine, params, frames, warmup, seed=0):
+    '''
+    Play a synthetic level for warmup + frames frames with the player running back
+    and forth and jumping. Returns the timings of the last frames frames
+    '''
+    from jackit.core.engine import FRAME_PHASES
+    from jackit.core.profiler import FrameProfiler
+
+    random.seed(seed)
+    level = SyntheticLevel(engine, engine.player, seed=seed, **params)
+    engine.current_level.unload()
+    engine.current_level = level
+    level.load()
+    engine.profiler = FrameProfiler(FRAME_PHASES, frames)
+
+    controls = engine.config.controls
+    for frame in range(warmup + frames):
+        step = frame % 240
+        if step == 0:
+            post_key(pygame.KEYDOWN, controls.right)
+        elif step == 120:
+            post_key(pygame.KEYUP, controls.right)
+            post_key(pygame.KEYDOWN, controls.left)
+        elif step == 239:
+            post_key(pygame.KEYUP, controls.left)
+
+        if frame % 45 == 0:
+            post_key(pygame.KEYDOWN, controls.jump)
+        elif frame % 45 == 20:
+            post_key(pygame.KEYUP, controls.jump)
+
+        engine.update()
+
+    return summarize(engine.profiler)
+
+def summarize(profiler):
+    '''
+    Get {phase: {"mean", "p50", "p95", "p99"}} in milliseconds
+    '''
+    frames = profiler.frames()
+    means = dict(zip(profiler.phases, frames.mean(axis=0).tolist()))
+    means["total"] = float(frames.sum(axis=1).mean())
+
+    ret = {}
+    for phase, (p50, p95, p99) in profiler.percentiles().items():
+        ret[phase] = {"mean": means[phase], "p50": p50, "p95": p95, "p99": p99}
+    return ret
+
+def compare(results, baseline, threshold):
+    '''
+    Compare median frame times to the baseline. Returns a list of
+    (scenario, phase, baseline ms, result ms, ratio, regressed)
+    '''
+    rows = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name, None)
+        if base is None or base["params"] != result["params"]:
+            continue
+
+        for phase in COMPARED_PHASES:
+            old = base["phases"][phase]["p50"]
+            new = result["phases"][phase]["p50"]
+            ratio = new / old if old > 0 else 1.0
+            rows.append((name, phase, old, new, ratio, ratio > 1.0 + threshold))
+    return rows
+
+def main():
+    '''
+    Run the benchmarks
+    '''
+    parser = argparse.ArgumentParser(description="JackIT frame time benchmarks")
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS),
+        help="Scenario to run. Can be repeated. Runs all of them by default")
+    parser.add_argument("--frames", type=int, default=600, help="Frames measured per scenario")
+    parser.add_argument("--warmup", type=int, default=60, help="Frames run before measuring")
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="File the results are written to")
+    parser.add_argument(
+        "--baseline", default="benchmark_baseline.json", help="Results to compare against")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Allowed slow down before a result is a regression (0.1 = 10%%)")
+    parser.add_argument(
+        "--vectorized-enemies", action="store_true", help="Use the vectorized enemy simulation")
+    args = parser.parse_args()
+
+    engine = setup_engine(args.vectorized_enemies)
+
+    results = {
+        "frames": args.frames,
+        "warmup": args.warmup,
+        "vectorized_enemies": args.vectorized_enemies,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "scenarios": {}
+    }
+
+    for name in args.scenario or sorted(SCENARIOS):
+        params = SCENARIOS[name]
+        phases = run_scenario(engine, params, args.frames, args.warmup)
+        results["scenarios"][name] = {"params": params, "phases": phases}
+        print("{:<10} update {:7.3f}ms  draw {:7.3f}ms  frame {:7.3f}ms (p50)".format(
+            name, phases["level_update"]["p50"], phases["draw_level"]["p50"],
+            phases["total"]["p50"]))
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=4)
+    print("Results written to: ", args.output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(results, fh, indent=4)
+        print("Baseline written to: ", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against. Create one with --save-baseline")
+        return 0
+
+    with open(args.baseline, "r") as fh:
+        baseline = json.load(fh)
+
+    regressed = False
+    for name, phase, old, new, ratio, slower in compare(results, baseline, args.threshold):
+        regressed = regressed or slower
+        print("{:<10} {:<14} {:8.3f}ms -> {:8.3f}ms  {:+6.1f}%{}".format(
+            name, phase, old, new, (ratio - 1.0) * 100, "  REGRESSION" if slower else ""))
+
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+'''
+Loads marshalled code objects once and keeps them in memory.
+Used by both the game and the server so it can't depend on either
+'''
+
+import os
+import types
+import marshal
+import threading
+
+
+class CodeCacheError(Exception):
+    '''
+    Raised if a code dump can't be read or isn't a code object
+    '''
+    pass
+
+
+class CodeCache:
+    '''
+    Cache of code objects loaded from marshal dumps. Each dump is read once
+    and only read again if its modification time changes
+    '''
+    def __init__(self):
+        # Map of path -> (mtime in ns, code object)
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        '''
+        Get the code object in the dump at path
+        '''
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            raise CodeCacheError("Can't read code dump {}: {}".format(path, str(e)))
+
+        with self.lock:
+            cached = self.cache.get(path, None)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            try:
+                with open(path, "rb") as fh:
+                    code_obj = marshal.load(fh)
+            except (OSError, EOFError, ValueError, TypeError) as e:
+                raise CodeCacheError("Bad code dump {}: {}".format(path, str(e)))
+
+            if not isinstance(code_obj, types.CodeType):
+                raise CodeCacheError("Code dump {} holds a {}, not code".format(
+                    path, type(code_obj).__name__))
+
+            self.cache[path] = (mtime, code_obj)
+            return code_obj
+
+    def clear(self):
+        '''
+        Forget every loaded code object
+        '''
+        with self.lock:
+            self.cache.clear()
+
+
+SubmissionCode = CodeCache()
@@ -34,11 +34,15 @@ class SiteDeploymentSingleton:
     def __init__(self):
         self.base_path = os.path.dirname(os.path.abspath(__file__))
         self.config_path = os.path.join(self.base_path, "site.cfg.json")
+        self.cache_path = os.path.join(self.base_path, "cache")
+        self.journal_path = os.path.join(self.base_path, "submissions.journal")
 
         if "library.zip" in self.base_path:
             # Running as executable
             self.base_path = os.path.split(self.base_path)[0]
             self.config_path = os.path.join(os.path.expanduser("~"), "jackit.cfg.json")
+            self.cache_path = os.path.join(os.path.expanduser("~"), ".jackit", "cache")
+            self.journal_path = os.path.join(os.path.expanduser("~"), "jackit.submissions.journal")
             print("Config file written to: ", self.config_path)
 
         self.resource_path = os.path.join(self.base_path, "jackit", "resources")
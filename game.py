@@ -15,6 +15,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='JackIT! The Game!')
     parser.add_argument(
         '--sdl2', action="store_true", help="Run using pygame_sdl2 if it's installed")
+    parser.add_argument(
+        '--headless', action="store_true",
+        help="Run without a window as fast as possible. For automated playthroughs")
+    parser.add_argument(
+        '--record', metavar="LOG", help="Record your input to LOG so the game can be replayed")
+    parser.add_argument(
+        '--replay', metavar="LOG", help="Play back input recorded with --record")
     args = parser.parse_args()
 
     if args.sdl2:
@@ -34,6 +41,12 @@ if __name__ == "__main__":
         from jackit import JackitGame
         from deploy import SiteDeployment
         SiteDeployment.setup_config()
+        if args.headless:
+            SiteDeployment.config.headless = True
+        if args.record:
+            SiteDeployment.config.record_input = args.record
+        if args.replay:
+            SiteDeployment.config.replay_input = args.replay
         JackitGame.run()
     except ConfigError as e:
         print("Invalid config: {}. Please fix {}".format(str(e), SiteDeployment.config_path))
@@ -48,5 +61,6 @@ if __name__ == "__main__":
             traceback.print_exc(file=f)
         sys.exit(1)
 
-    input("Press 'enter' to exit...")
+    if not args.headless:
+        input("Press 'enter' to exit...")
     sys.exit(0)
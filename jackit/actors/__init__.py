@@ -5,3 +5,4 @@ Game actor imports
 from .player import Player
 from .behaviors import LedgeSensingEnemy, BasicEnemy
 from .enemy import Enemy
+from .enemybatch import EnemyBatch
@@ -86,17 +86,11 @@ class LedgeSensingEnemy(BasicEnemy):
         if not self.on_platforms and self.is_on_collideable():
             self.on_platforms = self.frame_cache["is_on_collideable"]
 
-        if self.is_moving_left() and self.on_platforms is not None:
-            self.rect.y += 2 # Move down 2
-            on_ledge = True
-
-            # Check for off ledge while moving left
-            for platform in self.game_engine.current_level.platforms:
-                if platform.rect.collidepoint(self.rect.left, self.rect.bottom):
-                    on_ledge = False
-                    break
+        tile_map = self.game_engine.current_level.tile_map
 
-            self.rect.y -= 2 # Move back up 2
+        if self.is_moving_left() and self.on_platforms is not None:
+            # Check for off ledge 2 pixels below us while moving left
+            on_ledge = not tile_map.is_solid_at(self.rect.left, self.rect.bottom + 2)
 
             if on_ledge:
                 self.has_left_ledge = True
@@ -104,16 +98,8 @@ class LedgeSensingEnemy(BasicEnemy):
                 self.go_right()
 
         elif self.is_moving_right() and self.on_platforms is not None:
-            self.rect.y += 2 # Move down 2
-            on_ledge = True
-
-            # Check for off ledge while moving right
-            for platform in self.game_engine.current_level.platforms:
-                if platform.rect.collidepoint(self.rect.right, self.rect.bottom):
-                    on_ledge = False
-                    break
-
-            self.rect.y -= 2
+            # Check for off ledge 2 pixels below us while moving right
+            on_ledge = not tile_map.is_solid_at(self.rect.right, self.rect.bottom + 2)
 
             if on_ledge:
                 self.has_right_ledge = True
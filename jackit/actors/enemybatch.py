@@ -0,0 +1,346 @@
+'''
+Batched enemy simulation. Advances every enemy in a level with one
+vectorized step per frame instead of a Python update() per enemy
+'''
+
+import numpy
+from jackit.core import BLOCK_WIDTH, BLOCK_HEIGHT
+from jackit.core.tilemap import COLLIDEABLE_KINDS
+from jackit.actors.behaviors import LedgeSensingEnemy
+
+# Values for the direction array
+LEFT = -1
+STOPPED = 0
+RIGHT = 1
+
+# Per enemy arrays that are only read while stepping and the ones the step changes
+CONSTANTS = (
+    "width", "height", "spawn_x", "spawn_y", "top_speed", "x_acceleration", "air_braking",
+    "grav_acceleration", "grav_deceleration", "terminal_velocity", "random_behavior", "ledge_sensing"
+)
+STATE = ("x", "y", "change_x", "change_y", "direction", "on_platforms")
+
+def round_position(values):
+    '''
+    Round like pygame does when a float is assigned to a Rect (half away from zero)
+    '''
+    return (numpy.sign(values) * numpy.floor(numpy.abs(values) + 0.5)).astype(numpy.int64)
+
+class EnemyBatch:
+    '''
+    Stores positions, velocities and direction state for all the enemies
+    in a level in NumPy arrays. Collision is done against the level's
+    tile map so levels with moving platforms should not use this.
+    Only the awake enemies are stepped. Moving enemies stop when they run
+    into the player like Sprite.update() does. Sprite rects are synced back
+    for the enemies that moved and animations only advance on screen.
+    '''
+    def __init__(self, level, enemies, seed=None):
+        self.level = level
+        self.tile_map = level.tile_map
+        self.sprites = list(enemies)
+        self.index = {sprite: i for i, sprite in enumerate(self.sprites)}
+        self.rng = numpy.random.default_rng(seed)
+
+        # Sprites the current step is for. All of them or only the awake ones
+        self.stepping = self.sprites
+
+        # Lookup table indexed by tile kind
+        self.collideable_kinds = numpy.array(COLLIDEABLE_KINDS, dtype=bool)
+
+        # Collideable cells of the tile map with a border of empty cells so
+        # positions off the map can be clamped onto the border. Refreshed
+        # when the tile map's version changes
+        self.solid = numpy.zeros((self.tile_map.rows + 2, self.tile_map.columns + 2), dtype=bool)
+        self.solid_version = None
+
+        def stat(name):
+            return numpy.array(
+                [getattr(sprite.stats, name) for sprite in self.sprites], dtype=numpy.float64)
+
+        self.width = numpy.array([s.rect.width for s in self.sprites], dtype=numpy.int64)
+        self.height = numpy.array([s.rect.height for s in self.sprites], dtype=numpy.int64)
+        self.spawn_x = numpy.array([s.spawn_point[0] for s in self.sprites], dtype=numpy.int64)
+        self.spawn_y = numpy.array([s.spawn_point[1] for s in self.sprites], dtype=numpy.int64)
+
+        self.top_speed = stat("top_speed")
+        self.x_acceleration = stat("x_acceleration")
+        self.air_braking = stat("air_braking")
+        self.grav_acceleration = stat("grav_acceleration")
+        self.grav_deceleration = stat("grav_deceleration")
+        self.terminal_velocity = stat("terminal_velocity")
+
+        self.random_behavior = numpy.array(
+            [s.random_behavior for s in self.sprites], dtype=bool)
+        self.ledge_sensing = numpy.array(
+            [isinstance(s, LedgeSensingEnemy) for s in self.sprites], dtype=bool)
+
+        self.x = self.y = None
+        self.change_x = self.change_y = None
+        self.direction = None
+        self.on_platforms = None
+        self.reset()
+
+    def reset(self):
+        '''
+        Load the current state from the sprites. Called on level reset
+        '''
+        self.x = numpy.array([s.rect.x for s in self.sprites], dtype=numpy.int64)
+        self.y = numpy.array([s.rect.y for s in self.sprites], dtype=numpy.int64)
+        self.change_x = numpy.array([s.change_x for s in self.sprites], dtype=numpy.float64)
+        self.change_y = numpy.array([s.change_y for s in self.sprites], dtype=numpy.float64)
+        self.direction = numpy.array(
+            [self.get_direction(s) for s in self.sprites], dtype=numpy.int8)
+        self.on_platforms = numpy.array(
+            [getattr(s, "on_platforms", None) is not None for s in self.sprites], dtype=bool)
+
+    @staticmethod
+    def get_direction(sprite):
+        '''
+        Direction an enemy sprite is currently trying to move
+        '''
+        if sprite.horizontal_movement_action == sprite.go_left:
+            return LEFT
+        elif sprite.horizontal_movement_action == sprite.go_right:
+            return RIGHT
+        return STOPPED
+
+    def solid_at(self, x_pos, y_pos):
+        '''
+        True for each pixel position that is in a collideable tile
+        '''
+        columns, rows = self.tile_map.columns, self.tile_map.rows
+        col = numpy.minimum(numpy.maximum(x_pos // BLOCK_WIDTH, -1), columns) + 1
+        row = numpy.minimum(numpy.maximum(y_pos // BLOCK_HEIGHT, -1), rows) + 1
+        return self.solid.take(row * (columns + 2) + col)
+
+    def solid_in_rects(self, x_pos, y_pos):
+        '''
+        True for each rect that overlaps a collideable tile. Enemies are
+        never bigger than a block so checking the corners is enough
+        '''
+        right = x_pos + self.width - 1
+        bottom = y_pos + self.height - 1
+        corners = self.solid_at(
+            numpy.concatenate((x_pos, right, x_pos, right)),
+            numpy.concatenate((y_pos, y_pos, bottom, bottom)))
+        return corners.reshape(4, -1).any(axis=0)
+
+    def accelerate(self, mask, on_ground):
+        '''
+        Apply go_left()/go_right() to the masked enemies
+        '''
+        if not mask.any():
+            return
+
+        left = mask & (self.direction == LEFT)
+        right = mask & (self.direction == RIGHT)
+        change_x = self.change_x
+
+        new_left = numpy.where(
+            change_x <= -self.top_speed, -self.top_speed,
+            numpy.where(~on_ground & (change_x > 0),
+                        change_x - self.air_braking, change_x - self.x_acceleration))
+        new_right = numpy.where(
+            change_x >= self.top_speed, self.top_speed,
+            numpy.where(~on_ground & (change_x < 0),
+                        change_x + self.air_braking, change_x + self.x_acceleration))
+
+        self.change_x = numpy.where(left, new_left, numpy.where(right, new_right, change_x))
+
+    def update(self, awake=None):
+        '''
+        Advance the enemies in awake one frame. Everyone if awake is None
+        '''
+        if awake is None:
+            active = numpy.arange(len(self.sprites))
+        else:
+            active = numpy.fromiter(
+                (self.index[sprite] for sprite in awake if sprite in self.index), dtype=numpy.intp)
+        if not len(active):
+            return
+
+        if len(active) == len(self.sprites):
+            self.stepping = self.sprites
+            self.step()
+            return
+
+        # Step copies of the awake enemies' arrays and write the results back
+        full = {name: getattr(self, name) for name in CONSTANTS + STATE}
+        for name, values in full.items():
+            setattr(self, name, values[active])
+        self.stepping = [self.sprites[i] for i in active]
+        try:
+            self.step()
+        finally:
+            for name in STATE:
+                full[name][active] = getattr(self, name)
+            for name, values in full.items():
+                setattr(self, name, values)
+            self.stepping = self.sprites
+
+    def step(self):
+        '''
+        Advance the enemies in self.stepping one frame
+        '''
+        last_x, last_y, last_direction = self.x, self.y, self.direction
+        everyone = numpy.ones(len(self.stepping), dtype=bool)
+        if self.solid_version != self.tile_map.version:
+            self.solid[1:-1, 1:-1] = self.collideable_kinds[self.tile_map.kinds]
+            self.solid_version = self.tile_map.version
+        on_ground = self.solid_in_rects(self.x, self.y + 2)
+
+        # Gravity
+        change_y = self.change_y
+        change_y = numpy.where(
+            change_y == 0, 1,
+            numpy.where(change_y < 0, change_y + self.grav_deceleration,
+                        numpy.where(change_y >= self.terminal_velocity, self.terminal_velocity,
+                                    change_y + self.grav_acceleration)))
+        self.change_y = numpy.where(on_ground & (self.change_y >= 0), 0, change_y)
+
+        # Horizontal movement
+        self.accelerate(everyone, on_ground)
+
+        self.move_x()
+        self.move_y()
+        self.kill_in_death_zone()
+
+        # Pick a direction for anything that stopped. Draw all the random
+        # numbers for the frame at once. The low bit picks the new direction
+        # and the rest is the 1 in 51 chance of turning around
+        rolls = self.rng.integers(0, 102, len(self.stepping))
+        new_direction = numpy.where(rolls & 1, RIGHT, LEFT)
+        change_dir = (rolls >> 1) == 2
+
+        stopped = self.change_x == 0
+        self.direction = numpy.where(stopped, new_direction, self.direction).astype(numpy.int8)
+        self.accelerate(stopped, on_ground)
+
+        # Low chance of changing direction while moving
+        turn = self.random_behavior & (self.change_x != 0) & change_dir
+        self.direction = numpy.where(turn, -self.direction, self.direction).astype(numpy.int8)
+        self.accelerate(turn, on_ground)
+
+        self.turn_at_ledges(on_ground)
+        self.sync(last_x, last_y, last_direction)
+
+    def hit_player(self, moving, x_pos, y_pos):
+        '''
+        True for each moving enemy whose rect at x_pos, y_pos overlaps the player.
+        Tells the player it was run into like Sprite.collide() does
+        '''
+        player = self.level.player
+        hit = moving & (x_pos < player.rect.right) & (x_pos + self.width > player.rect.left) &\
+              (y_pos < player.rect.bottom) & (y_pos + self.height > player.rect.top)
+        for i in numpy.flatnonzero(hit):
+            player.collide_with(self.stepping[i])
+        return hit
+
+    def move_x(self):
+        '''
+        Move along the x-axis and stop at the player and at solid tiles
+        '''
+        moving = self.change_x != 0
+        x_pos = self.x + round_position(self.change_x)
+
+        # The player is checked first like in the enemies' collision groups
+        player = self.level.player.rect
+        hit_player = self.hit_player(moving, x_pos, self.y) & self.level.player.is_collideable()
+        x_pos = numpy.where(hit_player & (self.change_x > 0), player.left - self.width, x_pos)
+        x_pos = numpy.where(hit_player & (self.change_x < 0), player.right, x_pos)
+
+        hit = moving & self.solid_in_rects(x_pos, self.y)
+
+        # Snap to the edge of the tile we ran into
+        snap_right = ((x_pos + self.width - 1) // BLOCK_WIDTH) * BLOCK_WIDTH - self.width
+        snap_left = (x_pos // BLOCK_WIDTH + 1) * BLOCK_WIDTH
+        x_pos = numpy.where(hit & (self.change_x > 0), snap_right, x_pos)
+        x_pos = numpy.where(hit & (self.change_x < 0), snap_left, x_pos)
+
+        self.x = x_pos
+        self.change_x = numpy.where(hit | hit_player, 0, self.change_x)
+
+    def move_y(self):
+        '''
+        Move along the y-axis and stop at the player and at solid tiles
+        '''
+        moving = self.change_y != 0
+        y_pos = self.y + round_position(self.change_y)
+
+        player = self.level.player.rect
+        hit_player = self.hit_player(moving, self.x, y_pos) & self.level.player.is_collideable()
+        y_pos = numpy.where(hit_player & (self.change_y > 0), player.top - self.height, y_pos)
+        y_pos = numpy.where(hit_player & (self.change_y < 0), player.bottom, y_pos)
+
+        hit = moving & self.solid_in_rects(self.x, y_pos)
+
+        # Snap to the edge of the tile we ran into
+        snap_down = ((y_pos + self.height - 1) // BLOCK_HEIGHT) * BLOCK_HEIGHT - self.height
+        snap_up = (y_pos // BLOCK_HEIGHT + 1) * BLOCK_HEIGHT
+        y_pos = numpy.where(hit & (self.change_y > 0), snap_down, y_pos)
+        y_pos = numpy.where(hit & (self.change_y < 0), snap_up, y_pos)
+
+        self.y = y_pos
+        self.change_y = numpy.where(hit | hit_player, 0, self.change_y)
+
+    def kill_in_death_zone(self):
+        '''
+        Put enemies that left the level back at their spawn point
+        '''
+        # Same unpacking as GameEngine.is_rect_in_death_zone()
+        top, left, width, height = self.level.death_zone
+        dead = ~((left <= self.x) & (self.x <= width)) | ~((top <= self.y) & (self.y <= height))
+        if not dead.any():
+            return
+
+        self.x = numpy.where(dead, self.spawn_x, self.x)
+        self.y = numpy.where(dead, self.spawn_y, self.y)
+        self.change_x = numpy.where(dead, 0, self.change_x)
+        self.change_y = numpy.where(dead, 0, self.change_y)
+
+    def turn_at_ledges(self, on_ground):
+        '''
+        Ledge sensing enemies turn around instead of walking off a platform
+        '''
+        if not self.ledge_sensing.any():
+            return
+
+        self.on_platforms |= self.ledge_sensing & self.solid_in_rects(self.x, self.y + 2)
+        sensing = self.ledge_sensing & self.on_platforms
+        below = self.y + self.height + 2
+
+        left_ledge = sensing & (self.change_x < 0) & ~self.solid_at(self.x, below)
+        right_ledge = sensing & (self.change_x > 0) & ~self.solid_at(self.x + self.width, below)
+        turn = left_ledge | right_ledge
+
+        self.change_x = numpy.where(turn, 0, self.change_x)
+        self.direction = numpy.where(left_ledge, RIGHT, self.direction)
+        self.direction = numpy.where(right_ledge, LEFT, self.direction).astype(numpy.int8)
+        self.accelerate(turn, on_ground)
+
+    def sync(self, last_x, last_y, last_direction):
+        '''
+        Copy the step back to the sprites. Only the sprites that moved or
+        turned are touched and only the ones on screen are animated
+        '''
+        moved = numpy.flatnonzero((self.x != last_x) | (self.y != last_y))
+        for i, x_pos, y_pos in zip(moved.tolist(), self.x[moved].tolist(), self.y[moved].tolist()):
+            self.stepping[i].rect.topleft = (x_pos, y_pos)
+
+        for i in numpy.flatnonzero(self.direction != last_direction):
+            sprite = self.stepping[i]
+            if self.direction[i] == LEFT and sprite.horizontal_movement_action != sprite.go_left:
+                sprite.horizontal_movement_action = sprite.go_left
+                sprite.animation = sprite.run_left_animation.iter()
+            elif self.direction[i] == RIGHT and sprite.horizontal_movement_action != sprite.go_right:
+                sprite.horizontal_movement_action = sprite.go_right
+                sprite.animation = sprite.run_animation.iter()
+
+        view = self.level.camera.viewport()
+        visible = (self.x < view.right) & (self.x + self.width > view.left) &\
+                  (self.y < view.bottom) & (self.y + self.height > view.top)
+        for i in numpy.flatnonzero(visible):
+            sprite = self.stepping[i]
+            if sprite.animation is not None:
+                sprite.image = sprite.animation.next()
@@ -46,6 +46,16 @@ class JsonConfig:
             raise ConfigError("Expected an unsigned integer. Got a negative number")
         return value
 
+    def validate_path(self, value):
+        '''
+        Validate a file path. Empty for none
+        '''
+        if not isinstance(value, str):
+            raise ConfigError("Unknown type object. Expecting a file path, got: {}".format(
+                type(value)
+            ))
+        return value
+
     def validate_int(self, value):
         '''
         Validate an integer value
@@ -157,6 +167,7 @@ class JackitConfigControls(JsonConfig):
         self.toggle_sound = pygame.K_m
         self.kill_self = pygame.K_k
         self.reset_game = pygame.K_n
+        self.toggle_profiler = pygame.K_F3
 
     def from_json(self, raw):
         '''
@@ -198,6 +209,7 @@ class JackitConfigControls(JsonConfig):
         self.toggle_sound = raw.get("toggle_sound", getattr(pygame, "K_m"))
         self.kill_self = raw.get("kill_self", getattr(pygame, "K_k"))
         self.reset_game = raw.get("reset_game", getattr(pygame, "K_n"))
+        self.toggle_profiler = raw.get("toggle_profiler", getattr(pygame, "K_F3"))
 
     def to_json(self):
         '''
@@ -214,7 +226,8 @@ class JackitConfigControls(JsonConfig):
             'reset_code': self.reset_code,
             'toggle_sound': self.toggle_sound,
             'kill_self': self.kill_self,
-            'reset_game': self.reset_game
+            'reset_game': self.reset_game,
+            'toggle_profiler': self.toggle_profiler
         }
 
 
@@ -226,6 +239,9 @@ class JackitLeaderboard(JsonConfig):
         super(JackitLeaderboard, self).__init__()
         self.submission_url = "https://www.jackit.io/leaderboard/submit/"
         self.lvl_completion_url = "https://www.jackit.io/leaderboard/lvlcomplete/"
+        self.timeout = 10 # Seconds to wait for the server
+        self.retries = 3 # Number of times a failed submission is retried
+        self.enabled = True # Set to false to never send or journal anything
 
     def to_json(self):
         '''
@@ -233,7 +249,10 @@ class JackitLeaderboard(JsonConfig):
         '''
         return {
             'submission_url': self.submission_url,
-            'lvl_completion_url': self.lvl_completion_url
+            'lvl_completion_url': self.lvl_completion_url,
+            'timeout': self.timeout,
+            'retries': self.retries,
+            'enabled': self.enabled
         }
 
     def from_json(self, raw):
@@ -242,6 +261,9 @@ class JackitLeaderboard(JsonConfig):
         '''
         self.submission_url = raw.get("submission_url", "https://www.jackit.io/leaderboard/submit/")
         self.lvl_completion_url = raw.get("lvl_completion_url", "https://www.jackit.io/leaderboard/lvlcomplete/")
+        self.timeout = self.validate_uint(raw.get("timeout", 10))
+        self.retries = self.validate_uint(raw.get("retries", 3))
+        self.enabled = self.validate_bool(raw.get("enabled", True))
 
 
 class JackitConfig(JsonConfig):
@@ -259,6 +281,16 @@ class JackitConfig(JsonConfig):
         self.accurate_framerate = True
         self.sound_enabled = True
         self.play_forever = False
+        self.vectorized_enemies = False
+        self.headless = False
+        self._activation_margin = 240
+        self._profiler_frames = 600
+        self._profiler_dump = ""
+        self._patch_call_budget = 20
+        self._patch_frame_budget = 50
+        self.profile_patches = False
+        self._record_input = ""
+        self._replay_input = ""
         self.controls = JackitConfigControls()
         self.code_editor = JackitConfigCodeEditor()
         self.leaderboard = JackitLeaderboard()
@@ -340,6 +372,107 @@ class JackitConfig(JsonConfig):
         '''
         self._framerate = self.validate_uint(value)
 
+    @property
+    def activation_margin(self):
+        '''
+        Get the value of activation_margin
+        '''
+        return self._activation_margin
+
+    @activation_margin.setter
+    def activation_margin(self, value):
+        '''
+        Set the value of activation_margin and validate
+        '''
+        self._activation_margin = self.validate_uint(value)
+
+    @property
+    def profiler_frames(self):
+        '''
+        Get the value of profiler_frames
+        '''
+        return self._profiler_frames
+
+    @profiler_frames.setter
+    def profiler_frames(self, value):
+        '''
+        Set the value of profiler_frames and validate
+        '''
+        value = self.validate_uint(value)
+        if value == 0:
+            raise ConfigError("profiler_frames must be at least 1")
+        self._profiler_frames = value
+
+    @property
+    def profiler_dump(self):
+        '''
+        Get the value of profiler_dump
+        '''
+        return self._profiler_dump
+
+    @profiler_dump.setter
+    def profiler_dump(self, value):
+        '''
+        Set the value of profiler_dump and validate
+        '''
+        self._profiler_dump = self.validate_path(value)
+
+    @property
+    def patch_call_budget(self):
+        '''
+        Get the value of patch_call_budget
+        '''
+        return self._patch_call_budget
+
+    @patch_call_budget.setter
+    def patch_call_budget(self, value):
+        '''
+        Set the value of patch_call_budget (milliseconds, 0 for no limit) and validate
+        '''
+        self._patch_call_budget = self.validate_uint(value)
+
+    @property
+    def patch_frame_budget(self):
+        '''
+        Get the value of patch_frame_budget
+        '''
+        return self._patch_frame_budget
+
+    @patch_frame_budget.setter
+    def patch_frame_budget(self, value):
+        '''
+        Set the value of patch_frame_budget (milliseconds, 0 for no limit) and validate
+        '''
+        self._patch_frame_budget = self.validate_uint(value)
+
+    @property
+    def record_input(self):
+        '''
+        Get the value of record_input
+        '''
+        return self._record_input
+
+    @record_input.setter
+    def record_input(self, value):
+        '''
+        Set the value of record_input and validate
+        '''
+        self._record_input = self.validate_path(value)
+
+    @property
+    def replay_input(self):
+        '''
+        Get the value of replay_input
+        '''
+        return self._replay_input
+
+    @replay_input.setter
+    def replay_input(self, value):
+        '''
+        Set the value of replay_input and validate
+        '''
+        self._replay_input = self.validate_path(value)
+
     def to_json(self):
         '''
         JSON representation of config options
@@ -357,7 +490,17 @@ class JackitConfig(JsonConfig):
             "accurate_framerate": self.accurate_framerate,
             "leaderboard": self.leaderboard.to_json(),
             "sound_enabled": self.sound_enabled,
-            "play_forever": self.play_forever
+            "play_forever": self.play_forever,
+            "vectorized_enemies": self.vectorized_enemies,
+            "activation_margin": self.activation_margin,
+            "headless": self.headless,
+            "profiler_frames": self.profiler_frames,
+            "profiler_dump": self.profiler_dump,
+            "patch_call_budget": self.patch_call_budget,
+            "patch_frame_budget": self.patch_frame_budget,
+            "profile_patches": self.profile_patches,
+            "record_input": self.record_input,
+            "replay_input": self.replay_input
         }
 
     def from_json(self, raw):
@@ -377,6 +520,16 @@ class JackitConfig(JsonConfig):
         self.leaderboard.from_json(raw.get("leaderboard", self.leaderboard.to_json()))
         self.sound_enabled = self.validate_bool(raw.get("sound_enabled", True))
         self.play_forever = self.validate_bool(raw.get("play_forever", False))
+        self.vectorized_enemies = self.validate_bool(raw.get("vectorized_enemies", False))
+        self.activation_margin = raw.get("activation_margin", 240)
+        self.headless = self.validate_bool(raw.get("headless", False))
+        self.profiler_frames = raw.get("profiler_frames", 600)
+        self.profiler_dump = raw.get("profiler_dump", "")
+        self.patch_call_budget = raw.get("patch_call_budget", 20)
+        self.patch_frame_budget = raw.get("patch_frame_budget", 50)
+        self.profile_patches = self.validate_bool(raw.get("profile_patches", False))
+        self.record_input = raw.get("record_input", "")
+        self.replay_input = raw.get("replay_input", "")
 
     def load(self):
         '''
@@ -19,18 +19,68 @@ BLOCK_WIDTH = 24
 BLOCK_HEIGHT = 24
 
 
-def submit(url, user, total_points, deaths, playtime, levels_completed):
+# Header the journal id of a submission is sent in
+SUBMISSION_ID_HEADER = "X-Submission-Id"
+
+
+class SessionRequests:
+    '''
+    Stands in for the requests module while a submission runs so posts go
+    through a shared keep-alive session, time out and fail on HTTP errors.
+    Posts carry the submission's journal id so the server can drop retries
+    of a submission it already has
+    '''
+    def __init__(self, session, timeout, submission_id=None):
+        self.session = session
+        self.timeout = timeout
+        self.submission_id = submission_id
+
+    def post(self, url, *args, **kwargs):
+        '''
+        Post through the session
+        '''
+        kwargs.setdefault("timeout", self.timeout)
+        if self.submission_id is not None:
+            headers = dict(kwargs.get("headers", None) or {})
+            headers[SUBMISSION_ID_HEADER] = self.submission_id
+            kwargs["headers"] = headers
+        response = self.session.post(url, *args, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+def submission_builtins(session, timeout, submission_id=None):
+    '''
+    Builtins for running a submission. Importing requests gets a SessionRequests
+    '''
+    import builtins
+
+    requests = SessionRequests(session, timeout, submission_id)
+
+    def _import(name, *args, **kwargs):
+        if name == "requests":
+            return requests
+        return builtins.__import__(name, *args, **kwargs)
+
+    ret = dict(vars(builtins))
+    ret["__import__"] = _import
+    return ret
+
+
+def submit(url, user, total_points, deaths, playtime, levels_completed, session=None, timeout=None,
+           submission_id=None):
     '''
-    Do the things
+    Do the things. Posts through session if one is provided
     '''
     import os
-    import marshal
+    from codecache import SubmissionCode
     from deploy import SiteDeployment
 
-    code_obj = marshal.load(open(os.path.join(SiteDeployment.base_path, "gen.dump"), "rb"))
+    code_obj = SubmissionCode.load(os.path.join(SiteDeployment.base_path, "gen.dump"))
 
     # pylint: disable=W0122
     exec(code_obj, {
+        '__builtins__': submission_builtins(session, timeout, submission_id) if session is not None else __builtins__,
         'submission_url': url,
         'user': user,
         'score': total_points,
@@ -40,20 +90,22 @@ def submit(url, user, total_points, deaths, playtime, levels_completed):
     }, locals())
 
 
-def submitlvl(url, user, total_points, deaths, playtime, levels_completed, level_completed, completed_level):
+def submitlvl(url, user, total_points, deaths, playtime, levels_completed, level_completed, completed_level,
+              session=None, timeout=None, submission_id=None):
     '''
-    Do more things
+    Do more things. Posts through session if one is provided
     '''
     import os
-    import marshal
+    from codecache import SubmissionCode
     from deploy import SiteDeployment
 
     result = {}
 
-    code_obj = marshal.load(open(os.path.join(SiteDeployment.base_path, "gen2.dump"), "rb"))
+    code_obj = SubmissionCode.load(os.path.join(SiteDeployment.base_path, "gen2.dump"))
 
     # pylint: disable=W0122
     exec(code_obj, {
+        '__builtins__': submission_builtins(session, timeout, submission_id) if session is not None else __builtins__,
         'submission_url': url,
         'user': user,
         'score': total_points,
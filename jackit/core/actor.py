@@ -50,21 +50,23 @@ class Actor(Sprite):
             self.change_y = 0
             return
 
+        stats = self.stats.resolve()
+
         if self.change_y == 0:
             # Are we at the top of our arc? Switch to going down
             self.change_y = 1
         elif self.is_moving_up() and self.jumping:
             # are we holding jump? Jump higher
-            self.change_y += self.stats.grav_high_jump
+            self.change_y += stats.grav_high_jump
         elif self.is_moving_up():
             # Jump normal
-            self.change_y += self.stats.grav_deceleration
-        elif self.change_y >= self.stats.terminal_velocity:
+            self.change_y += stats.grav_deceleration
+        elif self.change_y >= stats.terminal_velocity:
             # Don't fall too fast
-            self.change_y = self.stats.terminal_velocity
+            self.change_y = stats.terminal_velocity
         else:
             # Fall normal
-            self.change_y += self.stats.grav_acceleration
+            self.change_y += stats.grav_acceleration
 
     def jump(self):
         '''
@@ -79,26 +81,28 @@ class Actor(Sprite):
         Called when the user hits the left button. Moves the character left
         '''
         self.horizontal_movement_action = self.go_left
+        stats = self.stats.resolve()
 
-        if self.change_x <= (self.stats.top_speed * -1):
-            self.change_x = (self.stats.top_speed * -1)
+        if self.change_x <= (stats.top_speed * -1):
+            self.change_x = (stats.top_speed * -1)
         elif (not self.is_on_collideable()) and self.is_moving_right():
-            self.change_x += (self.stats.air_braking * -1)
+            self.change_x += (stats.air_braking * -1)
         else:
-            self.change_x += (self.stats.x_acceleration * -1)
+            self.change_x += (stats.x_acceleration * -1)
 
     def go_right(self):
         '''
         Called when the user hits the right button. Moves the character right
         '''
         self.horizontal_movement_action = self.go_right
+        stats = self.stats.resolve()
 
-        if self.change_x >= self.stats.top_speed:
-            self.change_x = self.stats.top_speed
+        if self.change_x >= stats.top_speed:
+            self.change_x = stats.top_speed
         elif self.is_moving_left() and (not self.is_on_collideable()):
-            self.change_x += self.stats.air_braking
+            self.change_x += stats.air_braking
         else:
-            self.change_x += self.stats.x_acceleration
+            self.change_x += stats.x_acceleration
 
     def stop_jumping(self):
         '''
@@ -124,9 +128,9 @@ class Actor(Sprite):
             return
 
         if self.change_x > 0:
-            self.change_x += (self.stats.x_deceleration * -1)
+            self.change_x += (self.stats.resolve().x_deceleration * -1)
         elif self.change_x < 0:
-            self.change_x += self.stats.x_deceleration
+            self.change_x += self.stats.resolve().x_deceleration
         else:
             self.change_x = 0
 
@@ -2,6 +2,8 @@
 Handles a sprite sheet and animation
 '''
 
+import os
+import threading
 import pygame
 
 class SpriteSheetError(Exception):
@@ -36,7 +38,7 @@ class SpriteSheet:
         # Determine the color key after transforms. Fix for weird graphics issue
         # in pygame_sdl2 refs #62
         if colorkey is not None:
-            if colorkey is -1:
+            if colorkey == -1:
                 colorkey = image.get_at((0, 0))
             image.set_colorkey(colorkey, pygame.RLEACCEL)
 
@@ -57,6 +59,79 @@ class SpriteSheet:
         return self.images_at(tups, colorkey, x_mirror, y_mirror, rotation)
 
 
+class SpriteCacheSingleton:
+    '''
+    Process wide cache of sprite sheets and the frames sliced from them so
+    each image file is only loaded once and each strip is only cut once.
+    Cached frames are shared by every animation that uses them and must not
+    be modified.
+    '''
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        '''
+        Get instance of SpriteCacheSingleton
+        '''
+        if cls._instance is None:
+            cls._instance = SpriteCacheSingleton()
+            return cls._instance
+        return cls._instance
+
+    def __init__(self):
+        # Map of filename -> SpriteSheet
+        self.sheets = {}
+
+        # Map of (filename, rect, count, colorkey, x_mirror, y_mirror, rotation) -> frames
+        self.strips = {}
+
+        # Guards the cache in case it's used from more than one thread
+        self.lock = threading.RLock()
+
+    def get_sheet(self, filename):
+        '''
+        Get the sprite sheet for filename. Loads it the first time
+        '''
+        with self.lock:
+            sheet = self.sheets.get(filename, None)
+            if sheet is None:
+                sheet = SpriteSheet(filename)
+                self.sheets[filename] = sheet
+            return sheet
+
+    def preload(self, directory):
+        '''
+        Load every bitmap sprite sheet in directory
+        '''
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(".bmp"):
+                self.get_sheet(os.path.join(directory, filename))
+
+    def get_strip(self, filename, rect, count, colorkey=None,
+                  x_mirror=False, y_mirror=False, rotation=0):
+        '''
+        Get a tuple of frames for the strip. Loads and slices it the first time
+        '''
+        if isinstance(colorkey, list):
+            colorkey = tuple(colorkey)
+
+        key = (filename, tuple(rect), count, colorkey, x_mirror, y_mirror, rotation)
+        with self.lock:
+            frames = self.strips.get(key, None)
+            if frames is None:
+                frames = tuple(self.get_sheet(filename).load_strip(
+                    rect, count, colorkey, x_mirror, y_mirror, rotation))
+                self.strips[key] = frames
+            return frames
+
+    def clear(self):
+        '''
+        Drop everything in the cache
+        '''
+        with self.lock:
+            self.sheets.clear()
+            self.strips.clear()
+
 class SpriteStripAnimation:
     '''
     Animator for a spritesheet
@@ -67,9 +142,10 @@ class SpriteStripAnimation:
 
         self.filename = filename
 
-        # Load the sprite sheet and the srip
-        sheet = SpriteSheet(filename)
-        self.images = sheet.load_strip(rect, count, colorkey, x_mirror, y_mirror, rotation)
+        # Get the shared frames for the strip. Only the playback
+        # position below belongs to this animation
+        self.images = SpriteCache.get_strip(
+            filename, rect, count, colorkey, x_mirror, y_mirror, rotation)
 
         self.i = 0
 
@@ -117,5 +193,9 @@ class SpriteStripAnimation:
         return image
 
     def __add__(self, ss):
-        self.images.extend(ss.images)
+        # Frames are shared so build a new tuple instead of extending in place
+        self.images = self.images + ss.images
         return self
+
+# Create an instance of SpriteCacheSingleton
+SpriteCache = SpriteCacheSingleton.instance()
@@ -43,6 +43,14 @@ class Camera:
         '''
         return target.rect.move(self.state.left, self.state.top)
 
+    def viewport(self, margin=0):
+        '''
+        Get the part of the level the camera is showing in level
+        coordinates, grown by margin pixels on every side
+        '''
+        view = pygame.Rect(-self.state.left, -self.state.top, self.screen_size[0], self.screen_size[1])
+        return view.inflate(margin * 2, margin * 2)
+
     def update(self, target):
         '''
         Update camera state
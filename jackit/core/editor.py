@@ -3,11 +3,13 @@ Code text editor
 '''
 
 import textwrap
+from bisect import bisect_right
 from string import ascii_letters
 
 import pygame
 
 from jackit.core import CustomEvent
+from jackit.core.textbuffer import TextBuffer
 
 # Map of special keys to their values when the
 # shift key is being held
@@ -29,7 +31,7 @@ class CodeEditor:
         self.game_engine = game_engine
         self.config = self.game_engine.config.code_editor
         self.running = False
-        self.text = None
+        self.text = TextBuffer()
         self.text_change = False # Don't re-calc render list
                                  # if the text hasn't changed
 
@@ -94,7 +96,7 @@ class CodeEditor:
         '''
         self.running = True
         self.text_change = True # Allows initial text to be drawn
-        self.text = start_text
+        self.text = TextBuffer(start_text)
         self.cursor_position = 0
         self.cursor_line = 0
         self.cursor_offset_in_line = 0
@@ -111,7 +113,7 @@ class CodeEditor:
         self.running = False
 
         # Trigger an event and send off the user edited text
-        pygame.event.post(pygame.event.Event(CustomEvent.EXIT_EDITOR, {"text": self.text}))
+        pygame.event.post(pygame.event.Event(CustomEvent.EXIT_EDITOR, {"text": str(self.text)}))
 
         # Undo the key repeat change so we don't effect the rest
         # of the program
@@ -142,64 +144,84 @@ class CodeEditor:
         '''
         # Break message into lines for rendering
         self.render_text_list = []
-        if self.text is not None and len(self.text):
-            for line in self.text.split("\n"):
+        if len(self.text):
+            for line in self.text.lines():
                 if len(line) == 0:
                     self.render_text_list.append(line)
                 else:
                     self.render_text_list.extend(self.textwrapper.wrap(line))
 
+    def first_wrap(self, line_start):
+        '''
+        Position of the first character in the line starting at line_start
+        that sends the cursor to a new render line. The rest come every
+        max_chars characters after it
+        '''
+        # The first line counts from its first character, the others from their newline
+        last_newline = line_start - 1 if line_start > 0 else 0
+        return max(line_start, last_newline + self.max_chars - 1)
+
+    def count_wraps(self, first_wrap, end):
+        '''
+        Number of characters before end that send the cursor to a new render line
+        '''
+        if end <= first_wrap:
+            return 0
+        return (end - 1 - first_wrap) // max(self.max_chars, 1) + 1
+
     def get_cursor_render_pos(self, pos_in_text):
         '''
         Get cursor render position based on position in self.text
         '''
+        pos_in_text = min(pos_in_text, len(self.text))
+        starts = self.text.line_starts()
+        index = bisect_right(starts, pos_in_text) - 1
+
+        # Render lines taken up by the lines before this one
         line = 0
-        offset_in_line = 0
-        last_newline = 0
-        for i in range(pos_in_text):
-            if self.text[i] == "\n":
-                line += 1
-                offset_in_line = 0
-                last_newline = i
-            elif len(self.text[last_newline:i]) >= (self.max_chars - 1):
-                # This block is so the cursor goes to a newline when line wrapping
-                line += 1
-                offset_in_line = 0
-                last_newline = i + 1
-            else:
-                offset_in_line += 1
+        for i in range(index):
+            line += self.count_wraps(self.first_wrap(starts[i]), starts[i + 1] - 1) + 1
 
-        return line, offset_in_line
+        start = starts[index]
+        first = self.first_wrap(start)
+        wraps = self.count_wraps(first, pos_in_text)
+        if wraps == 0:
+            return line, pos_in_text - start
+
+        last_wrap = first + (wraps - 1) * max(self.max_chars, 1)
+        return line + wraps, pos_in_text - 1 - last_wrap
 
     def get_cursor_pos(self, line, offset_in_line):
         '''
         Get where the cursor should be in self.text given
-        a render position
-        '''
-        iter_line = 0
-        iter_offset = 0
-        pos_in_text = 0
-        last_newline = 0
-        for i in range(len(self.text)):
-            if iter_line == line and iter_offset == offset_in_line:
-                # Found where we should be return the index into
-                # self.text where the cursor should be
-                break
-
-            if self.text[i] == "\n":
-                iter_line += 1
-                iter_offset = 0
-                last_newline = i
-            elif len(self.text[last_newline:i]) >= (self.max_chars - 1):
-                # This block is so the cursor goes to a newline when line wrapping
-                iter_line += 1
-                iter_offset = 0
-                last_newline = i + 1
+        a render position. The end of the text if there isn't one
+        '''
+        length = len(self.text)
+        if line < 0 or offset_in_line < 0:
+            return length
+
+        starts = self.text.line_starts()
+        for i, start in enumerate(starts):
+            end = starts[i + 1] - 1 if i + 1 < len(starts) else length
+            first = self.first_wrap(start)
+            wraps = self.count_wraps(first, end)
+            if line > wraps:
+                line -= wraps + 1
+                continue
+
+            # Positions in the text that are on the render line
+            if line == 0:
+                render_start = start
             else:
-                iter_offset += 1
-            pos_in_text += 1
+                render_start = first + (line - 1) * max(self.max_chars, 1) + 1
+            render_end = first + line * max(self.max_chars, 1) if line < wraps else end
+
+            pos_in_text = render_start + offset_in_line
+            if pos_in_text <= render_end and pos_in_text < length:
+                return pos_in_text
+            return length
 
-        return pos_in_text
+        return length
 
     def draw(self, screen):
         '''
@@ -294,7 +316,7 @@ class CodeEditor:
             elif event.key == pygame.K_DOWN:
                 self.k_down()
             else:
-                self.character_key(event.key)
+                self.character_key(event.key, event.mod)
 
         return True # keep processing events
 
@@ -305,20 +327,14 @@ class CodeEditor:
         if self.cursor_position == len(self.text):
             return
 
-        self.text = ''.join((
-            self.text[:self.cursor_position],
-            self.text[self.cursor_position + 1:]
-        ))
+        self.text.delete(self.cursor_position)
 
     def k_backspace(self):
         '''
         Handles the backspace key
         '''
         if self.cursor_position > 0 and self.cursor_position <= len(self.text):
-            self.text = ''.join((
-                self.text[:self.cursor_position - 1],
-                self.text[self.cursor_position:]
-            ))
+            self.text.delete(self.cursor_position - 1)
             self.cursor_position -= 1
 
     def k_left(self):
@@ -339,28 +355,23 @@ class CodeEditor:
         '''
         Handles the tab key
         '''
-        self.text = ''.join((
-            self.text[:self.cursor_position],
-            " " * self.config.tab_size,
-            self.text[self.cursor_position:]
-        ))
+        self.text.insert(self.cursor_position, " " * self.config.tab_size)
         self.cursor_position += self.config.tab_size
 
     def k_return(self):
         '''
         Handles the enter key
         '''
-        self.text = ''.join((
-            self.text[:self.cursor_position],
-            "\n",
-            self.text[self.cursor_position:]
-        ))
+        self.text.insert(self.cursor_position, "\n")
         self.cursor_position += 1
 
-    def character_key(self, key):
+    def character_key(self, key, mod=None):
         '''
-        Handles the rest of the keys
+        Handles the rest of the keys. mod is the state of the modifier
+        keys when the key was pressed
         '''
+        if mod is None:
+            mod = pygame.key.get_mods()
 
         if key == pygame.K_LSHIFT or key == pygame.K_RSHIFT:
             return # Skip the event for the shift key itself
@@ -387,18 +398,14 @@ class CodeEditor:
                 key = pygame.K_8
             elif key == pygame.K_KP9:
                 key = pygame.K_9
-            elif pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            elif mod & pygame.KMOD_SHIFT:
                 if key >= 97 and key <= 122:
                     key = ord(chr(key).upper())
                 else:
                     if KEY_TO_SHIFT_MAP.get(chr(key), None) is not None:
                         key = ord(KEY_TO_SHIFT_MAP[chr(key)])
 
-            self.text = ''.join((
-                self.text[:self.cursor_position],
-                chr(key),
-                self.text[self.cursor_position:]
-            ))
+            self.text.insert(self.cursor_position, chr(key))
             self.cursor_position += 1
         except ValueError:
             self.game_engine.hud.display_hint("Attempt to enter an invalid character!", 2)
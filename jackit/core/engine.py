@@ -2,6 +2,8 @@
 Main game engine
 '''
 
+import os
+import random
 import logging
 import sys
 import platform
@@ -13,15 +15,19 @@ from deploy import SiteDeployment
 from jackit.core import CustomEvent
 from jackit.effects import DeathFrame
 from jackit.core.input import Input
+from jackit.core.replay import InputRecorder, InputReplay
+from jackit.core.submission import SubmissionWorker
+from jackit.core.journal import SubmissionJournal
 from jackit.core.sound import Sound
 from jackit.core.editor import CodeEditor
 from jackit.core.textinput import TextInput
 from jackit.core.welcome import Welcome
 from jackit.core.hud import Hud
 from jackit.actors import Player
-from jackit.levels import Level_01, Level_02, Level_03,\
-                          Level_04, Level_05, Level_06,\
-                          Level_07, Level_08
+from jackit.core.levelcache import LevelCache
+from jackit.core.profiler import FrameProfiler, PatchProfiler
+from jackit.core.patch import UserPatch
+from jackit.levels import LEVELS
 
 
 MAC_OSX_10_12_2_NOTE = """Because of a bug in pygame, this game is
@@ -48,6 +54,12 @@ $ python3 game.py --sdl2"""
 
 logger = logging.getLogger(__name__)
 
+# Phases of a frame timed by the profiler
+FRAME_PHASES = (
+    "input", "events", "level_update", "hud_update", "editor_update",
+    "draw_level", "draw_editor", "draw_hud", "draw_death_frame", "tick", "flip"
+)
+
 
 class EngineSingleton:
     '''
@@ -66,9 +78,17 @@ class EngineSingleton:
         return cls._instance
 
     def __init__(self):
+        self.config = SiteDeployment.config
+
+        # Headless mode runs the game logic as fast as possible without a window.
+        # SDL's dummy drivers have to be selected before pygame is initialized
+        self.headless = self.config.headless
+        if self.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
         pygame.init()
 
-        self.config = SiteDeployment.config
         self.screen_width = self.config.width
         self.screen_height = self.config.height
         self.screen_size = (self.config.width, self.config.height)
@@ -92,6 +112,41 @@ class EngineSingleton:
         else:
             self.tick_method = self.clock.tick
 
+        # Length of the last frame in milliseconds. Headless mode and replays
+        # use a fixed frame time instead of waiting on the clock
+        self.frame_time = 0
+        self.fixed_timestep = self.headless
+        self.fixed_frame_time = 1000.0 / self.framerate
+
+        # Input log being played back instead of the player's input
+        self.replay = None
+        if self.config.replay_input:
+            self.replay = InputReplay(self.config.replay_input)
+            self.fixed_timestep = True
+            self.fixed_frame_time = self.replay.frame_time
+
+        # Seed for everything random in the game. Stored in input logs so
+        # replays play out the same
+        if self.replay is not None:
+            self.seed = self.replay.seed
+        else:
+            self.seed = random.SystemRandom().getrandbits(32)
+        random.seed(self.seed)
+
+        # Times each phase of the frame. F3 by default shows the overlay
+        self.profiler = FrameProfiler(FRAME_PHASES, self.config.profiler_frames)
+
+        # Time the user's patched code gets per call and per frame
+        UserPatch.watchdog.call_budget = self.config.patch_call_budget
+        UserPatch.watchdog.frame_budget = self.config.patch_frame_budget
+
+        # Counts calls to the user's patched code and the time spent in them.
+        # Shown under the HUD and summarized when a level unloads
+        self.patch_profiler = None
+        if self.config.profile_patches:
+            self.patch_profiler = PatchProfiler()
+        UserPatch.set_profiler(self.patch_profiler)
+
         if platform.system().lower() == "darwin":
             if platform.mac_ver()[0] == "10.12.2" and pygame.get_sdl_version()[0] < 2:
                 print(MAC_OSX_10_12_2_NOTE)
@@ -101,7 +156,7 @@ class EngineSingleton:
 
 
         # Set the display mode
-        if self.fullscreen:
+        if self.fullscreen and not self.headless:
             # Run with all the fancy when doing fullscreen
             self.screen = pygame.display.set_mode(
                 self.screen_size,
@@ -118,23 +173,17 @@ class EngineSingleton:
 
         self.player = Player(self, self.config.controls)
 
-        # Init the levels
-        self.levels = [
-            Level_01(self, self.player),
-            Level_02(self, self.player),
-            Level_03(self, self.player),
-            Level_04(self, self.player),
-            Level_05(self, self.player),
-            Level_06(self, self.player),
-            Level_07(self, self.player),
-            Level_08(self, self.player)
-        ]
+        # Init the levels. They are built the first time they're needed
+        self.levels = LevelCache(self, self.player, LEVELS)
         self.current_level_index = 0
         self.current_level = self.levels[self.current_level_index]
         self.current_level.load()
 
-        # Init Input handler
-        self.input = Input()
+        # Init Input handler. Records the player's input if there is a log to write
+        recorder = None
+        if self.config.record_input and self.replay is None:
+            recorder = InputRecorder(self.config.record_input, self.seed, self.fixed_frame_time)
+        self.input = Input(recorder, self.replay)
 
         # Init the sound
         self.sound = Sound(self)
@@ -148,7 +197,7 @@ class EngineSingleton:
 
         # Init the user name enter box
         self.name_enter = TextInput(self, max_chars=50)
-        self.name_enter.run(start_text="Enter your name followed by <ENTER>")
+        self.ask_name()
 
         # Flashed when the player dies
         self.death_frame = DeathFrame(self)
@@ -159,12 +208,34 @@ class EngineSingleton:
         # Number of levels completed
         self.levels_completed = 0
 
+        # Submissions are journaled until they go through so they
+        # aren't lost if the leaderboard can't be reached
+        self.journal = None
+        if self.replay is None and self.config.leaderboard.enabled:
+            self.journal = SubmissionJournal(SiteDeployment.journal_path)
+            try:
+                self.journal.load()
+            except (IOError, OSError, ValueError) as e:
+                logger.exception("Failed to open submission journal: %s", str(e))
+                self.journal = None
+
+        # Sends scores and level completions to the leaderboard in the background.
+        # Starts by sending anything left in the journal from last time
+        self.submissions = SubmissionWorker(
+            self.config.leaderboard.timeout, self.config.leaderboard.retries,
+            journal=self.journal, resolve=self.resolve_submission)
+        if self.config.leaderboard.enabled:
+            self.submissions.start()
+
         # Set the allowed events so that we don't waste time looking for more
         pygame.event.set_allowed([
             pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP,
             CustomEvent.KILL_SPRITE, CustomEvent.EXIT_EDITOR,
             CustomEvent.NEXT_LEVEL, CustomEvent.SET_USER])
 
+        # Get the next level ready while this one is played
+        self.levels.prefetch(self.current_level_index + 1)
+
     @property
     def _user(self):
         '''
@@ -197,31 +268,48 @@ class EngineSingleton:
         '''
         Updates all game components
         '''
+        self.profiler.begin_frame()
+        UserPatch.watchdog.begin_frame()
+        if self.patch_profiler is not None:
+            self.patch_profiler.begin_frame()
+
+        # Done once the whole input log has been played back
+        if self.input.is_replay_finished():
+            print("Replay finished")
+            self.quit()
+            return
+
         # Get user input for this frame
         self.input.update()
+        self.profiler.mark("input")
 
         # Handle input events
         self.handle_events()
+        self.profiler.mark("events")
 
         # If the welcome window or name input is running, don't do anything else
         if self.welcome.is_running():
             self.welcome.update()
-            self.welcome.draw(self.screen)
-            self.tick_method(self.framerate)
-            pygame.display.flip()
+            if not self.headless:
+                self.welcome.draw(self.screen)
+            self.end_screen_frame()
             return
         elif self.name_enter.is_running():
             self.name_enter.update()
-            self.name_enter.draw(self.screen)
-            self.tick_method(self.framerate)
-            pygame.display.flip()
+            if not self.headless:
+                self.name_enter.draw(self.screen)
+            self.end_screen_frame()
             return
 
         # Update all sprites for the current level
         self.current_level.update()
+        self.profiler.mark("level_update")
 
         # Update the HUD with up-to-date stats DUDE!!
+        self.check_submissions()
+        self.check_patches()
         self.hud.update()
+        self.profiler.mark("hud_update")
 
         # Update the death frame (in case it's being displayed)
         self.death_frame.update()
@@ -229,56 +317,99 @@ class EngineSingleton:
         # Update the code editor if it's running
         if self.code_editor.is_running():
             self.code_editor.update()
+        self.profiler.mark("editor_update")
+
+        if not self.headless:
+            self.draw()
+
+        # Maintain framerate
+        milliseconds = self.tick()
+        self.playtime += milliseconds / 1000.0
+        self.profiler.mark("tick")
 
+        if self.config.is_development_mode() and not self.headless:
+            # Print framerate and playtime in titlebar.
+            text = "FPS: {0:.2f}   Playtime: {1:.2f}".format(self.clock.get_fps(), self.playtime)
+            pygame.display.set_caption(text)
+
+        # Update the screen with what has been drawn
+        self.flip()
+        self.profiler.mark("flip")
+        self.profiler.end_frame()
+
+    def end_screen_frame(self):
+        '''
+        Finish a frame spent on the welcome or name screen. The screen's
+        update and draw are counted as HUD time since it's shown instead of the HUD
+        '''
+        self.profiler.mark("draw_hud")
+        self.tick()
+        self.profiler.mark("tick")
+        self.flip()
+        self.profiler.mark("flip")
+        self.profiler.end_frame()
+
+    def draw(self):
+        '''
+        Draw all game components. Skipped in headless mode
+        '''
         # ALL CODE FOR DRAWING GOES BELOW HERE
 
         self.current_level.draw(self.screen) # Draws entities and player
+        self.profiler.mark("draw_level")
 
         if self.code_editor.is_running():
             self.code_editor.draw(self.screen) # Draws the code editor if it's running
+        self.profiler.mark("draw_editor")
 
         self.hud.draw(self.screen) # Draw the HUD last so it's like...on top BRO!
+        self.profiler.mark("draw_hud")
 
         # Draw the death frame way last so it's way on top
         self.death_frame.draw(self.screen)
+        self.profiler.mark("draw_death_frame")
 
-        # ALL CODE FOR DRAWING GOES ABOVE HERE
+        # Timing overlay goes over everything
+        self.profiler.draw(self.screen)
 
-        # Maintain framerate
-        milliseconds = self.tick_method(self.framerate)
-        self.playtime += milliseconds / 1000.0
+        # ALL CODE FOR DRAWING GOES ABOVE HERE
 
-        if self.config.is_development_mode():
-            # Print framerate and playtime in titlebar.
-            text = "FPS: {0:.2f}   Playtime: {1:.2f}".format(self.clock.get_fps(), self.playtime)
-            pygame.display.set_caption(text)
+    def tick(self):
+        '''
+        Wait to hold the framerate and get the length of the frame in milliseconds.
+        Headless mode and replays don't wait and step by a fixed frame time
+        '''
+        if self.fixed_timestep:
+            self.frame_time = self.fixed_frame_time
+        else:
+            self.frame_time = self.tick_method(self.framerate)
+        return self.frame_time
 
-        # Update the screen with what has been drawn
-        pygame.display.flip()
+    def flip(self):
+        '''
+        Update the screen with what has been drawn. Nothing to show in headless mode
+        '''
+        if not self.headless:
+            pygame.display.flip()
 
     def next_level(self):
         '''
         Move to the next level
         '''
-        from . import submitlvl
-
         self.levels_completed += 1
 
-        try:
-            submitlvl(
+        # Replays don't go on the leaderboard
+        if self.replay is None:
+            self.queue_submission(
+                "level",
                 self.config.leaderboard.lvl_completion_url,
                 self.user,
                 self.total_points,
                 self.deaths,
                 self.playtime,
                 self.levels_completed,
-                self.current_level_index,
-                self.current_level
+                self.current_level_index
             )
-        except BaseException as e:
-            logger.exception("Failed to submit level completion: %s", str(e))
-        else:
-            print("Level completion submitted successfully!")
 
         if self.current_level_index >= (len(self.levels) - 1):
             if self.config.play_forever:
@@ -287,9 +418,11 @@ class EngineSingleton:
                 pygame.event.post(pygame.event.Event(pygame.QUIT))
         else:
             self.current_level.unload()
+            self.levels.release(self.current_level_index)
             self.current_level_index += 1
             self.current_level = self.levels[self.current_level_index]
             self.current_level.load()
+            self.levels.prefetch(self.current_level_index + 1)
 
     def is_rect_in_death_zone(self, rect):
         '''
@@ -306,8 +439,6 @@ class EngineSingleton:
         '''
         Submit score
         '''
-        from . import submit
-
         print("Player {}: ".format(self.user))
         print("\tScore: ", self.total_points)
         print("\tDeaths: ", self.deaths)
@@ -318,22 +449,67 @@ class EngineSingleton:
             print("No username provided. Not submitting score. Enter username when game starts.")
             return
 
+        if self.replay is not None:
+            print("Replay. Not submitting score.")
+            return
+
         print("Submitting score...")
 
-        try:
-            submit(
-                self.config.leaderboard.submission_url,
-                self.user,
-                self.total_points,
-                self.deaths,
-                self.playtime,
-                self.levels_completed
-            )
-        except BaseException as e:
-            logger.exception("Failed to submit score: %s", str(e))
+        self.queue_submission(
+            "score",
+            self.config.leaderboard.submission_url,
+            self.user,
+            self.total_points,
+            self.deaths,
+            self.playtime,
+            self.levels_completed
+        )
+
+    def queue_submission(self, kind, *args):
+        '''
+        Queue a submission to be journaled and sent. Both happen on the submission thread
+        '''
+        if not self.config.leaderboard.enabled:
             return
 
-        print("Score submitted successfully!")
+        description, func, resolved = self.resolve_submission({"kind": kind, "args": args})
+        self.submissions.submit(description, func, *resolved, journal_entry=(kind, args))
+
+    @staticmethod
+    def resolve_submission(entry):
+        '''
+        Get the (description, function, args) to send a journaled submission
+        '''
+        from . import submit, submitlvl
+
+        args = list(entry["args"])
+        if entry["kind"] == "score":
+            return ("Score", submit, args)
+        elif entry["kind"] == "level":
+            # Level completions are journaled with the level's index. The level's map is sent
+            return ("Level completion", submitlvl, args + [LEVELS[args[-1]]])
+        raise ValueError("Unknown submission kind: {}".format(entry["kind"]))
+
+    def check_submissions(self):
+        '''
+        Let the player know how their submissions went
+        '''
+        for description, success, error in self.submissions.poll():
+            if success:
+                print("{} submitted successfully!".format(description))
+                self.hud.display_hint("{} submitted".format(description), 2)
+            else:
+                print("Failed to submit {}: {}".format(description.lower(), str(error)))
+                self.hud.display_hint("Couldn't submit {}".format(description.lower()), 3)
+
+    def check_patches(self):
+        '''
+        Let the player know if any of their patches were removed for being too slow
+        '''
+        removed = UserPatch.pop_removed()
+        if removed:
+            self.hud.display_popup(
+                "Your code is too slow so it was removed! " + "; ".join(removed), 5)
 
     def reset(self):
         '''
@@ -342,6 +518,7 @@ class EngineSingleton:
         self.submit_score()
 
         self.current_level.unload()
+        self.levels.clear()
 
         self.total_points = 0
         self.deaths = 0
@@ -350,8 +527,19 @@ class EngineSingleton:
         self.current_level_index = 0
         self.current_level = self.levels[self.current_level_index]
         self.current_level.load()
+        self.levels.prefetch(self.current_level_index + 1)
 
         self.name_enter.initial_edit = False
+        self.ask_name()
+
+    def ask_name(self):
+        '''
+        Show the name input. The welcome screen follows once a name is entered.
+        Headless runs without a replay have no one to type so they skip both
+        and go straight to the game
+        '''
+        if self.headless and self.replay is None:
+            return
         self.name_enter.run(start_text="Enter your name followed by <ENTER>")
 
     def quit(self):
@@ -359,16 +547,39 @@ class EngineSingleton:
         Quits the game
         '''
         self.submit_score()
+
+        # Give the score a chance to go through before exiting
+        if not self.submissions.stop(self.config.leaderboard.timeout):
+            print("Timed out submitting to the leaderboard")
+        if self.journal is not None:
+            self.journal.close()
+
+        self.dump_profile()
+        self.input.close()
         self.running = False
         pygame.quit()
 
+    def dump_profile(self):
+        '''
+        Write the frame timings to the file in the config if there is one
+        '''
+        if not self.config.profiler_dump:
+            return
+
+        try:
+            self.profiler.dump(self.config.profiler_dump)
+        except (IOError, OSError) as e:
+            logger.exception("Failed to write frame timings: %s", str(e))
+        else:
+            print("Frame timings written to: ", self.config.profiler_dump)
+
     def handle_events(self):
         '''
         Handle user input events
         '''
 
         # Get the keys that are currently down
-        keys = pygame.key.get_pressed()
+        keys = self.input.keys
 
         for event in self.input.events:
             if event.type == pygame.QUIT:
@@ -394,6 +605,9 @@ class EngineSingleton:
                 not self.code_editor.is_running():
                     print("Toggling sound")
                     self.sound.toggle_game_music()
+                if event.key == self.config.controls.toggle_profiler and\
+                not self.code_editor.is_running():
+                    self.profiler.toggle()
                 if event.key == self.config.controls.reset_game and\
                 not self.code_editor.is_running():
                     print("Resetting game")
@@ -401,7 +615,7 @@ class EngineSingleton:
                     break
                 if event.key == pygame.K_c and\
                 not self.code_editor.is_running():
-                    if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    if event.mod & pygame.KMOD_CTRL:
                         print("Quit with cntrl-c")
                         self.quit()
                         break
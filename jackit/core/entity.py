@@ -17,6 +17,9 @@ class Entity(Sprite):
         # True if an entity is collectable (for points or something)
         self.collectable = False
 
+        # Most entities never move
+        self.static = True
+
     def is_collectable(self):
         '''
         Getter for the collectable instance variable
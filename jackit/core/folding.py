@@ -0,0 +1,105 @@
+'''
+Finds patches in the user's code simple enough to skip calling
+'''
+
+import ast
+import operator
+from collections import namedtuple
+from functools import partial
+
+# A function that can be replaced. Exactly one of constant and predicate is set.
+# lineno is the line of the def so it can be matched to the compiled function
+FoldedPatch = namedtuple("FoldedPatch", ["name", "lineno", "constant", "predicate"])
+
+# Comparison -> operator for "value OP arg" and for "arg OP value" written as "value OP' arg"
+COMPARISONS = {
+    ast.Lt: (operator.lt, operator.gt),
+    ast.LtE: (operator.le, operator.ge),
+    ast.Gt: (operator.gt, operator.lt),
+    ast.GtE: (operator.ge, operator.le),
+    ast.Eq: (operator.eq, operator.eq),
+    ast.NotEq: (operator.ne, operator.ne)
+}
+
+def literal(node):
+    '''
+    Value of a number or bool literal (including negative numbers). Raises ValueError otherwise
+    '''
+    value = ast.literal_eval(node)
+    if not isinstance(value, (int, float)):
+        raise ValueError("Not a number")
+    return value
+
+def fold_function(func):
+    '''
+    Get the FoldedPatch for a function that only returns a literal or only
+    compares its one argument to a literal. None if it's anything else
+    '''
+    args = func.args
+    if func.decorator_list or args.vararg or args.kwarg or args.kwonlyargs or args.defaults or\
+       getattr(args, "posonlyargs", None):
+        return None
+
+    body = func.body
+    if len(body) > 1 and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:] # Docstring
+    if len(body) != 1 or not isinstance(body[0], ast.Return) or body[0].value is None:
+        return None
+    ret = body[0].value
+
+    try:
+        if not args.args:
+            return FoldedPatch(func.name, func.lineno, literal(ret), None)
+
+        if len(args.args) != 1 or not isinstance(ret, ast.Compare) or len(ret.ops) != 1:
+            return None
+
+        ops = COMPARISONS.get(type(ret.ops[0]), None)
+        if ops is None:
+            return None
+
+        arg = args.args[0].arg
+        left, right = ret.left, ret.comparators[0]
+        if isinstance(right, ast.Name) and right.id == arg:
+            # value OP arg
+            return FoldedPatch(func.name, func.lineno, None, partial(ops[0], literal(left)))
+        if isinstance(left, ast.Name) and left.id == arg:
+            # arg OP value
+            return FoldedPatch(func.name, func.lineno, None, partial(ops[1], literal(right)))
+    except (ValueError, TypeError, SyntaxError):
+        pass
+    return None
+
+def fold_patches(source):
+    '''
+    Get {function name: FoldedPatch} for the top level functions in source
+    that can be replaced. Functions whose name is bound more than once are
+    left alone since it isn't known which one ends up patched
+    '''
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+
+    # Count every binding of every name
+    bindings = {}
+    for node in ast.walk(tree):
+        names = []
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names = [node.name]
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names = [node.id]
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names = node.names
+        elif isinstance(node, ast.alias):
+            names = [(node.asname or node.name).split(".")[0]]
+        for name in names:
+            bindings[name] = bindings.get(name, 0) + 1
+
+    ret = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and bindings.get(node.name, 0) == 1:
+            folded = fold_function(node)
+            if folded is not None:
+                ret[node.name] = folded
+    return ret
@@ -31,6 +31,9 @@ class Hud:
         self.display_text_template = "Playtime: {0:.2f} | Points: {1} | Deaths: {2}"
         self.display_text = ""
 
+        # Dev overlay line under the HUD with the patch profiler's last frame
+        self.dev_text = None
+
         # Init Hint stuff
         self.hint_queue = deque()
         self.current_hint = None
@@ -88,8 +91,11 @@ class Hud:
             self.game_engine.deaths
         )
 
+        if self.game_engine.patch_profiler is not None:
+            self.dev_text = self.game_engine.patch_profiler.format_frame()
+
         if self.current_hint is not None:
-            self.current_delay += (self.game_engine.clock.get_time() / 1000.0)
+            self.current_delay += (self.game_engine.frame_time / 1000.0)
             if self.current_delay <= self.current_hint["delay"]:
                 self.display_text += " | " + self.current_hint["hint"]
             else:
@@ -101,7 +107,7 @@ class Hud:
             self.display_text += " | " + self.current_hint["hint"]
 
         if self.current_popup is not None:
-            self.current_popup_delay += (self.game_engine.clock.get_time() / 1000.0)
+            self.current_popup_delay += (self.game_engine.frame_time / 1000.0)
             if self.current_popup_delay <= self.current_popup["delay"]:
                 self.popup_text = self.textwrapper.wrap(self.current_popup["message"])
             else:
@@ -128,6 +134,14 @@ class Hud:
             self.game_engine.config.code_editor.font_color
         ), self.rect)
 
+        if self.dev_text is not None:
+            screen.blit(self.font.render(
+                self.dev_text,
+                self.game_engine.config.code_editor.font_antialiasing,
+                self.game_engine.config.code_editor.font_color,
+                (0, 0, 0)
+            ), (0, self.height))
+
         if self.current_popup is not None:
             if self.popup is None:
                 self.popup_height = (self.height * len(self.popup_text))
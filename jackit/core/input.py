@@ -3,13 +3,29 @@ Handle user input. Controllers/Mouse/Keyboard
 '''
 
 import pygame
+from jackit.core import CustomEvent
+from jackit.core.replay import RECORDED_EVENTS, KeyState
 
 class Input:
     '''
-    Handles user input
+    Handles user input. Can record the player's input
+    to a log or play back a log instead of the player
     '''
-    def __init__(self):
+    def __init__(self, recorder=None, replay=None):
+        self.recorder = recorder
+        self.replay = replay
+
+        # Number of frames of input handled
+        self.frame = 0
+
+        # Keys held down. Tracked from the events when recording
+        # or replaying so both see the same state
+        self.key_state = None
+        if self.recorder is not None or self.replay is not None:
+            self.key_state = KeyState()
+
         self.events = pygame.event.get() # Get initial events
+        self.keys = self.key_state
 
     def update(self):
         '''
@@ -17,3 +33,41 @@ class Input:
         and get events
         '''
         self.events = pygame.event.get()
+
+        if self.key_state is None:
+            self.keys = pygame.key.get_pressed()
+            return
+
+        posted = [event for event in self.events if event.type not in RECORDED_EVENTS]
+        if self.replay is not None:
+            # Live input is ignored while replaying
+            player = self.replay.events(self.frame)
+        else:
+            player = [event for event in self.events if event.type in RECORDED_EVENTS]
+            self.recorder.record(self.frame, player)
+
+        for event in posted:
+            if event.type == CustomEvent.EXIT_EDITOR:
+                if self.replay is not None:
+                    self.replay.check_patch(self.frame, event.text)
+                else:
+                    self.recorder.record_patch(self.frame, event.text)
+
+        # Events posted by the game go first so the order is
+        # the same when recording and replaying
+        self.events = posted + player
+        self.key_state.update(player)
+        self.frame += 1
+
+    def is_replay_finished(self):
+        '''
+        True if a replay is running and every recorded frame has been played
+        '''
+        return self.replay is not None and self.replay.is_finished(self.frame)
+
+    def close(self):
+        '''
+        Finish the input log if recording
+        '''
+        if self.recorder is not None:
+            self.recorder.close(self.frame)
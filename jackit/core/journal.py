@@ -0,0 +1,145 @@
+'''
+On-disk journal of leaderboard submissions that haven't gone through yet
+'''
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class SubmissionJournal:
+    '''
+    Append-only log of submissions. Each line is a JSON record: "add" with a
+    submission's id, kind and arguments or "done" with the id of one that was
+    sent. Lines are written sequentially and synced to disk in batches: after
+    sync_every records or sync_interval seconds, whichever comes first.
+    Loading keeps whatever was added and never marked done, and rewrites
+    the journal with just those.
+    '''
+    def __init__(self, path, sync_every=8, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        # Map of id -> {"id", "kind", "args"} not sent yet, oldest first
+        self.pending = OrderedDict()
+
+        self.lock = threading.RLock()
+        self.fh = None
+        self.unsynced = 0
+        self.last_sync = time.time()
+
+    def load(self):
+        '''
+        Read the journal and compact it. Returns the pending submissions
+        '''
+        with self.lock:
+            self.pending.clear()
+            if os.path.exists(self.path):
+                with open(self.path, "r") as fh:
+                    for line in fh:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Partially written line from a crash. Nothing after it was synced
+                            logger.warning("Ignoring corrupt line in %s", self.path)
+                            break
+
+                        if record.get("op") == "add":
+                            self.pending[record["id"]] = {
+                                "id": record["id"], "kind": record["kind"], "args": record["args"]
+                            }
+                        elif record.get("op") == "done":
+                            self.pending.pop(record["id"], None)
+
+            self.compact()
+            return list(self.pending.values())
+
+    def compact(self):
+        '''
+        Rewrite the journal with only the pending submissions
+        '''
+        with self.lock:
+            self.close()
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as fh:
+                for entry in self.pending.values():
+                    fh.write(json.dumps(dict(entry, op="add")) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.path)
+
+            self.fh = open(self.path, "a")
+
+    def write(self, record):
+        '''
+        Append a record and sync if the batch is full or old enough
+        '''
+        if self.fh is None:
+            self.fh = open(self.path, "a")
+
+        self.fh.write(json.dumps(record) + "\n")
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every or time.time() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def add(self, kind, args, submission_id=None):
+        '''
+        Journal a new submission. Returns its id, which is made up if it isn't given
+        '''
+        if submission_id is None:
+            submission_id = self.new_id()
+        with self.lock:
+            self.pending[submission_id] = {"id": submission_id, "kind": kind, "args": list(args)}
+            self.write({"op": "add", "id": submission_id, "kind": kind, "args": list(args)})
+        return submission_id
+
+    @staticmethod
+    def new_id():
+        '''
+        Get an id for a new submission
+        '''
+        return uuid.uuid4().hex
+
+    def done(self, submission_id):
+        '''
+        Mark a submission as sent
+        '''
+        with self.lock:
+            if self.pending.pop(submission_id, None) is not None:
+                self.write({"op": "done", "id": submission_id})
+
+    def get_pending(self, exclude=(), limit=None):
+        '''
+        Get up to limit pending submissions, oldest first, skipping ids in exclude
+        '''
+        with self.lock:
+            ret = [entry for entry in self.pending.values() if entry["id"] not in exclude]
+        return ret if limit is None else ret[:limit]
+
+    def sync(self):
+        '''
+        Flush everything written to disk
+        '''
+        with self.lock:
+            if self.fh is not None and self.unsynced > 0:
+                self.fh.flush()
+                os.fsync(self.fh.fileno())
+            self.unsynced = 0
+            self.last_sync = time.time()
+
+    def close(self):
+        '''
+        Sync and close the journal file
+        '''
+        with self.lock:
+            if self.fh is not None:
+                self.sync()
+                self.fh.close()
+                self.fh = None
@@ -3,8 +3,12 @@ This is a base class for a level. Create child classes
 for each level
 '''
 from jackit.core import CustomEvent, BLOCK_WIDTH, BLOCK_HEIGHT
-from jackit.actors import LedgeSensingEnemy, BasicEnemy, Player, Enemy
+from jackit.actors import LedgeSensingEnemy, BasicEnemy, Player, Enemy, EnemyBatch
 from jackit.core.spritegroup import SpriteGroup
+from jackit.core.spatialhash import SpatialHash
+from jackit.core.tilemap import TileMap, TileKind
+from jackit.core.tilelayer import TileLayer
+from jackit.core.levelcompiler import CompiledLevels
 from jackit.core.camera import Camera, complex_camera
 from jackit.core.patch import UserPatch
 from jackit.entities import Platform, ExitBlock, CodeBlock,\
@@ -57,9 +61,9 @@ class Level:
         # Initialize the entity list
         # This will have all entities for use in collision
         # detection
-        self.entities = SpriteGroup()
-        self.collideable_entities = SpriteGroup()
-        self.interactable_blocks = SpriteGroup()
+        self.entities = self.create_collision_group()
+        self.collideable_entities = self.create_collision_group()
+        self.interactable_blocks = self.create_collision_group()
 
         # These groups are for draw and update order preservation
         self.platforms = SpriteGroup()
@@ -76,6 +80,27 @@ class Level:
         self.death_zone = None
         self.camera = None
 
+        # List of (map character, x, y) for every non-empty cell in the map,
+        # the level size and the death zone in pixels. Filled in by prepare()
+        self.spawn_table = None
+        self.map_size = None
+        self.map_death_zone = None
+
+        # Grid of tile kinds for fast ground checks. Built with the level
+        self.tile_map = None
+
+        # Map of entity -> position of its group in the update order. Built with the level
+        self.update_rank = {}
+
+        # Vectorized enemy simulation if enabled in the config
+        self.enemy_batch = None
+
+        # Static tiles pre-rendered at load and platforms that still
+        # have to be drawn one at a time
+        self.background_color = (0, 0, 200) #TODO: Make this a background image of some sort
+        self.tile_layer = None
+        self.unbaked_platforms = []
+
         # Init the Player
         self.player = player
 
@@ -87,6 +112,9 @@ class Level:
         self.entities.reset()
         self.collected_blocks.reset()
 
+        if self.enemy_batch is not None:
+            self.enemy_batch.reset()
+
         self.entities.add(self.collected_blocks)
         self.collectable_blocks.add(self.collected_blocks)
         self.collected_blocks.empty()
@@ -99,9 +127,21 @@ class Level:
         '''
         Unload the level
         '''
+        # Summarize the user's patched code for the level that was just played
+        patch_profiler = self.game_engine.patch_profiler
+        if patch_profiler is not None:
+            print("Patched code in {}:".format(type(self).__name__))
+            print("\n".join(patch_profiler.summary()))
+            patch_profiler.reset()
+
         self.width = self.height = 0
         self.death_zone = None
         self.camera = None
+        self.tile_map = None
+        self.update_rank = {}
+        self.enemy_batch = None
+        self.tile_layer = None
+        self.unbaked_platforms = []
 
         # Empty the lists
         self.platforms.empty()
@@ -128,17 +168,19 @@ class Level:
         # Set up the DEATH ZONE!
         # A rect 50 pixels bigger on all sides than the level
         import pygame
-        self.death_zone = pygame.Rect(-50, -50, self.width + 50, self.height + 50)
+        self.death_zone = pygame.Rect(*self.map_death_zone)
 
         # Init the camera
         self.camera = Camera(self.game_engine.screen_size, complex_camera, self.width, self.height)
 
+        self.bake_tile_layer()
+
         # The player collides with everything
         self.player.collides_with = self.entities
         self.entities.add(self.player)
 
         for enemy in self.enemies:
-            enemy.collides_with = SpriteGroup()
+            enemy.collides_with = self.create_collision_group()
 
             # All enemies need to collide with the player
             enemy.collides_with.add(self.player)
@@ -158,76 +200,143 @@ class Level:
                     (collideable.rect.y + (BLOCK_HEIGHT / 2)) < enemy.rect.bottom:
                         enemy.collides_with.add(collideable)
 
+        # The batch collides with the tile map so it can't handle moving platforms
+        if self.game_engine.config.vectorized_enemies and not self.tile_map.dynamic:
+            self.enemy_batch = EnemyBatch(self, self.enemies, seed=self.game_engine.seed)
+
         # Reset the Player
         self.player.reset()
 
+    def bake_tile_layer(self):
+        '''
+        Render the platforms that never move or animate into the tile layer
+        '''
+        self.tile_layer = TileLayer(self.background_color)
+        self.unbaked_platforms = []
+
+        for platform in self.platforms:
+            animated = platform.animation is not None and len(platform.animation.images) > 1
+            if platform.static and not animated:
+                self.tile_layer.add(platform)
+            else:
+                self.unbaked_platforms.append(platform)
+
+    @staticmethod
+    def create_collision_group():
+        '''
+        Create a sprite group with static sprites indexed in
+        a spatial hash of block sized cells
+        '''
+        return SpriteGroup(SpatialHash(BLOCK_WIDTH, BLOCK_HEIGHT))
+
+    def prepare(self):
+        '''
+        Load the compiled level map, compiling it if it isn't cached. Doesn't
+        touch pygame so the level can be prepared ahead of time on another thread
+        '''
+        if self.spawn_table is not None:
+            return
+
+        compiled = CompiledLevels.load(self.level_map)
+
+        self.map_size = (compiled.width, compiled.height)
+        self.map_death_zone = compiled.death_zone
+        self.spawn_table = compiled.spawn_table()
+
     def build_level(self):
         '''
         Build the level from the map
         '''
-        x = y = 0
-        for row in self.level_map:
-            for col in row:
-                sprite = None
-                if col == LevelMap.PLATFORM:
-                    sprite = self.create_platform(x, y, platform_type="")
-                elif col == LevelMap.WALL:
-                    sprite = self.create_platform(x, y, platform_type="wall")
-                elif col == LevelMap.FLOOR:
-                    sprite = self.create_platform(x, y, platform_type="floor")
-                elif col == LevelMap.GROUND:
-                    sprite = self.create_platform(x, y, platform_type="ground")
-                elif col == LevelMap.CLOUD:
-                    sprite = self.create_platform(x, y, platform_type="cloud")
-                elif col == LevelMap.EXIT:
-                    sprite = self.create_exit_block(x, y)
-                elif col == LevelMap.SPAWN:
-                    self.player.spawn_point = (x, y)
-                elif col == LevelMap.CODE_BLOCK:
-                    sprite = self.create_platform(x, y, platform_type="code")
-                elif col == LevelMap.ENCRYPTED_CODE_BLOCK:
-                    sprite = self.create_code_block(x, y, locked=True)
-                elif col == LevelMap.CODE_PLUG:
-                    sprite = self.create_code_block(x, y)
-                elif col == LevelMap.DEATH_SPIKE:
-                    sprite = self.create_death_block(x, y)
-                elif col == LevelMap.LEFT_DEATH_SPIKE:
-                    sprite = self.create_death_block(x, y, direction="left")
-                elif col == LevelMap.RIGHT_DEATH_SPIKE:
-                    sprite = self.create_death_block(x, y, direction="right")
-                elif col == LevelMap.UP_DEATH_SPIKE:
-                    sprite = self.create_death_block(x, y, direction="up")
-                elif col == LevelMap.BASIC_ENEMY:
-                    sprite = self.create_basic_enemy(x, y)
-                elif col == LevelMap.LEDGE_SENSE_ENEMY:
-                    sprite = self.create_ledge_sense_enemy(x, y)
-                elif col == LevelMap.RANDOM_ENEMY:
-                    sprite = self.create_random_enemy(x, y)
-                elif col == LevelMap.LEDGE_SENSE_RND_ENEMY:
-                    sprite = self.create_ledge_sense_random_enemy(x, y)
-                elif col == LevelMap.DECRYPTION_KEY:
-                    sprite = self.create_decryption_key(x, y)
-                elif col == LevelMap.ONE_POINT_COIN:
-                    sprite = self.create_coin(x, y, 1)
-                elif col == LevelMap.FIVE_POINT_COIN:
-                    sprite = self.create_coin(x, y, 5)
-                elif col == LevelMap.TEN_POINT_COIN:
-                    sprite = self.create_coin(x, y, 10)
-
-                if sprite is not None:
-                    if sprite.is_collideable() and not isinstance(sprite, Enemy):
-                        self.collideable_entities.add(sprite)
-                    elif sprite.is_interactable():
-                        self.interactable_blocks.add(sprite)
-                    self.entities.add(sprite)
-
-                x += BLOCK_WIDTH
-            y += BLOCK_HEIGHT
-            x = 0
-
-        total_level_width = len(max(self.level_map, key=len)) * BLOCK_WIDTH
-        total_level_height = len(self.level_map) * BLOCK_HEIGHT
-        return total_level_width, total_level_height
+        self.prepare()
+
+        self.tile_map = TileMap(
+            self.map_size[0] // BLOCK_WIDTH, self.map_size[1] // BLOCK_HEIGHT,
+            BLOCK_WIDTH, BLOCK_HEIGHT)
+
+        for col, x, y in self.spawn_table:
+            sprite = None
+            if col == LevelMap.PLATFORM:
+                sprite = self.create_platform(x, y, platform_type="")
+            elif col == LevelMap.WALL:
+                sprite = self.create_platform(x, y, platform_type="wall")
+            elif col == LevelMap.FLOOR:
+                sprite = self.create_platform(x, y, platform_type="floor")
+            elif col == LevelMap.GROUND:
+                sprite = self.create_platform(x, y, platform_type="ground")
+            elif col == LevelMap.CLOUD:
+                sprite = self.create_platform(x, y, platform_type="cloud")
+            elif col == LevelMap.EXIT:
+                sprite = self.create_exit_block(x, y)
+            elif col == LevelMap.SPAWN:
+                self.player.spawn_point = (x, y)
+            elif col == LevelMap.CODE_BLOCK:
+                sprite = self.create_platform(x, y, platform_type="code")
+            elif col == LevelMap.ENCRYPTED_CODE_BLOCK:
+                sprite = self.create_code_block(x, y, locked=True)
+            elif col == LevelMap.CODE_PLUG:
+                sprite = self.create_code_block(x, y)
+            elif col == LevelMap.DEATH_SPIKE:
+                sprite = self.create_death_block(x, y)
+            elif col == LevelMap.LEFT_DEATH_SPIKE:
+                sprite = self.create_death_block(x, y, direction="left")
+            elif col == LevelMap.RIGHT_DEATH_SPIKE:
+                sprite = self.create_death_block(x, y, direction="right")
+            elif col == LevelMap.UP_DEATH_SPIKE:
+                sprite = self.create_death_block(x, y, direction="up")
+            elif col == LevelMap.BASIC_ENEMY:
+                sprite = self.create_basic_enemy(x, y)
+            elif col == LevelMap.LEDGE_SENSE_ENEMY:
+                sprite = self.create_ledge_sense_enemy(x, y)
+            elif col == LevelMap.RANDOM_ENEMY:
+                sprite = self.create_random_enemy(x, y)
+            elif col == LevelMap.LEDGE_SENSE_RND_ENEMY:
+                sprite = self.create_ledge_sense_random_enemy(x, y)
+            elif col == LevelMap.DECRYPTION_KEY:
+                sprite = self.create_decryption_key(x, y)
+            elif col == LevelMap.ONE_POINT_COIN:
+                sprite = self.create_coin(x, y, 1)
+            elif col == LevelMap.FIVE_POINT_COIN:
+                sprite = self.create_coin(x, y, 5)
+            elif col == LevelMap.TEN_POINT_COIN:
+                sprite = self.create_coin(x, y, 10)
+
+            if sprite is not None:
+                if sprite.is_collideable() and not isinstance(sprite, Enemy):
+                    self.collideable_entities.add(sprite)
+                elif sprite.is_interactable():
+                    self.interactable_blocks.add(sprite)
+                self.entities.add(sprite)
+                self.tile_map.add(sprite, self.get_tile_kind(sprite))
+
+        # Entities are updated one group at a time in this order
+        self.update_rank = {}
+        for rank, group in enumerate(self.update_groups()):
+            for sprite in group:
+                self.update_rank[sprite] = rank
+
+        return self.map_size
+
+    def update_groups(self):
+        '''
+        The groups of entities in the order they're updated. Enemies are last
+        '''
+        return (self.platforms, self.code_blocks, self.collectable_blocks,
+                self.moveable_blocks, self.enemies)
+
+    @staticmethod
+    def get_tile_kind(sprite):
+        '''
+        Get the kind of tile a sprite is in the tile map
+        '''
+        if isinstance(sprite, DeathBlock):
+            return TileKind.DEATH
+        elif isinstance(sprite, ExitBlock):
+            return TileKind.EXIT
+        elif isinstance(sprite, CodeBlock):
+            return TileKind.CODE
+        elif isinstance(sprite, Platform):
+            return TileKind.SOLID
+        return TileKind.EMPTY
 
     def create_coin(self, x_pos, y_pos, value):
         '''
@@ -386,16 +495,49 @@ class Level:
         # Update the player first
         self.player.update()
 
-        # Update all the entities in order
-        self.platforms.update()
-        self.code_blocks.update()
-        self.collectable_blocks.update()
-        self.moveable_blocks.update()
-        self.enemies.update()
-
-        # Call update complete on all the entities at
-        # once becuase order doesn't matter
-        self.entities.update_complete()
+        # Only entities near the screen are awake. Everything
+        # else sleeps until the camera comes back
+        awake = self.get_awake_entities()
+
+        # Update the awake entities in order, one group at a time
+        by_group = [[] for _ in range(len(self.update_groups()))]
+        for entity in awake:
+            rank = self.update_rank.get(entity, None)
+            if rank is not None:
+                by_group[rank].append(entity)
+        awake_enemies = by_group.pop()
+
+        for group in by_group:
+            for entity in group:
+                entity.update()
+
+        if self.enemy_batch is not None:
+            self.enemy_batch.update(awake_enemies)
+        else:
+            for entity in awake_enemies:
+                entity.update()
+
+        # Call update complete on everything that was updated. Sleeping entities
+        # are skipped since their frame cache was cleared the last time they
+        # were awake and only their own update fills it
+        self.player.update_complete()
+        for entity in awake:
+            entity.update_complete()
+
+    def get_awake_entities(self):
+        '''
+        Get the entities that should be updated this frame. Those in
+        or near the camera's view and any that are always simulated
+        '''
+        region = self.camera.viewport(self.game_engine.config.activation_margin)
+
+        awake = []
+        for entity in self.entities.simulation_candidates(region):
+            if entity is self.player:
+                continue
+            if entity.always_simulate or region.colliderect(entity.rect):
+                awake.append(entity)
+        return awake
 
     def draw(self, screen):
         '''
@@ -403,10 +545,11 @@ class Level:
         '''
 
         # Draw the background
-        screen.fill((0, 0, 200)) #TODO: Make this a background image of some sort
+        screen.fill(self.background_color)
 
         # Draw the sprites in proper order so layers look right
-        for e in self.platforms:
+        self.tile_layer.draw(screen, self.camera)
+        for e in self.unbaked_platforms:
             screen.blit(e.image, self.camera.apply(e))
         for e in self.code_blocks:
             screen.blit(e.image, self.camera.apply(e))
@@ -447,6 +590,7 @@ class Level:
 
                 if event.sprite.is_collideable():
                     self.collideable_entities.remove(event.sprite)
+                    self.tile_map.remove(event.sprite)
                 if event.sprite.is_interactable():
                     self.interactable_blocks.remove(event.sprite)
             else:
@@ -0,0 +1,115 @@
+'''
+Builds levels on demand and prefetches the next one in the background
+'''
+
+import os
+import logging
+import threading
+
+from deploy import SiteDeployment
+from jackit.core.animation import SpriteCache, SpriteSheetError
+
+logger = logging.getLogger(__name__)
+
+class LevelCache:
+    '''
+    Holds a factory for each level and only builds a level when it's needed.
+    Indexing works like the old list of levels. While a level is being played
+    the next one can be prefetched: its object is built and its map is parsed
+    on a background thread. Sprite sheets are loaded and converted on the
+    calling thread since pygame surfaces aren't safe to create off the main thread.
+    '''
+    def __init__(self, game_engine, player, factories):
+        self.game_engine = game_engine
+        self.player = player
+        self.factories = list(factories)
+
+        # Map of level index -> built level
+        self.levels = {}
+
+        # Background thread preparing a prefetched level
+        self.prefetch_thread = None
+
+    def __len__(self):
+        return len(self.factories)
+
+    def __getitem__(self, index):
+        '''
+        Get the level at index. Builds it if it hasn't been prefetched
+        '''
+        self.wait()
+
+        level = self.levels.get(index, None)
+        if level is None:
+            level = self.build(index)
+        return level
+
+    def build(self, index):
+        '''
+        Build the level at index on the calling thread
+        '''
+        # Levels format their challenge text from the player's stats. Turn
+        # off the user's patches so the text always has the original values
+        use_patch = self.player.use_patch
+        self.player.use_patch = False
+        try:
+            level = self.factories[index](self.game_engine, self.player)
+        finally:
+            self.player.use_patch = use_patch
+
+        self.levels[index] = level
+        return level
+
+    def prefetch(self, index):
+        '''
+        Build the level at index and start preparing it in the background
+        '''
+        if index < 0 or index >= len(self.factories) or index in self.levels:
+            return
+
+        self.wait()
+
+        # Sheets are only loaded the first time so this is free after the first level
+        try:
+            SpriteCache.preload(os.path.join(SiteDeployment.resource_path, "sprites"))
+        except (IOError, OSError, SpriteSheetError) as e:
+            # Not fatal. Sheets that didn't load are loaded when they're used
+            logger.exception("Failed to preload sprite sheets: %s", str(e))
+
+        level = self.build(index)
+        self.prefetch_thread = threading.Thread(target=self.prepare, args=(level,))
+        self.prefetch_thread.daemon = True
+        self.prefetch_thread.start()
+
+    @staticmethod
+    def prepare(level):
+        '''
+        Load the compiled level map and spawn table. Runs on the prefetch thread
+        '''
+        try:
+            level.prepare()
+        except BaseException as e:
+            # Not fatal. Whatever didn't get done happens when the level loads
+            logger.exception("Failed to prefetch level: %s", str(e))
+
+    def wait(self):
+        '''
+        Wait for the prefetch thread to finish if it's running
+        '''
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.join()
+            self.prefetch_thread = None
+
+    def release(self, index):
+        '''
+        Drop the level at index so its objects can be freed
+        '''
+        self.wait()
+        self.levels.pop(index, None)
+
+    def clear(self):
+        '''
+        Drop every built level
+        '''
+        self.wait()
+        self.levels.clear()
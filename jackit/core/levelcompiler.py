@@ -0,0 +1,190 @@
+'''
+Compiles level maps into a compact binary form that is cached on disk.
+
+Precompile every level with:
+    python -m jackit.core.levelcompiler
+'''
+
+import os
+import sys
+import struct
+import hashlib
+import logging
+
+import numpy
+
+from deploy import SiteDeployment
+from jackit.core import BLOCK_WIDTH, BLOCK_HEIGHT
+
+logger = logging.getLogger(__name__)
+
+class LevelCompilerError(Exception):
+    '''
+    Error compiling a level map or reading a compiled level
+    '''
+    pass
+
+class CompiledLevel:
+    '''
+    A level map stored as a 2D array of map character codes indexed [row, column]
+    with 0 for empty cells. Also has the level size and death zone in pixels.
+
+    File format (little endian):
+        magic, version, block width, block height, columns, rows,
+        death zone (left, top, width, height), then rows * columns bytes of tiles
+    '''
+    MAGIC = b"JKLV"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHHII4i")
+
+    def __init__(self, tiles, block_width=BLOCK_WIDTH, block_height=BLOCK_HEIGHT):
+        self.tiles = tiles
+        self.block_width = block_width
+        self.block_height = block_height
+
+        self.rows, self.columns = tiles.shape
+        self.width = self.columns * block_width
+        self.height = self.rows * block_height
+
+        # A rect 50 pixels bigger on all sides than the level
+        self.death_zone = (-50, -50, self.width + 50, self.height + 50)
+
+    @classmethod
+    def from_map(cls, level_map, block_width=BLOCK_WIDTH, block_height=BLOCK_HEIGHT):
+        '''
+        Compile a level map (list of strings). Short rows are padded with empty cells
+        '''
+        columns = len(max(level_map, key=len)) if level_map else 0
+        tiles = numpy.zeros((len(level_map), columns), dtype=numpy.uint8)
+
+        for row, line in enumerate(level_map):
+            try:
+                codes = numpy.frombuffer(line.encode("ascii"), dtype=numpy.uint8)
+            except UnicodeEncodeError:
+                raise LevelCompilerError("Non ASCII character in row {} of level map".format(row))
+            tiles[row, :len(codes)] = codes
+
+        # Spaces are empty cells
+        tiles[tiles == ord(" ")] = 0
+        return cls(tiles, block_width, block_height)
+
+    @classmethod
+    def read(cls, path, mmap_threshold=65536):
+        '''
+        Read a compiled level. Tile arrays bigger than mmap_threshold
+        bytes are memory mapped instead of read into memory
+        '''
+        with open(path, "rb") as fh:
+            header = fh.read(cls.HEADER.size)
+            if len(header) != cls.HEADER.size:
+                raise LevelCompilerError("Truncated compiled level: {}".format(path))
+
+            magic, version, block_width, block_height, columns, rows, *_ = cls.HEADER.unpack(header)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise LevelCompilerError("Not a compiled level or wrong version: {}".format(path))
+
+            if rows * columns > mmap_threshold:
+                tiles = numpy.memmap(
+                    path, dtype=numpy.uint8, mode="r",
+                    offset=cls.HEADER.size, shape=(rows, columns)
+                )
+            else:
+                tiles = numpy.fromfile(fh, dtype=numpy.uint8, count=rows * columns)
+                if tiles.size != rows * columns:
+                    raise LevelCompilerError("Truncated compiled level: {}".format(path))
+                tiles = tiles.reshape((rows, columns))
+
+        return cls(tiles, block_width, block_height)
+
+    def write(self, path):
+        '''
+        Write the compiled level. Written to a temp file first so
+        readers never see a partial file
+        '''
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as fh:
+            fh.write(self.HEADER.pack(
+                self.MAGIC, self.VERSION, self.block_width, self.block_height,
+                self.columns, self.rows, *self.death_zone
+            ))
+            fh.write(numpy.ascontiguousarray(self.tiles, dtype=numpy.uint8).tobytes())
+        os.replace(tmp_path, path)
+
+    def spawn_table(self):
+        '''
+        Get (map character, x, y) for every non-empty cell in the order they appear in the map
+        '''
+        rows, cols = numpy.nonzero(self.tiles)
+        codes = self.tiles[rows, cols].tolist()
+        xs = (cols * self.block_width).tolist()
+        ys = (rows * self.block_height).tolist()
+        return [(chr(code), x_pos, y_pos) for code, x_pos, y_pos in zip(codes, xs, ys)]
+
+class LevelCompiler:
+    '''
+    Compiles level maps and caches the result in a directory.
+    Files are named by a hash of the map so edited maps are recompiled
+    '''
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir if cache_dir is not None else\
+                         os.path.join(SiteDeployment.cache_path, "levels")
+
+    @staticmethod
+    def map_hash(level_map, block_width=BLOCK_WIDTH, block_height=BLOCK_HEIGHT):
+        '''
+        Hash of everything that goes into a compiled level
+        '''
+        key = hashlib.sha1()
+        key.update("{}:{}:{}\n".format(CompiledLevel.VERSION, block_width, block_height).encode())
+        key.update("\n".join(level_map).encode("utf-8"))
+        return key.hexdigest()
+
+    def cache_file(self, level_map):
+        '''
+        Path of the cached compiled form of a level map
+        '''
+        return os.path.join(self.cache_dir, "{}.jkl".format(self.map_hash(level_map)))
+
+    def compile(self, level_map):
+        '''
+        Compile a level map and write it to the cache
+        '''
+        compiled = CompiledLevel.from_map(level_map)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            compiled.write(self.cache_file(level_map))
+        except OSError as e:
+            # Not fatal. The level just gets compiled again next time
+            logger.warning("Failed to cache compiled level: %s", str(e))
+        return compiled
+
+    def load(self, level_map):
+        '''
+        Get the compiled form of a level map. Reads it from the cache if it's
+        there and compiles it otherwise
+        '''
+        path = self.cache_file(level_map)
+        if os.path.exists(path):
+            try:
+                return CompiledLevel.read(path)
+            except (OSError, ValueError, LevelCompilerError) as e:
+                logger.warning("Recompiling level. Bad cache file %s: %s", path, str(e))
+        return self.compile(level_map)
+
+# Compiler for the game's levels. Uses the site cache directory
+CompiledLevels = LevelCompiler()
+
+def main():
+    '''
+    Precompile every level in jackit.levels
+    '''
+    from jackit.levels import LEVELS
+
+    for level in LEVELS:
+        level_map = getattr(level, "_map")
+        CompiledLevels.compile(level_map)
+        print("{}: {}".format(level.__name__, CompiledLevels.cache_file(level_map)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,10 @@
 The callbacks that the user can patch
 '''
 
+import time
+from jackit.core.folding import fold_patches
+from jackit.core.watchdog import PatchWatchdog
+
 class PatchError(Exception):
     '''
     Something went wrong with the user's patch
@@ -27,6 +31,26 @@ class UserPatchSingleton:
     def __init__(self):
         self.patch_map = {}
 
+        # Patches folded into a constant value or a comparison with a constant.
+        # Used instead of calling the user's function
+        self.constants = {}
+        self.predicates = {}
+
+        # {function name: FoldedPatch} for the code being patched in
+        self.folded = {}
+
+        # Bumped whenever the patches change so values resolved from them can be cached
+        self.version = 0
+
+        # Keeps patched methods within their time budget
+        self.watchdog = PatchWatchdog()
+
+        # Descriptions of patches removed for going over budget, not shown to the player yet
+        self.removed = []
+
+        # PatchProfiler recording calls to patched methods. None when profiling is off
+        self.profiler = None
+
     def patch_method(self, method_name, cb, valid_ret_types, *args):
         '''
         Patch the method with the provided callback
@@ -36,7 +60,9 @@ class UserPatchSingleton:
         # Test the method and return value so we don't have to wrap it
         # in a try catch and test the return on each frame
         try:
-            ret = cb(*args)
+            ret, violation = self.watchdog.call(method_name, cb, *args, count_frame=False)
+            if violation is not None:
+                raise PatchError("Too slow. " + violation)
             for rtype in valid_ret_types:
                 if isinstance(ret, rtype):
                     valid = True
@@ -46,24 +72,102 @@ class UserPatchSingleton:
         except BaseException as e:
             raise PatchError("Your code is bad and you should be sad about it: {}".format(e))
 
-        if hasattr(self, method_name):
+        if not hasattr(self, method_name):
+            raise PatchError("Trying to patch a method that doesn't exist'")
+
+        self.patch_map.pop(method_name, None)
+        self.constants.pop(method_name, None)
+        self.predicates.pop(method_name, None)
+
+        folded = self.get_folded(cb)
+        if folded is None:
             self.patch_map[method_name] = cb
+        elif folded.predicate is None:
+            self.constants[method_name] = folded.constant
         else:
-            raise PatchError("Trying to patch a method that doesn't exist'")
+            self.predicates[method_name] = folded.predicate
+        self.version += 1
+
+    def fold(self, source):
+        '''
+        Find the functions in source that can be folded. Call before
+        patching methods with functions from source
+        '''
+        self.folded = fold_patches(source) if source else {}
+
+    def get_folded(self, cb):
+        '''
+        Get the FoldedPatch for a callback if it's a function folded from the user's code
+        '''
+        folded = self.folded.get(getattr(cb, "__name__", None), None)
+        code = getattr(cb, "__code__", None)
+        if folded is None or code is None or code.co_filename != "<string>" or\
+           code.co_firstlineno != folded.lineno:
+            return None
+        return folded
 
     def unpatch(self):
         '''
         Unpatch all the patched methods
         '''
         self.patch_map = {}
+        self.constants = {}
+        self.predicates = {}
+        self.version += 1
 
     def call_patch(self, method_name, *args):
         '''
-        Call a patched method if it exists
+        Call a patched method if it exists. Patches that go over their time
+        budget are removed and the unpatched value is used. The unpatched
+        value is also used for calls skipped after the frame ran out of time
+        '''
+        if method_name in self.constants:
+            return self.constants[method_name]
+
+        predicate = self.predicates.get(method_name, None)
+        if predicate is not None:
+            return predicate(*args)
+
+        cb = self.patch_map.get(method_name, None)
+        if cb is None:
+            return None
+
+        ret, violation = self.watchdog.call(method_name, cb, *args)
+        if violation is not None:
+            self.patch_map.pop(method_name, None)
+            self.version += 1
+            self.removed.append(violation)
+        return ret
+
+    def profiled_call_patch(self, method_name, *args):
+        '''
+        call_patch that records the call in the profiler. Only used while profiling
+        '''
+        start = time.perf_counter()
+        try:
+            return UserPatchSingleton.call_patch(self, method_name, *args)
+        finally:
+            self.profiler.record(method_name, (time.perf_counter() - start) * 1000.0)
+
+    def set_profiler(self, profiler):
+        '''
+        Start recording calls to patched methods in profiler, or stop if it's None.
+        call_patch is swapped out rather than checking for a profiler on every call
+        so profiling costs nothing while it's off
+        '''
+        self.profiler = profiler
+        if profiler is not None:
+            self.call_patch = self.profiled_call_patch
+        else:
+            self.__dict__.pop("call_patch", None)
+
+    def pop_removed(self):
+        '''
+        Get the descriptions of the patches removed since the last call
         '''
-        if self.patch_map.get(method_name, None) is not None:
-            return self.patch_map[method_name](*args)
-        return None
+        ret = self.removed
+        self.removed = []
+        return ret
 
     def get_top_speed(self):
         '''
@@ -2,13 +2,36 @@
 Basic physics for the game.
 '''
 
+from collections import namedtuple
 from jackit.core.patch import UserPatch
 
+# Resolved physics values. What actors read each frame
+PhysicsSnapshot = namedtuple("PhysicsSnapshot", [
+    "x_acceleration", "x_deceleration", "top_speed", "jump_speed", "air_braking",
+    "grav_acceleration", "grav_deceleration", "grav_high_jump", "terminal_velocity"
+])
+
+# Snapshot version for a snapshot that has to be resolved again on next use
+STALE = object()
+
 class Physics:
     '''
     Basic physics for an object in the game. Not all values are used by all things
     that require physics. (e.g. not everything jumps)
     '''
+
+    # Values the user can patch and the UserPatch getter for each
+    PATCHED_VALUES = (
+        ("x_acceleration", "get_x_acceleration"),
+        ("x_deceleration", "get_x_deceleration"),
+        ("top_speed", "get_top_speed"),
+        ("jump_speed", "get_jump_speed"),
+        ("grav_acceleration", "get_grav_acceleration"),
+        ("grav_deceleration", "get_grav_deceleration"),
+        ("grav_high_jump", "get_grav_high_jump"),
+        ("terminal_velocity", "get_terminal_velocity")
+    )
+
     def __init__(self, x_acceleration=0.65, x_deceleration=0.9, top_speed=6,
                  jump_speed=8, air_braking=0.15, grav_acceleration=1.05,
                  grav_deceleration=0.55, grav_high_jump=0.25, terminal_velocity=20
@@ -27,7 +50,7 @@ class Physics:
         self._jump_speed = jump_speed
 
         # Ability to slow horizontal momentum while airborne
-        self.air_braking = air_braking
+        self._air_braking = air_braking
 
         # Force of gravity while actor is descending
         self._grav_acceleration = grav_acceleration
@@ -44,138 +67,137 @@ class Physics:
         # True if patch methods should be used
         self.use_patch = False
 
+        # Last resolved PhysicsSnapshot and the UserPatch version it was resolved
+        # at (None if it was resolved without patches)
+        self._snapshot = None
+        self._snapshot_version = None
+
+    def resolve(self):
+        '''
+        Get a PhysicsSnapshot of the values with the user's patches applied.
+        The patched getters take no arguments so they're only called again
+        when the patches or the values change, or when a getter was skipped
+        because the frame ran out of time for patches
+        '''
+        version = UserPatch.version if self.use_patch else None
+        if self._snapshot is None or self._snapshot_version != version:
+            skipped = UserPatch.watchdog.skipped
+            self._snapshot = self.snapshot()
+            self._snapshot_version = version if UserPatch.watchdog.skipped == skipped else STALE
+        return self._snapshot
+
+    def snapshot(self):
+        '''
+        Resolve every value. Patched getters that return None use the actor's value
+        '''
+        values = {"air_braking": self._air_braking}
+        for name, getter in Physics.PATCHED_VALUES:
+            ret = getattr(UserPatch, getter)() if self.use_patch else None
+            values[name] = getattr(self, "_" + name) if ret is None else ret
+        return PhysicsSnapshot(**values)
+
+    def set_value(self, name, value):
+        '''
+        Set one of the values and resolve again on next use
+        '''
+        setattr(self, "_" + name, value)
+        self._snapshot = None
+
     @property
     def terminal_velocity(self):
         '''
-        Getter for _terminal_velocity - Calls the patched version if it exists
+        Getter for _terminal_velocity - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._terminal_velocity
-
-        ret = UserPatch.get_terminal_velocity()
-        if ret is None:
-            return self._terminal_velocity
-        return ret
+        return self.resolve().terminal_velocity
 
     @terminal_velocity.setter
     def terminal_velocity(self, value):
-        self._terminal_velocity = value
+        self.set_value("terminal_velocity", value)
 
     @property
     def grav_acceleration(self):
         '''
-        Getter for _grav_acceleration - Calls the patched version if it exists
+        Getter for _grav_acceleration - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._grav_acceleration
-
-        ret = UserPatch.get_grav_acceleration()
-        if ret is None:
-            return self._grav_acceleration
-        return ret
+        return self.resolve().grav_acceleration
 
     @grav_acceleration.setter
     def grav_acceleration(self, value):
-        self._grav_acceleration = value
+        self.set_value("grav_acceleration", value)
 
     @property
     def grav_deceleration(self):
         '''
-        Getter for _grav_deceleration - Calls the patched version if it exists
+        Getter for _grav_deceleration - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._grav_deceleration
-
-        ret = UserPatch.get_grav_deceleration()
-        if ret is None:
-            return self._grav_deceleration
-        return ret
+        return self.resolve().grav_deceleration
 
     @grav_deceleration.setter
     def grav_deceleration(self, value):
-        self._grav_deceleration = value
+        self.set_value("grav_deceleration", value)
 
     @property
     def grav_high_jump(self):
         '''
-        Getter for _grav_high_jump - Calls the patched version if it exists
+        Getter for _grav_high_jump - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._grav_high_jump
-
-        ret = UserPatch.get_grav_high_jump()
-        if ret is None:
-            return self._grav_high_jump
-        return ret
+        return self.resolve().grav_high_jump
 
     @grav_high_jump.setter
     def grav_high_jump(self, value):
-        self._grav_high_jump = value
+        self.set_value("grav_high_jump", value)
 
     @property
     def x_acceleration(self):
         '''
-        Getter for _x_acceleration - Calls the patched version if it exists
+        Getter for _x_acceleration - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._x_acceleration
-
-        ret = UserPatch.get_x_acceleration()
-        if ret is None:
-            return self._x_acceleration
-        return ret
+        return self.resolve().x_acceleration
 
     @x_acceleration.setter
     def x_acceleration(self, value):
-        self._x_acceleration = value
+        self.set_value("x_acceleration", value)
 
     @property
     def x_deceleration(self):
         '''
-        Getter for _x_deceleration - Calls the patched version if it exists
+        Getter for _x_deceleration - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._x_deceleration
-
-        ret = UserPatch.get_x_deceleration()
-        if ret is None:
-            return self._x_deceleration
-        return ret
+        return self.resolve().x_deceleration
 
     @x_deceleration.setter
     def x_deceleration(self, value):
-        self._x_deceleration = value
+        self.set_value("x_deceleration", value)
 
     @property
     def top_speed(self):
         '''
-        Getter for _top_speed - Calls the patched version if it exists
+        Getter for _top_speed - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._top_speed
-
-        ret = UserPatch.get_top_speed()
-        if ret is None:
-            return self._top_speed
-        return ret
+        return self.resolve().top_speed
 
     @top_speed.setter
     def top_speed(self, value):
-        self._top_speed = value
+        self.set_value("top_speed", value)
 
     @property
     def jump_speed(self):
         '''
-        Getter for _jump_speed - Calls the patched version if it exists
+        Getter for _jump_speed - Uses the patched version if it exists
         '''
-        if not self.use_patch:
-            return self._jump_speed
-
-        ret = UserPatch.get_jump_speed()
-        if ret is None:
-            return self._jump_speed
-        return ret
+        return self.resolve().jump_speed
 
     @jump_speed.setter
     def jump_speed(self, value):
-        self._jump_speed = value
+        self.set_value("jump_speed", value)
+
+    @property
+    def air_braking(self):
+        '''
+        Getter for _air_braking. Can't be patched
+        '''
+        return self.resolve().air_braking
+
+    @air_braking.setter
+    def air_braking(self, value):
+        self.set_value("air_braking", value)
@@ -0,0 +1,209 @@
+'''
+Per-frame timing of the game loop's subsystems
+'''
+
+import csv
+import json
+import time
+import numpy
+import pygame
+
+class FrameProfiler:
+    '''
+    Times each phase of a frame and keeps the last size frames in a ring buffer.
+    Call begin_frame() at the start of a frame, mark(phase) after each phase
+    and end_frame() once the frame is done. Frames that aren't ended are
+    overwritten by the next one.
+    '''
+    def __init__(self, phases, size=600):
+        self.phases = tuple(phases)
+        self.phase_index = {phase: i for i, phase in enumerate(self.phases)}
+        self.size = size
+
+        # Milliseconds spent in each phase indexed [frame, phase]
+        self.samples = numpy.zeros((size, len(self.phases)), dtype=numpy.float64)
+
+        # Row the current frame is written to and number of frames recorded
+        self.index = 0
+        self.count = 0
+
+        self.last_mark = 0
+
+        # Overlay state. The percentiles are only recomputed every
+        # refresh_frames frames so the overlay doesn't cost much
+        self.visible = False
+        self.refresh_frames = 30
+        self.overlay_lines = []
+        self.font = None
+
+    def begin_frame(self):
+        '''
+        Start timing a new frame
+        '''
+        self.samples[self.index] = 0
+        self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        '''
+        Add the time since the last mark to phase
+        '''
+        now = time.perf_counter()
+        self.samples[self.index, self.phase_index[phase]] += (now - self.last_mark) * 1000.0
+        self.last_mark = now
+
+    def end_frame(self):
+        '''
+        Finish the current frame
+        '''
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+        if self.visible and self.index % self.refresh_frames == 0:
+            self.overlay_lines = self.format_percentiles()
+
+    def frames(self):
+        '''
+        Get the recorded frames oldest first
+        '''
+        if self.count < self.size:
+            return self.samples[:self.count]
+        return numpy.roll(self.samples, -self.index, axis=0)
+
+    def percentiles(self, percents=(50, 95, 99)):
+        '''
+        Get {phase: [percentile, ...]} in milliseconds including the total frame time
+        '''
+        frames = self.frames()
+        if len(frames) == 0:
+            return {}
+
+        values = numpy.percentile(frames, percents, axis=0)
+        totals = numpy.percentile(frames.sum(axis=1), percents)
+
+        ret = {phase: values[:, i].tolist() for i, phase in enumerate(self.phases)}
+        ret["total"] = totals.tolist()
+        return ret
+
+    def format_percentiles(self):
+        '''
+        Lines of text for the overlay
+        '''
+        lines = ["{:<16}{:>8}{:>8}{:>8}".format("phase (ms)", "p50", "p95", "p99")]
+        for phase, values in self.percentiles().items():
+            lines.append("{:<16}{:>8.2f}{:>8.2f}{:>8.2f}".format(phase, *values))
+        return lines
+
+    def toggle(self):
+        '''
+        Show or hide the overlay
+        '''
+        self.visible = not self.visible
+        if self.visible:
+            self.overlay_lines = self.format_percentiles()
+
+    def draw(self, screen):
+        '''
+        Draw the overlay if it's visible. The time it takes isn't counted in any phase
+        '''
+        if not self.visible:
+            return
+
+        start = time.perf_counter()
+
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("Courier", 14)
+
+        line_height = self.font.get_linesize()
+        y_pos = screen.get_height() - (line_height * len(self.overlay_lines))
+        for line in self.overlay_lines:
+            screen.blit(self.font.render(line, True, (255, 255, 0), (0, 0, 0)), (0, y_pos))
+            y_pos += line_height
+
+        self.last_mark += time.perf_counter() - start
+
+    def dump(self, path):
+        '''
+        Write the recorded frames to path. JSON if path ends in .json otherwise CSV
+        '''
+        frames = self.frames()
+        if path.lower().endswith(".json"):
+            with open(path, "w") as fh:
+                json.dump({
+                    "phases": list(self.phases),
+                    "frames": frames.tolist(),
+                    "percentiles": self.percentiles()
+                }, fh, indent=4)
+        else:
+            with open(path, "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(self.phases)
+                writer.writerows(frames.tolist())
+
+class PatchProfiler:
+    '''
+    Counts calls to the user's patched methods and the time spent in them,
+    per frame and since the last reset (e.g. for the whole level).
+    Call begin_frame() at the start of a frame and record() after each call
+    '''
+    def __init__(self):
+        # {method name: [calls, milliseconds]} since the last reset
+        self.methods = {}
+
+        # Calls and milliseconds in the current and the last finished frame
+        self.frame_calls = 0
+        self.frame_time = 0.0
+        self.last_frame_calls = 0
+        self.last_frame_time = 0.0
+
+        # Frames since the last reset
+        self.frames = 0
+
+    def begin_frame(self):
+        '''
+        Finish the current frame's totals and start new ones
+        '''
+        self.last_frame_calls = self.frame_calls
+        self.last_frame_time = self.frame_time
+        self.frame_calls = 0
+        self.frame_time = 0.0
+        self.frames += 1
+
+    def record(self, method_name, elapsed):
+        '''
+        Add a call to method_name that took elapsed milliseconds
+        '''
+        stats = self.methods.get(method_name, None)
+        if stats is None:
+            stats = self.methods[method_name] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        self.frame_calls += 1
+        self.frame_time += elapsed
+
+    def reset(self):
+        '''
+        Forget everything recorded so far
+        '''
+        self.methods = {}
+        self.frame_calls = 0
+        self.frame_time = 0.0
+        self.last_frame_calls = 0
+        self.last_frame_time = 0.0
+        self.frames = 0
+
+    def format_frame(self):
+        '''
+        One line with the last frame's totals for the overlay
+        '''
+        return "Patches: {} calls {:.3f}ms last frame".format(self.last_frame_calls, self.last_frame_time)
+
+    def summary(self):
+        '''
+        Lines of text with the totals for each method, most time first
+        '''
+        lines = ["{:<24}{:>10}{:>12}{:>12}".format("patch", "calls", "total (ms)", "per call")]
+        ranked = sorted(self.methods.items(), key=lambda item: item[1][1], reverse=True)
+        for method_name, (calls, elapsed) in ranked:
+            lines.append("{:<24}{:>10}{:>12.3f}{:>12.4f}".format(method_name, calls, elapsed, elapsed / calls))
+        return lines
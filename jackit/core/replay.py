@@ -0,0 +1,198 @@
+'''
+Records the player's input to a compact binary log and plays it back
+'''
+
+import struct
+import logging
+import pygame
+
+logger = logging.getLogger(__name__)
+
+# Event types that come from the player. Everything else is posted by the game
+# itself and happens again on its own when a log is replayed
+RECORDED_EVENTS = (pygame.KEYDOWN, pygame.KEYUP)
+
+class ReplayError(Exception):
+    '''
+    Error reading or writing an input log
+    '''
+    pass
+
+class ReplayLog:
+    '''
+    Input log file format (little endian)
+
+    Header: magic, version, RNG seed, frame time in milliseconds
+    Followed by records that start with a kind and a frame number:
+        EVENT: event type code, key, key modifiers
+        PATCH: length then UTF-8 text of a patch the player submitted
+        END:   frame is the number of frames recorded
+    Frames without input don't have any records
+    '''
+    MAGIC = b"JKRP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHId")
+    RECORD = struct.Struct("<BI")
+    EVENT = struct.Struct("<BiH")
+    LENGTH = struct.Struct("<I")
+
+    EVENT_RECORD = 1
+    PATCH_RECORD = 2
+    END_RECORD = 3
+
+    # Map of pygame event type <-> code stored in the log
+    EVENT_CODES = {pygame.KEYDOWN: 1, pygame.KEYUP: 2}
+    EVENT_TYPES = {code: event_type for event_type, code in EVENT_CODES.items()}
+
+class KeyState:
+    '''
+    Keys held down tracked from key events. Indexed like pygame.key.get_pressed()
+    so a recording and its replay see exactly the same state
+    '''
+    def __init__(self):
+        self.pressed = set()
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+    def update(self, events):
+        '''
+        Update the state from a frame of events
+        '''
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self.pressed.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.pressed.discard(event.key)
+
+class InputRecorder:
+    '''
+    Writes the player's input to a log as the game runs
+    '''
+    def __init__(self, path, seed, frame_time):
+        self.path = path
+        self.fh = open(path, "wb")
+        self.fh.write(ReplayLog.HEADER.pack(
+            ReplayLog.MAGIC, ReplayLog.VERSION, seed, frame_time))
+
+    def record(self, frame, events):
+        '''
+        Record the player's events for a frame
+        '''
+        for event in events:
+            self.fh.write(ReplayLog.RECORD.pack(ReplayLog.EVENT_RECORD, frame))
+            self.fh.write(ReplayLog.EVENT.pack(
+                ReplayLog.EVENT_CODES[event.type], event.key, getattr(event, "mod", 0)))
+
+    def record_patch(self, frame, text):
+        '''
+        Record the text of a patch the player submitted
+        '''
+        data = text.encode("utf-8")
+        self.fh.write(ReplayLog.RECORD.pack(ReplayLog.PATCH_RECORD, frame))
+        self.fh.write(ReplayLog.LENGTH.pack(len(data)))
+        self.fh.write(data)
+
+    def close(self, frames):
+        '''
+        Finish the log. frames is the number of frames that were played
+        '''
+        if self.fh is None:
+            return
+        self.fh.write(ReplayLog.RECORD.pack(ReplayLog.END_RECORD, frames))
+        self.fh.close()
+        self.fh = None
+
+class InputReplay:
+    '''
+    Reads an input log and hands back the recorded events frame by frame
+    '''
+    def __init__(self, path):
+        self.path = path
+
+        # Map of frame -> list of (event type, key, mod)
+        self.frames = {}
+
+        # List of (frame, text) of patches in the order they were submitted
+        self.patches = []
+        self.next_patch = 0
+
+        # Number of frames in the log. Set by the END record
+        self.length = None
+
+        with open(path, "rb") as fh:
+            self.read(fh.read())
+
+    def read(self, data):
+        '''
+        Parse the log
+        '''
+        offset = self.unpack(ReplayLog.HEADER, data, 0)
+        magic, version, self.seed, self.frame_time = ReplayLog.HEADER.unpack_from(data, 0)
+        if magic != ReplayLog.MAGIC or version != ReplayLog.VERSION:
+            raise ReplayError("Not an input log or wrong version: {}".format(self.path))
+
+        while offset < len(data):
+            kind, frame = ReplayLog.RECORD.unpack_from(data, offset)
+            offset = self.unpack(ReplayLog.RECORD, data, offset)
+
+            if kind == ReplayLog.EVENT_RECORD:
+                code, key, mod = ReplayLog.EVENT.unpack_from(data, offset)
+                offset = self.unpack(ReplayLog.EVENT, data, offset)
+                self.frames.setdefault(frame, []).append((ReplayLog.EVENT_TYPES[code], key, mod))
+            elif kind == ReplayLog.PATCH_RECORD:
+                length, = ReplayLog.LENGTH.unpack_from(data, offset)
+                offset = self.unpack(ReplayLog.LENGTH, data, offset)
+                self.patches.append((frame, data[offset:offset + length].decode("utf-8")))
+                offset += length
+            elif kind == ReplayLog.END_RECORD:
+                self.length = frame
+                break
+            else:
+                raise ReplayError("Unknown record in input log: {}".format(kind))
+
+        if self.length is None:
+            # The game didn't exit cleanly. Play whatever was recorded
+            logger.warning("Input log %s has no end record", self.path)
+            self.length = max(list(self.frames) + [frame for frame, _ in self.patches] + [0]) + 1
+
+    def unpack(self, fmt, data, offset):
+        '''
+        Check there is room for fmt at offset and get the offset after it
+        '''
+        if offset + fmt.size > len(data):
+            raise ReplayError("Truncated input log: {}".format(self.path))
+        return offset + fmt.size
+
+    def events(self, frame):
+        '''
+        Get the recorded events for a frame as pygame events
+        '''
+        return [
+            pygame.event.Event(event_type, {"key": key, "mod": mod})
+            for event_type, key, mod in self.frames.get(frame, ())
+        ]
+
+    def check_patch(self, frame, text):
+        '''
+        Compare a patch submitted during the replay to the recording.
+        Returns False if the replay has gone out of sync
+        '''
+        if self.next_patch >= len(self.patches):
+            logger.warning("Replay out of sync. Unexpected patch on frame %d", frame)
+            return False
+
+        expected_frame, expected_text = self.patches[self.next_patch]
+        self.next_patch += 1
+        if expected_frame != frame or expected_text != text:
+            logger.warning(
+                "Replay out of sync. Patch on frame %d was recorded on frame %d",
+                frame, expected_frame)
+            return False
+        return True
+
+    def is_finished(self, frame):
+        '''
+        True once every recorded frame has been played
+        '''
+        return frame >= self.length
@@ -0,0 +1,104 @@
+'''
+Uniform grid spatial hash for fast collision queries
+'''
+
+class SpatialHash:
+    '''
+    Buckets sprites into fixed size grid cells so collision queries
+    only have to look at the sprites near a rect instead of every sprite.
+    Each sprite is stored with a sequence number so query results can be
+    returned in the same order the sprites were added.
+    '''
+    def __init__(self, cell_width, cell_height):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+        # Map of (column, row) -> set of sprites overlapping that cell
+        self.cells = {}
+
+        # Map of sprite -> list of cells it was added to
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, sprite):
+        return sprite in self.entries
+
+    def cell_range(self, rect):
+        '''
+        Get the (left, top, right, bottom) columns and rows the rect overlaps, inclusive
+        '''
+        left = rect.left // self.cell_width
+        top = rect.top // self.cell_height
+
+        # A zero sized rect still lives in the cell its corner is in
+        right = max(left, (rect.right - 1) // self.cell_width)
+        bottom = max(top, (rect.bottom - 1) // self.cell_height)
+
+        return left, top, right, bottom
+
+    def cells_for_rect(self, rect):
+        '''
+        Get the (column, row) of every cell the rect overlaps
+        '''
+        left, top, right, bottom = self.cell_range(rect)
+        return [(col, row) for col in range(left, right + 1) for row in range(top, bottom + 1)]
+
+    def add(self, sprite):
+        '''
+        Add a sprite to every cell its rect overlaps. The sprite
+        must not move while it's in the hash.
+        '''
+        if sprite in self.entries:
+            self.remove(sprite)
+
+        cells = self.cells_for_rect(sprite.rect)
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(sprite)
+        self.entries[sprite] = cells
+
+    def remove(self, sprite):
+        '''
+        Remove a sprite from the hash if it's there
+        '''
+        cells = self.entries.pop(sprite, None)
+        if cells is None:
+            return
+
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.discard(sprite)
+            if not bucket:
+                del self.cells[cell]
+
+    def clear(self):
+        '''
+        Remove all sprites from the hash
+        '''
+        self.cells.clear()
+        self.entries.clear()
+
+    def query(self, rect):
+        '''
+        Get the set of sprites in any cell the rect overlaps.
+        Sprites returned may not actually collide with the rect.
+        '''
+        left, top, right, bottom = self.cell_range(rect)
+
+        found = set()
+        if (right - left + 1) * (bottom - top + 1) > len(self.cells):
+            # Big rect. Cheaper to check the occupied cells than every cell in the rect
+            for (col, row), bucket in self.cells.items():
+                if left <= col <= right and top <= row <= bottom:
+                    found.update(bucket)
+            return found
+
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                bucket = self.cells.get((col, row))
+                if bucket:
+                    found.update(bucket)
+        return found
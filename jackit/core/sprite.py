@@ -7,6 +7,7 @@ import pygame
 from jackit.core import CustomEvent
 from jackit.core.physics import Physics
 from jackit.core.patch import UserPatch
+from jackit.core.spritegroup import SpriteGroup
 
 class Sprite(pygame.sprite.Sprite):
     '''
@@ -61,9 +62,17 @@ class Sprite(pygame.sprite.Sprite):
         # True if the player should collide with this entity
         self.collideable = True
 
+        # True if the sprite never moves from where it's placed. Static sprites
+        # are indexed by the level's spatial hash for faster collision checks
+        self.static = False
+
         # True if any of the sprites from the most recent call to spritecollide() were collideable
         self.any_collideable = False
 
+        # True if the sprite should be updated even when it's far off screen.
+        # Set it before the sprite is added to the level
+        self.always_simulate = False
+
         # List of sprites that this sprite should check for collisions against
         self.collides_with = collides_with
 
@@ -139,6 +148,11 @@ class Sprite(pygame.sprite.Sprite):
         '''
         collided_with = []
         self.any_collideable = False
+
+        # Only check the sprites near us if the group is spatially indexed
+        if isinstance(sprites, SpriteGroup):
+            sprites = sprites.collision_candidates(self.rect)
+
         for sprite in sprites:
             if sprite is self:
                 continue
@@ -189,15 +203,10 @@ class Sprite(pygame.sprite.Sprite):
         if self.frame_cache.get("is_on_collideable", None) != None:
             return True
 
-        # Move down 2 pixels (doesn't work well with 1)
-        self.rect.y += 2
-        collideable_blocks_hit = self.spritecollide(
-            self.game_engine.current_level.collideable_entities,
-            0, 0,
-            trigger_cb=False,
-            only_collideable=True
-        )
-        self.rect.y -= 2 # Reset position after check
+        # Look 2 pixels down (doesn't work well with 1)
+        collideable_blocks_hit = self.game_engine.current_level.tile_map.collideables_in_rect(
+            self.rect.move(0, 2), ignore=self)
+        self.any_collideable = len(collideable_blocks_hit) > 0
 
         for block in collideable_blocks_hit:
             block.collide_with(self)
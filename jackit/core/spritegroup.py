@@ -8,10 +8,87 @@ import pygame
 class SpriteGroup(pygame.sprite.Group):
     '''
     Adds call for update_complete()
+
+    If a spatial hash is provided, static sprites in the group are
+    indexed by it so collision_candidates() only returns sprites near
+    a rect. Sprites that move are always returned as candidates.
     '''
-    def __init__(self):
+    def __init__(self, spatial_hash=None):
+        # Must be setup before the base class adds any sprites
+        self.spatial_hash = spatial_hash
+
+        # Map of sprite -> order it was added to the group. Used to
+        # return collision candidates in group iteration order
+        self.sequence = {}
+        self.next_sequence = 0
+
+        # Sprites that move and can't live in the spatial hash
+        self.dynamic_sprites = set()
+
+        # Sprites that are updated even when they're far off screen
+        self.always_simulated = set()
+
         super(SpriteGroup, self).__init__()
 
+    def add_internal(self, sprite, *args):
+        '''
+        Track insertion order and index the sprite if it's static
+        '''
+        super(SpriteGroup, self).add_internal(sprite, *args)
+
+        if self.spatial_hash is None:
+            return
+
+        self.sequence[sprite] = self.next_sequence
+        self.next_sequence += 1
+
+        if getattr(sprite, "always_simulate", False):
+            self.always_simulated.add(sprite)
+
+        if getattr(sprite, "static", False):
+            self.spatial_hash.add(sprite)
+        else:
+            self.dynamic_sprites.add(sprite)
+
+    def remove_internal(self, sprite):
+        '''
+        Remove the sprite from the spatial hash as well
+        '''
+        super(SpriteGroup, self).remove_internal(sprite)
+
+        if self.spatial_hash is None:
+            return
+
+        self.sequence.pop(sprite, None)
+        self.spatial_hash.remove(sprite)
+        self.dynamic_sprites.discard(sprite)
+        self.always_simulated.discard(sprite)
+
+    def collision_candidates(self, rect):
+        '''
+        Get the sprites that could collide with rect in the same
+        order as iterating the group
+        '''
+        if self.spatial_hash is None:
+            return self.sprites()
+
+        candidates = self.spatial_hash.query(rect)
+        candidates.update(self.dynamic_sprites)
+        return sorted(candidates, key=self.sequence.__getitem__)
+
+    def simulation_candidates(self, rect):
+        '''
+        Get the sprites that could be near rect plus the ones that are
+        always simulated in the same order as iterating the group
+        '''
+        if self.spatial_hash is None:
+            return self.sprites()
+
+        candidates = self.spatial_hash.query(rect)
+        candidates.update(self.dynamic_sprites)
+        candidates.update(self.always_simulated)
+        return sorted(candidates, key=self.sequence.__getitem__)
+
     def update_complete(self):
         '''
         Calls update_complete for each sprite
@@ -0,0 +1,231 @@
+'''
+Sends leaderboard submissions from a background thread
+'''
+
+import time
+import queue
+import logging
+import threading
+import requests
+
+logger = logging.getLogger(__name__)
+
+class SubmissionWorker:
+    '''
+    Runs submissions on a background thread so the game never waits on the
+    network. Submissions are queued with submit() and sent in order through
+    one keep-alive session. Failures are retried with exponential backoff.
+    The outcome of each submission is handed back through poll()
+
+    With a journal, submissions that haven't gone through are flushed from it
+    in batches: when the worker starts, right after anything is sent
+    successfully and otherwise every flush_interval seconds. resolve turns a
+    journal entry into (description, function, args). New submissions are
+    written to the journal on the worker thread so the game never waits on
+    the disk
+    '''
+    def __init__(self, timeout=10, retries=3, backoff=1.0,
+                 journal=None, resolve=None, batch_size=10, flush_interval=30.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.journal = journal
+        self.resolve = resolve
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Queue of (description, function, args, submission id, retry, journal entry)
+        # and queue of results. journal entry is (kind, args) for submissions that
+        # still have to be journaled
+        self.pending = queue.Queue()
+        self.results = queue.Queue()
+
+        # Ids of journaled submissions that are queued so they're never sent twice
+        self.in_flight = set()
+        self.in_flight_lock = threading.Lock()
+
+        # Time of the last journal flush. None to flush as soon as possible
+        self.last_flush = None
+
+        self.session = requests.Session()
+        self.thread = None
+
+        # Set to stop retrying when the game is exiting
+        self.stopping = threading.Event()
+
+    def start(self):
+        '''
+        Start the worker thread
+        '''
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.last_flush = None
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, description, func, *args, submission_id=None, retry=True, journal_entry=None):
+        '''
+        Queue a submission. func is called on the worker thread with args
+        followed by the session and timeout keyword arguments, and submission_id
+        if the submission is journaled. Submissions
+        with the id of one that's already queued are dropped. journal_entry
+        is the (kind, args) to journal the submission under before it's sent
+        '''
+        if journal_entry is not None and self.journal is not None:
+            submission_id = self.journal.new_id()
+        else:
+            journal_entry = None
+
+        if submission_id is not None:
+            with self.in_flight_lock:
+                if submission_id in self.in_flight:
+                    return
+                self.in_flight.add(submission_id)
+
+        self.pending.put((description, func, args, submission_id, retry, journal_entry))
+
+    def write_journal(self, submission_id, journal_entry):
+        '''
+        Journal a new submission so it's sent on the next launch if it doesn't go through
+        '''
+        try:
+            self.journal.add(journal_entry[0], journal_entry[1], submission_id)
+        except (IOError, OSError) as e:
+            logger.exception("Failed to journal submission: %s", str(e))
+
+    def run(self):
+        '''
+        Worker thread. Sends submissions until a None is queued
+        '''
+        while True:
+            try:
+                item = self.pending.get(timeout=self.journal.sync_interval if self.journal else None)
+            except queue.Empty:
+                self.idle()
+                continue
+
+            if item is None:
+                break
+
+            description, func, args, submission_id, retry, journal_entry = item
+            if journal_entry is not None:
+                self.write_journal(submission_id, journal_entry)
+
+            result = self.send(description, func, args, self.retries if retry else 0, submission_id)
+
+            if submission_id is not None:
+                if result[1]:
+                    self.journal.done(submission_id)
+                with self.in_flight_lock:
+                    self.in_flight.discard(submission_id)
+
+            if result[1]:
+                # Back online. Send anything left over straight away
+                self.last_flush = None
+            self.results.put(result)
+
+            if self.pending.empty():
+                self.idle()
+
+    def idle(self):
+        '''
+        Called when there is nothing queued. Syncs the journal and flushes it if it's time
+        '''
+        if self.journal is None:
+            return
+
+        self.journal.sync()
+
+        if self.last_flush is not None and time.time() - self.last_flush < self.flush_interval:
+            return
+
+        with self.in_flight_lock:
+            in_flight = set(self.in_flight)
+
+        batch = self.journal.get_pending(exclude=in_flight, limit=self.batch_size)
+        if batch:
+            logger.info("Sending %d journaled submissions", len(batch))
+        for entry in batch:
+            try:
+                description, func, args = self.resolve(entry)
+            except BaseException as e: # pylint: disable=broad-except
+                # Can't ever be sent. Drop it
+                logger.error("Dropping bad journal entry %s: %s", entry["id"], str(e))
+                self.journal.done(entry["id"])
+                continue
+            self.submit(description, func, *args, submission_id=entry["id"], retry=False)
+
+        self.last_flush = time.time()
+
+    def send(self, description, func, args, retries, submission_id=None):
+        '''
+        Send a submission, retrying on failure. Returns (description, success, error).
+        Journaled submissions pass their id to func so every try is sent with it
+        '''
+        kwargs = {"session": self.session, "timeout": self.timeout}
+        if submission_id is not None:
+            kwargs["submission_id"] = submission_id
+
+        error = None
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                # Wait 1x, 2x, 4x... the backoff. Stop waiting if the game is exiting
+                if self.stopping.wait(self.backoff * (2 ** (attempt - 1))):
+                    break
+
+            try:
+                func(*args, **kwargs)
+            except BaseException as e: # pylint: disable=broad-except
+                error = e
+                logger.warning("%s failed (attempt %d): %s", description, attempt + 1, str(e))
+            else:
+                return (description, True, None)
+
+        logger.error("Giving up on %s: %s", description, str(error))
+        return (description, False, error)
+
+    def poll(self):
+        '''
+        Get the (description, success, error) of the submissions finished since
+        the last poll. Never blocks
+        '''
+        ret = []
+        while True:
+            try:
+                ret.append(self.results.get_nowait())
+            except queue.Empty:
+                return ret
+
+    def stop(self, timeout=None):
+        '''
+        Send whatever is queued without retrying and stop the worker. Waits at
+        most timeout seconds. Returns True if everything was sent. Anything
+        journaled that didn't go through is sent on the next launch
+        '''
+        if self.thread is None:
+            return True
+
+        self.stopping.set()
+        self.pending.put(None)
+        self.thread.join(timeout)
+        finished = not self.thread.is_alive()
+        self.thread = None
+        self.session.close()
+
+        if self.journal is not None:
+            # Journal whatever the worker didn't get to so it isn't lost
+            while not finished:
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[5] is not None:
+                    self.write_journal(item[3], item[5])
+            if not finished:
+                # Still lets the worker exit once it's done with what it's sending
+                self.pending.put(None)
+            self.journal.sync()
+        return finished
@@ -0,0 +1,226 @@
+'''
+Piece table text buffer for the code editor
+'''
+
+from bisect import bisect_right
+
+# Where a piece's text comes from
+ORIGINAL = 0
+ADDED = 1
+
+class TextBuffer:
+    '''
+    Piece table. The starting text is never copied or changed. Inserted text
+    is appended to an add buffer and the document is a list of pieces
+    (source, start, length) pointing into the two. Edits only split and
+    join pieces, and typing at the same spot keeps growing one piece, so
+    keystrokes never copy the text. Finding the piece at a position is a
+    bisect. Call str() on the buffer to get the whole text
+    '''
+    def __init__(self, text=""):
+        self.original = text
+
+        # Characters that were inserted. A list so appending doesn't copy
+        self.added = []
+
+        # Pieces of the document in order and the position each one starts at
+        self.pieces = []
+        self.starts = []
+        if len(text):
+            self.pieces.append((ORIGINAL, 0, len(text)))
+            self.starts.append(0)
+
+        self.length = len(text)
+
+        # The whole text, built on demand and dropped on every edit
+        self._text = text
+
+        # Position each line starts at, built on demand and kept up to date by edits
+        self._line_starts = None
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(self.chunks())
+        return self._text
+
+    def __iter__(self):
+        '''
+        Iterate over the characters without building the whole text
+        '''
+        for chunk in self.chunks():
+            yield from chunk
+
+    def __getitem__(self, index):
+        '''
+        Get a character or a slice of the text as a string
+        '''
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return str(self)[index]
+            return ''.join(self.chunks(start, stop))
+
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("TextBuffer index out of range")
+        return ''.join(self.chunks(index, index + 1))
+
+    def piece_text(self, source, start, length):
+        '''
+        Text of a piece
+        '''
+        if source == ORIGINAL:
+            return self.original[start:start + length]
+        return ''.join(self.added[start:start + length])
+
+    def chunks(self, start=0, stop=None):
+        '''
+        Iterate over the text from start to stop one piece at a time
+        '''
+        if stop is None or stop > self.length:
+            stop = self.length
+        if start >= stop:
+            return
+
+        i = bisect_right(self.starts, start) - 1
+        while i < len(self.pieces) and self.starts[i] < stop:
+            source, piece_start, length = self.pieces[i]
+            begin = max(start - self.starts[i], 0)
+            end = min(stop - self.starts[i], length)
+            yield self.piece_text(source, piece_start + begin, end - begin)
+            i += 1
+
+    def lines(self):
+        '''
+        Iterate over the lines of the text. Same as str(buffer).split("\\n")
+        '''
+        line = []
+        for chunk in self.chunks():
+            parts = chunk.split("\n")
+            line.append(parts[0])
+            for part in parts[1:]:
+                yield ''.join(line)
+                line = [part]
+        yield ''.join(line)
+
+    def line_starts(self):
+        '''
+        Get the position each line starts at. The first line starts at 0
+        and every other one right after a newline. Don't modify the list
+        '''
+        if self._line_starts is None:
+            starts = [0]
+            offset = 0
+            for chunk in self.chunks():
+                i = chunk.find("\n")
+                while i != -1:
+                    starts.append(offset + i + 1)
+                    i = chunk.find("\n", i + 1)
+                offset += len(chunk)
+            self._line_starts = starts
+        return self._line_starts
+
+    def shift_line_starts(self, pos, text):
+        '''
+        Update the line starts for text inserted before pos
+        '''
+        starts = self._line_starts
+        if starts is None:
+            return
+
+        i = bisect_right(starts, pos)
+        for j in range(i, len(starts)):
+            starts[j] += len(text)
+        starts[i:i] = [pos + j + 1 for j, char in enumerate(text) if char == "\n"]
+
+    def remove_line_starts(self, pos, length):
+        '''
+        Update the line starts for length characters deleted from pos
+        '''
+        starts = self._line_starts
+        if starts is None:
+            return
+
+        # Lines that started right after a deleted newline are gone
+        i = bisect_right(starts, pos)
+        del starts[i:bisect_right(starts, pos + length)]
+        for j in range(i, len(starts)):
+            starts[j] -= length
+
+    def split(self, pos):
+        '''
+        Get the index of the piece starting at pos, splitting the piece pos is in if needed
+        '''
+        if pos >= self.length:
+            return len(self.pieces)
+
+        i = bisect_right(self.starts, pos) - 1
+        offset = pos - self.starts[i]
+        if offset == 0:
+            return i
+
+        source, start, length = self.pieces[i]
+        self.pieces[i] = (source, start, offset)
+        self.pieces.insert(i + 1, (source, start + offset, length - offset))
+        self.starts.insert(i + 1, pos)
+        return i + 1
+
+    def shift(self, index, amount):
+        '''
+        Move the start of every piece from index on by amount
+        '''
+        starts = self.starts
+        for i in range(index, len(starts)):
+            starts[i] += amount
+
+    def insert(self, pos, text):
+        '''
+        Insert text before pos
+        '''
+        if not len(text):
+            return
+        if pos < 0 or pos > self.length:
+            raise IndexError("TextBuffer position out of range")
+
+        i = self.split(pos)
+
+        # Typing right after the last insert grows that piece
+        if i > 0:
+            source, start, length = self.pieces[i - 1]
+            if source == ADDED and start + length == len(self.added):
+                self.pieces[i - 1] = (source, start, length + len(text))
+                self.added.extend(text)
+                self.shift(i, len(text))
+                self.length += len(text)
+                self._text = None
+                self.shift_line_starts(pos, text)
+                return
+
+        self.pieces.insert(i, (ADDED, len(self.added), len(text)))
+        self.starts.insert(i, pos)
+        self.added.extend(text)
+        self.shift(i + 1, len(text))
+        self.length += len(text)
+        self._text = None
+        self.shift_line_starts(pos, text)
+
+    def delete(self, pos, length=1):
+        '''
+        Delete length characters starting at pos
+        '''
+        length = min(length, self.length - pos)
+        if pos < 0 or length <= 0:
+            return
+
+        i = self.split(pos)
+        j = self.split(pos + length)
+        del self.pieces[i:j]
+        del self.starts[i:j]
+        self.shift(i, -length)
+        self.length -= length
+        self._text = None
+        self.remove_line_starts(pos, length)
@@ -7,6 +7,7 @@ import pygame
 
 from jackit.core import CustomEvent
 from jackit.core.editor import CodeEditor
+from jackit.core.textbuffer import TextBuffer
 
 class TextInput(CodeEditor):
     '''
@@ -39,7 +40,7 @@ class TextInput(CodeEditor):
         Called when the user hits enter. Overrides the code editor version
         '''
         self.running = False
-        pygame.event.post(pygame.event.Event(CustomEvent.SET_USER, {"text": self.text}))
+        pygame.event.post(pygame.event.Event(CustomEvent.SET_USER, {"text": str(self.text)}))
         pygame.key.set_repeat() # Sets back to no repeat
 
     def update(self):
@@ -50,7 +51,7 @@ class TextInput(CodeEditor):
             return
 
         if len(self.text) > self.max_chars:
-            self.text = self.text[:self.max_chars]
+            self.text.delete(self.max_chars, len(self.text) - self.max_chars)
 
         if self.cursor_position > len(self.text):
             self.cursor_position = len(self.text)
@@ -77,7 +78,7 @@ class TextInput(CodeEditor):
 
         try:
             screen.blit(self.font.render(
-                self.text,
+                str(self.text),
                 self.config.font_antialiasing,
                 self.config.font_color
             ), self.rect)
@@ -102,7 +103,7 @@ class TextInput(CodeEditor):
 
             if not self.initial_edit and event.key != pygame.K_RETURN:
                 self.initial_edit = True
-                self.text = ""
+                self.text = TextBuffer()
 
             if event.key == pygame.K_RETURN and self.initial_edit:
                 self.stop()
@@ -121,6 +122,6 @@ class TextInput(CodeEditor):
             elif event.key == pygame.K_ESCAPE:
                 pass
             else:
-                self.character_key(event.key)
+                self.character_key(event.key, event.mod)
 
         return True # keep processing events
@@ -0,0 +1,70 @@
+'''
+Pre-rendered layer of the static tiles in a level
+'''
+
+import pygame
+
+class TileLayer:
+    '''
+    Static tiles are rendered once into chunk surfaces when the level loads.
+    Drawing the layer is then one blit per chunk on screen instead of one
+    blit per tile. Chunks are only created where there are tiles so big
+    empty levels don't cost any memory.
+    '''
+    def __init__(self, background_color, chunk_width=512, chunk_height=512):
+        self.background_color = background_color
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+
+        # Map of (column, row) -> chunk surface
+        self.chunks = {}
+
+    def get_chunk(self, col, row):
+        '''
+        Get the chunk surface at col, row. Creates it if it doesn't exist
+        '''
+        chunk = self.chunks.get((col, row), None)
+        if chunk is None:
+            # Disable error in pylint. It doesn't like the Surface() call. Pylint is wrong.
+            # pylint: disable=E1121
+            chunk = pygame.Surface([self.chunk_width, self.chunk_height])
+            chunk.fill(self.background_color)
+            chunk = chunk.convert() # Convert the surface for faster blitting
+            self.chunks[(col, row)] = chunk
+        return chunk
+
+    def add(self, sprite):
+        '''
+        Render the sprite's current image into every chunk it overlaps
+        '''
+        rect = sprite.rect
+        left = rect.left // self.chunk_width
+        top = rect.top // self.chunk_height
+        right = (rect.right - 1) // self.chunk_width
+        bottom = (rect.bottom - 1) // self.chunk_height
+
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self.get_chunk(col, row).blit(
+                    sprite.image,
+                    (rect.x - (col * self.chunk_width), rect.y - (row * self.chunk_height))
+                )
+
+    def draw(self, screen, camera):
+        '''
+        Blit the chunks the camera can see
+        '''
+        view = camera.viewport()
+        left = view.left // self.chunk_width
+        top = view.top // self.chunk_height
+        right = (view.right - 1) // self.chunk_width
+        bottom = (view.bottom - 1) // self.chunk_height
+
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                chunk = self.chunks.get((col, row), None)
+                if chunk is not None:
+                    screen.blit(chunk, (
+                        (col * self.chunk_width) + camera.state.left,
+                        (row * self.chunk_height) + camera.state.top
+                    ))
@@ -0,0 +1,134 @@
+'''
+Tile occupancy grid built from the level map
+'''
+
+import numpy
+
+class TileKind:
+    '''
+    Kinds of tiles stored in the tile map
+    '''
+    EMPTY = 0
+    SOLID = 1
+    DEATH = 2
+    CODE = 3
+    EXIT = 4
+
+# Lookup table of which tile kinds actors can stand on. Indexed by TileKind
+COLLIDEABLE_KINDS = (False, True, True, False, True)
+
+class TileMap:
+    '''
+    Compact 2D array of tile kinds with one cell per block in the level map.
+    Static block sized tiles live in the array. Anything collideable that
+    moves or doesn't line up with a cell is kept in a small dynamic list
+    that is checked separately.
+    '''
+    def __init__(self, columns, rows, cell_width, cell_height):
+        self.columns = columns
+        self.rows = rows
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+        # Tile kind of each cell indexed [row, column]
+        self.kinds = numpy.zeros((rows, columns), dtype=numpy.uint8)
+
+        # Map of (row, column) -> sprite for collideable tiles in the array
+        self.tiles = {}
+
+        # Collideable sprites that can't be stored in the array
+        self.dynamic = []
+
+        # Bumped whenever a cell changes so copies of the array know to refresh
+        self.version = 0
+
+    def add(self, sprite, kind):
+        '''
+        Add a sprite to the map as the provided kind of tile
+        '''
+        if kind == TileKind.EMPTY:
+            return
+
+        col = sprite.rect.x // self.cell_width
+        row = sprite.rect.y // self.cell_height
+        aligned = (
+            sprite.static and
+            0 <= col < self.columns and 0 <= row < self.rows and
+            sprite.rect.topleft == (col * self.cell_width, row * self.cell_height) and
+            sprite.rect.size == (self.cell_width, self.cell_height)
+        )
+
+        if not aligned or sprite.is_collideable() != COLLIDEABLE_KINDS[kind]:
+            if sprite.is_collideable():
+                self.dynamic.append(sprite)
+            return
+
+        self.kinds[row, col] = kind
+        self.version += 1
+        if COLLIDEABLE_KINDS[kind]:
+            self.tiles[(row, col)] = sprite
+
+    def remove(self, sprite):
+        '''
+        Remove a sprite from the map if it's there
+        '''
+        if sprite in self.dynamic:
+            self.dynamic.remove(sprite)
+            return
+
+        col = sprite.rect.x // self.cell_width
+        row = sprite.rect.y // self.cell_height
+        if self.tiles.get((row, col), None) is sprite:
+            del self.tiles[(row, col)]
+            self.kinds[row, col] = TileKind.EMPTY
+            self.version += 1
+
+    def kind_at(self, x_pos, y_pos):
+        '''
+        Get the kind of tile at a pixel position
+        '''
+        col = x_pos // self.cell_width
+        row = y_pos // self.cell_height
+        if 0 <= col < self.columns and 0 <= row < self.rows:
+            return self.kinds[row, col]
+        return TileKind.EMPTY
+
+    def is_solid_at(self, x_pos, y_pos):
+        '''
+        True if there is something collideable at the pixel position
+        '''
+        if COLLIDEABLE_KINDS[self.kind_at(x_pos, y_pos)]:
+            return True
+
+        for sprite in self.dynamic:
+            if sprite.rect.collidepoint(x_pos, y_pos):
+                return True
+
+        return False
+
+    def collideables_in_rect(self, rect, ignore=None):
+        '''
+        Get all collideable sprites that overlap rect. Tiles are
+        returned in the order they appear in the level map followed
+        by any dynamic sprites
+        '''
+        left = rect.left // self.cell_width
+        top = rect.top // self.cell_height
+        right = max(left, (rect.right - 1) // self.cell_width)
+        bottom = max(top, (rect.bottom - 1) // self.cell_height)
+
+        # Clip to the map so negative indices don't wrap around
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(self.columns - 1, right), min(self.rows - 1, bottom)
+
+        found = []
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                if COLLIDEABLE_KINDS[self.kinds[row, col]]:
+                    found.append(self.tiles[(row, col)])
+
+        for sprite in self.dynamic:
+            if sprite is not ignore and sprite.rect.colliderect(rect):
+                found.append(sprite)
+
+        return found
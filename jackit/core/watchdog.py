@@ -0,0 +1,122 @@
+'''
+Time limits for the user's patched code
+'''
+
+import time
+import signal
+import threading
+
+class PatchTimeout(BaseException):
+    '''
+    Raised inside a patched callback that ran out of time. Not an Exception
+    so "except Exception" in the user's code doesn't swallow it
+    '''
+    pass
+
+class PatchWatchdog:
+    '''
+    Runs patched callbacks with a time budget per call and per frame (in
+    milliseconds, 0 for no limit). An interval timer interrupts a callback
+    that runs past its budget and keeps interrupting it until it gives up.
+    Where interval timers aren't available (Windows) or off the main thread,
+    callbacks can't be interrupted and are only caught after they return
+    '''
+    def __init__(self, call_budget=20, frame_budget=50):
+        self.call_budget = call_budget
+        self.frame_budget = frame_budget
+
+        # Milliseconds spent in patched callbacks this frame
+        self.frame_used = 0.0
+
+        # Number of budget violations in total and by method name
+        self.violations = 0
+        self.method_violations = {}
+
+        # Number of calls skipped because the frame's budget was used up
+        self.skipped = 0
+
+        # True while a callback is running with the timer set
+        self.active = False
+
+        self.has_timers = hasattr(signal, "setitimer")
+
+    def begin_frame(self):
+        '''
+        Start a new frame's budget
+        '''
+        self.frame_used = 0.0
+
+    def budget(self, count_frame=True):
+        '''
+        Milliseconds the next call can take. None if there's no limit
+        '''
+        ret = None
+        if self.call_budget > 0:
+            ret = self.call_budget
+        if count_frame and self.frame_budget > 0:
+            remaining = max(self.frame_budget - self.frame_used, 0)
+            ret = remaining if ret is None else min(ret, remaining)
+        return ret
+
+    def timeout(self, signum, frame): # pylint: disable=unused-argument
+        '''
+        SIGALRM handler. Interrupts the running callback
+        '''
+        if self.active:
+            raise PatchTimeout()
+
+    def call(self, method_name, cb, *args, count_frame=True):
+        '''
+        Call cb with args. Returns (return value, violation). violation is
+        None if it was within budget, otherwise what went wrong and the
+        return value is None. Once the frame's budget is used up the rest
+        of the frame's calls are skipped. A skipped call returns (None, None)
+        since it's the callback that used up the budget that's at fault
+        '''
+        budget = self.budget(count_frame)
+        if budget is None:
+            return cb(*args), None
+
+        if budget <= 0:
+            self.skipped += 1
+            return None, None
+
+        interruptible = self.has_timers and not self.active and\
+            threading.current_thread() is threading.main_thread()
+
+        if interruptible:
+            previous = signal.signal(signal.SIGALRM, self.timeout)
+            # Fires again every budget in case the callback catches it
+            signal.setitimer(signal.ITIMER_REAL, budget / 1000.0, budget / 1000.0)
+
+        ret = None
+        timed_out = False
+        start = time.perf_counter()
+        self.active = interruptible
+        try:
+            ret = cb(*args)
+            self.active = False
+        except PatchTimeout:
+            self.active = False
+            timed_out = True
+        finally:
+            self.active = False
+            if interruptible:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous)
+
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if count_frame:
+            self.frame_used += elapsed
+
+        if timed_out or elapsed > budget:
+            return None, self.violation(method_name, "Took {:.1f}ms of a {:.1f}ms budget".format(elapsed, budget))
+        return ret, None
+
+    def violation(self, method_name, reason):
+        '''
+        Count a budget violation. Returns the description
+        '''
+        self.violations += 1
+        self.method_violations[method_name] = self.method_violations.get(method_name, 0) + 1
+        return "{}: {}".format(method_name, reason)
@@ -9,6 +9,7 @@ from deploy import SiteDeployment
 from jackit.core import BLOCK_WIDTH, BLOCK_HEIGHT
 from jackit.core.animation import SpriteStripAnimation
 from jackit.core.entity import Entity
+from jackit.core.patch import UserPatch
 
 class CodeBlock(Entity):
     '''
@@ -124,7 +125,12 @@ class CodeBlock(Entity):
             # Compile the code and catch any errors
             code_obj = compile(event.text, "<string>", "exec")
 
-            self.game_engine.current_level.challenge_completed(code_obj)
+            # Functions that just return a constant are patched in as the constant
+            UserPatch.fold(event.text)
+            try:
+                self.game_engine.current_level.challenge_completed(code_obj)
+            finally:
+                UserPatch.fold(None)
 
             # Tell them how to clear the code changes they made
             self.game_engine.hud.display_hint("Clear code changes with 'Q'", 2)
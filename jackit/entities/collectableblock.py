@@ -57,6 +57,8 @@ class Coin(CollectableBlock):
                 int(self.game_engine.config.framerate / 7)
             )
         else:
+            # Copy first in case the image is a shared animation frame
+            self.image = self.image.copy()
             self.image.fill((0, 255, 255))
         self._points = value
 
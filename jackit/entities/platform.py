@@ -67,6 +67,9 @@ class Platform(Entity):
         self.change_x = self.stats.change_x
         self.change_y = self.stats.change_y
 
+        # Only moving platforms need to be left out of the spatial hash
+        self.static = self.change_x == 0 and self.change_y == 0
+
     def update(self):
         '''
         Update platform position
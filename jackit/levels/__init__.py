@@ -10,3 +10,9 @@ from .level_05 import Level_05
 from .level_06 import Level_06
 from .level_07 import Level_07
 from .level_08 import Level_08
+
+# Level factories in the order they are played
+LEVELS = [
+    Level_01, Level_02, Level_03, Level_04,
+    Level_05, Level_06, Level_07, Level_08
+]
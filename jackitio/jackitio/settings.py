@@ -83,10 +83,47 @@ if DEBUG:
 else:
     DATABASE_PATH = os.path.join(DEPLOY_PROTECTED_DIR, "database", "db.sqlite3")
 
+# Seconds a connection waits on SQLite's write lock before giving up. The
+# database is put in WAL mode when connecting so reads never block the writer
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': DATABASE_PATH,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    }
+}
+
+
+# Leaderboard
+# Number of entries shown on the leaderboard page and whether cheaters are listed
+
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_SHOW_CHEATED = True
+
+# Most entries the JSON API returns per page
+LEADERBOARD_API_MAX_COUNT = 500
+
+# Seconds the rendered leaderboard is cached. Submissions clear it right away
+LEADERBOARD_CACHE_TIMEOUT = 300
+
+# Journal of submissions waiting to be saved, most saved per batch and
+# seconds the writer waits for a batch to fill
+LEADERBOARD_INGEST_JOURNAL = os.path.join(os.path.dirname(DATABASE_PATH), "ingest.journal")
+LEADERBOARD_INGEST_BATCH_SIZE = 500
+LEADERBOARD_INGEST_BATCH_TIME = 0.05
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+# The local memory cache is per process. Use a shared backend like memcached
+# when running more than one process so submissions invalidate every copy
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'jackitio',
     }
 }
 
@@ -3,6 +3,16 @@ Apps
 '''
 
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def enable_wal(sender, connection, **kwargs): # pylint: disable=unused-argument
+    '''
+    Put SQLite databases in WAL mode so readers and the writer don't block each other
+    '''
+    if connection.vendor == "sqlite":
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
 
 
 class LeaderboardConfig(AppConfig):
@@ -11,3 +21,6 @@ class LeaderboardConfig(AppConfig):
     '''
 
     name = 'leaderboard'
+
+    def ready(self):
+        connection_created.connect(enable_wal)
@@ -0,0 +1,177 @@
+'''
+Queues validated submissions on disk and writes them to the database in batches
+'''
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+
+from django.db import close_old_connections, transaction
+
+from .models import Leaderboard
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    '''
+    Submissions are appended to a journal and synced to disk before put()
+    returns, so a request is done as soon as its entry is safe. One writer
+    thread takes entries off the queue and saves them with bulk_create in
+    batches of up to batch_size, waiting at most batch_time seconds for a
+    batch to fill. Only one thread ever writes so requests never wait on
+    the database lock.
+
+    Each line of the journal is a JSON record: "add" with a submission's id
+    and fields or "done" with the ids of a saved batch. Entries are saved
+    with their submission id so entries replayed from the journal after a
+    crash are never saved twice. Submissions put with the id the game sent
+    are only saved once no matter how many times the game retries them.
+    Only one process should use a journal.
+
+    on_commit is called on the writer thread with the entries of each saved batch
+    '''
+    def __init__(self, path, batch_size=500, batch_time=0.05, on_commit=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_time = batch_time
+        self.on_commit = on_commit
+
+        self.pending = queue.Queue()
+
+        # Number of entries journaled and not saved yet
+        self.outstanding = 0
+
+        self.lock = threading.Lock()
+        self.fh = None
+        self.thread = None
+
+    def start(self):
+        '''
+        Queue whatever the journal has that wasn't saved and start the writer
+        '''
+        with self.lock:
+            if self.thread is not None:
+                return
+
+            records = self.load()
+            with open(self.path, "w") as fh:
+                for record in records:
+                    fh.write(json.dumps(record) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            self.fh = open(self.path, "a")
+
+            if records:
+                logger.info("Replaying %d journaled submissions", len(records))
+            for record in records:
+                self.pending.put(record)
+            self.outstanding = len(records)
+
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def load(self):
+        '''
+        Read the "add" records of the journal that weren't saved
+        '''
+        records = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partially written line from a crash. Its request never returned
+                        logger.warning("Ignoring corrupt line in %s", self.path)
+                        break
+
+                    if record.get("op") == "add":
+                        records[record["id"]] = record
+                    elif record.get("op") == "done":
+                        for submission_id in record["ids"]:
+                            records.pop(submission_id, None)
+        return list(records.values())
+
+    def put(self, fields, submission_id=None):
+        '''
+        Journal a submission with the Leaderboard fields in fields and queue
+        it to be saved. Returns its id once it's on disk. An id is made up if
+        submission_id isn't given
+        '''
+        if submission_id is None:
+            submission_id = uuid.uuid4().hex
+        record = {"op": "add", "id": submission_id, "fields": fields}
+        with self.lock:
+            self.fh.write(json.dumps(record) + "\n")
+            self.fh.flush()
+            os.fsync(self.fh.fileno())
+            self.outstanding += 1
+
+        self.pending.put(record)
+        return record["id"]
+
+    def get_batch(self):
+        '''
+        Wait for a submission and take whatever else comes in within batch_time
+        '''
+        batch = [self.pending.get()]
+        end = time.time() + self.batch_time
+        while len(batch) < self.batch_size:
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        '''
+        Writer thread. Saves batches forever, retrying a batch until it's saved
+        '''
+        while True:
+            batch = self.get_batch()
+            while True:
+                try:
+                    self.write(batch)
+                    break
+                except BaseException as e: # pylint: disable=broad-except
+                    logger.exception("Failed to save %d submissions: %s", len(batch), str(e))
+                    time.sleep(1)
+                finally:
+                    close_old_connections()
+
+    def write(self, batch):
+        '''
+        Save a batch in one transaction and mark it done in the journal
+        '''
+        ids = [record["id"] for record in batch]
+        with transaction.atomic():
+            saved = set(Leaderboard.objects.filter(submission_id__in=ids).values_list("submission_id", flat=True))
+            entries = []
+            for record in batch:
+                # Retries of the same submission can land in the same batch
+                if record["id"] not in saved:
+                    saved.add(record["id"])
+                    entries.append(Leaderboard(submission_id=record["id"], **record["fields"]))
+            Leaderboard.objects.bulk_create(entries)
+
+        with self.lock:
+            self.outstanding -= len(batch)
+            if self.outstanding == 0:
+                # Everything is saved. Start the journal over
+                self.fh.seek(0)
+                self.fh.truncate()
+            else:
+                self.fh.write(json.dumps({"op": "done", "ids": ids}) + "\n")
+            self.fh.flush()
+
+        if self.on_commit is not None and entries:
+            self.on_commit(entries)
@@ -0,0 +1,62 @@
+'''
+Rebuild the in memory top of the leaderboard and check it against the database
+'''
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from leaderboard.ranking import TopLeaderboard
+from leaderboard.views import TOP, invalidate_leaderboard
+
+
+class Command(BaseCommand):
+    '''
+    manage.py rebuild_leaderboard [--check]
+    '''
+    help = (
+        "Bump the leaderboard version in the cache so servers rebuild the top of the "
+        "leaderboard, and rebuild this process's copy. Servers only see the new version "
+        "if CACHES uses a cache they share (like memcached). With the default "
+        "LocMemCache only this command's own copy is rebuilt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Build a fresh copy by adding every entry one at a time and compare it to "
+                 "the database. Checks the incremental updates, not a running server's copy"
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            self.check_top()
+            return
+
+        # Servers rebuild their copy the next time they see the new version
+        version = invalidate_leaderboard()
+        TOP.rebuild(version)
+        self.stdout.write("Rebuilt the top {} entries at version {}".format(len(TOP.entries), version))
+
+        if isinstance(caches["default"], LocMemCache):
+            self.stderr.write(
+                "The cache is a LocMemCache so running servers didn't see the new version. "
+                "Restart them or configure a shared cache")
+
+    def check_top(self):
+        '''
+        Build a copy the way submissions do and make sure it matches the database
+        '''
+        top = TopLeaderboard(TOP.size, TOP.show_cheated)
+
+        # In the order they were submitted
+        for entry in top.queryset().order_by("id").iterator():
+            top.insert(entry)
+
+        mismatches = top.check()
+        for rank, expected, actual in mismatches:
+            self.stderr.write("Rank {}: database has id {}, copy has id {}".format(rank, expected, actual))
+        if mismatches:
+            raise CommandError("Top of the leaderboard doesn't match the database")
+
+        self.stdout.write("Top {} entries match the database".format(len(top.entries)))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    '''
+    Composite index in leaderboard order so the top of the leaderboard is read
+    straight off the index with LIMIT. cheated is last so filtering out cheaters
+    is done on the index without touching the table
+    '''
+
+    dependencies = [
+        ('leaderboard', '0004_auto_20161221_1232'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX leaderboard_rank ON leaderboard_leaderboard "
+            "(score DESC, deaths, playtime, levels_completed DESC, cheated)",
+            "DROP INDEX leaderboard_rank"
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    '''
+    Add id to the leaderboard_rank index ahead of cheated now that ties are
+    broken by id, so the leaderboard is still read off the index without a sort
+    '''
+
+    dependencies = [
+        ('leaderboard', '0005_leaderboard_rank_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                "DROP INDEX leaderboard_rank",
+                "CREATE INDEX leaderboard_rank ON leaderboard_leaderboard "
+                "(score DESC, deaths, playtime, levels_completed DESC, id, cheated)"
+            ],
+            [
+                "DROP INDEX leaderboard_rank",
+                "CREATE INDEX leaderboard_rank ON leaderboard_leaderboard "
+                "(score DESC, deaths, playtime, levels_completed DESC, cheated)"
+            ]
+        ),
+    ]
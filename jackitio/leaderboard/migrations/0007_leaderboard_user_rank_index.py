@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    '''
+    Index of each user's entries in leaderboard order so a user's best entry
+    is the first one in the index
+    '''
+
+    dependencies = [
+        ('leaderboard', '0006_leaderboard_rank_index_id'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX leaderboard_user_rank ON leaderboard_leaderboard "
+            "(user, score DESC, deaths, playtime, levels_completed DESC, id)",
+            "DROP INDEX leaderboard_user_rank"
+        ),
+    ]
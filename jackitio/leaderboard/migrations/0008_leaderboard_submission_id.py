@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboard', '0007_leaderboard_user_rank_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboard',
+            name='submission_id',
+            field=models.CharField(default=None, max_length=32, null=True, unique=True),
+        ),
+    ]
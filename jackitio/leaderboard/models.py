@@ -5,6 +5,9 @@ Database Models
 from django.db import models
 from django.forms import ModelForm
 
+# Order of the leaderboard, best first. Ties go to the earliest entry. Backed by the leaderboard_rank index
+RANKING = ("-score", "deaths", "playtime", "-levels_completed", "id")
+
 class Leaderboard(models.Model):
     '''
     Database model for a leaderboard entry strip
@@ -17,10 +20,26 @@ class Leaderboard(models.Model):
     levels_completed = models.IntegerField(default=0)
     cheated = models.BooleanField(default=False)
     cheated_reason = models.CharField(max_length=100, default="")
+    submission_id = models.CharField(max_length=32, null=True, default=None, unique=True)
 
     def __str__(self):
         return "[{}]: {} - {}".format(self.pub_date, self.user, self.score)
 
+    def to_json(self):
+        '''
+        Get the entry as a JSON serializable dict
+        '''
+        return {
+            "id": self.id,
+            "user": self.user,
+            "score": self.score,
+            "deaths": self.deaths,
+            "playtime": self.playtime,
+            "levels_completed": self.levels_completed,
+            "cheated": self.cheated,
+            "pub_date": self.pub_date.isoformat()
+        }
+
 class LeaderboardForm(ModelForm):
     '''
     Handles post data to update the leaderboard
@@ -0,0 +1,161 @@
+'''
+In memory copy of the top of the leaderboard
+'''
+
+import bisect
+import threading
+
+from django.db.models import Q
+
+from .models import RANKING, Leaderboard
+
+# (field name, descending) for each field in RANKING
+RANKING_FIELDS = tuple((field.lstrip("-"), field.startswith("-")) for field in RANKING)
+
+
+def ranked(show_cheated=True):
+    '''
+    The whole leaderboard in rank order
+    '''
+    ret = Leaderboard.objects.all()
+    if not show_cheated:
+        ret = ret.filter(cheated=False)
+    return ret.order_by(*RANKING)
+
+
+def rank_values(entry):
+    '''
+    Values of the RANKING fields of an entry
+    '''
+    return [getattr(entry, name) for name, _ in RANKING_FIELDS]
+
+
+def seek(values, after=True):
+    '''
+    Filter for the entries ranked after (or ahead of) an entry with the
+    values of the RANKING fields. Bounded on the first field so the database
+    seeks into the leaderboard_rank index instead of scanning it
+    '''
+    ret = None
+    equal = {}
+    for (name, descending), value in zip(RANKING_FIELDS, values):
+        lookup = "{}__{}".format(name, "lt" if descending == after else "gt")
+        condition = Q(**equal) & Q(**{lookup: value})
+        ret = condition if ret is None else ret | condition
+        equal[name] = value
+
+    name, descending = RANKING_FIELDS[0]
+    bound = "{}__{}".format(name, "lte" if descending == after else "gte")
+    return Q(**{bound: values[0]}) & ret
+
+
+def rank_key(entry):
+    '''
+    Sort key of an entry. Matches RANKING so lower keys rank higher
+    '''
+    return (-entry.score, entry.deaths, entry.playtime, -entry.levels_completed, entry.pk)
+
+
+class TopLeaderboard:
+    '''
+    The best size entries of the leaderboard kept sorted in memory, so reading
+    them is a copy with no query or sort. Built from the database on first use
+    and updated as entries are submitted: a new entry is only inserted if it
+    beats the current last place.
+
+    The copy is tied to a leaderboard version that's bumped on every saved
+    batch. add() only applies entries on top of the version before it.
+    If another thread or process got a submission in between, the copy is
+    out of date and is rebuilt on the next read
+    '''
+    def __init__(self, size, show_cheated=True):
+        self.size = size
+        self.show_cheated = show_cheated
+
+        # Sorted rank keys and the entries they belong to
+        self.keys = []
+        self.entries = []
+
+        # Leaderboard version of the copy. None if it needs to be rebuilt
+        self.version = None
+        self.lock = threading.RLock()
+
+    def queryset(self):
+        '''
+        The whole leaderboard in rank order
+        '''
+        return ranked(self.show_cheated)
+
+    def rebuild(self, version=None):
+        '''
+        Reload the top entries from the database
+        '''
+        entries = list(self.queryset()[:self.size])
+        with self.lock:
+            self.entries = entries
+            self.keys = [rank_key(entry) for entry in entries]
+            self.version = version
+
+    def get(self, version, count=None):
+        '''
+        Get the top count entries at the leaderboard version. Rebuilds if the copy is out of date
+        '''
+        if self.version is None or self.version != version:
+            self.rebuild(version)
+
+        with self.lock:
+            return self.entries[:count]
+
+    def insert(self, entry):
+        '''
+        Insert an entry if it makes the top. Returns True if it did
+        '''
+        if entry.cheated and not self.show_cheated:
+            return False
+
+        key = rank_key(entry)
+        with self.lock:
+            if len(self.keys) >= self.size and key >= self.keys[-1]:
+                return False
+
+            # Already there if a rebuild read it from the database
+            index = bisect.bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                return False
+
+            self.keys.insert(index, key)
+            self.entries.insert(index, entry)
+            del self.keys[self.size:]
+            del self.entries[self.size:]
+            return True
+
+    def add(self, entries, version):
+        '''
+        Add newly saved entries that moved the leaderboard to version. Entries
+        saved without getting their id back can't be placed so the copy is
+        rebuilt instead
+        '''
+        with self.lock:
+            if self.version == version - 1 and all(entry.pk is not None for entry in entries):
+                for entry in entries:
+                    self.insert(entry)
+                self.version = version
+            else:
+                self.version = None
+
+    def check(self):
+        '''
+        Compare the copy to the database. Returns a list of
+        (rank, id in the database, id in the copy) where they differ
+        '''
+        with self.lock:
+            copy = [entry.pk for entry in self.entries]
+        expected = list(self.queryset().values_list("pk", flat=True)[:self.size])
+
+        ret = []
+        for rank in range(max(len(copy), len(expected))):
+            want = expected[rank] if rank < len(expected) else None
+            have = copy[rank] if rank < len(copy) else None
+            if want != have:
+                ret.append((rank + 1, want, have))
+        return ret
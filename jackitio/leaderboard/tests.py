@@ -1,3 +1,374 @@
-from django.test import TestCase
+'''
+Tests for the leaderboard app
+'''
 
-# Create your tests here.
+import os
+import json
+import base64
+import random
+import shutil
+import itertools
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .ingest import IngestQueue
+from .models import Leaderboard
+from .ranking import TopLeaderboard, ranked
+from .views import TOP, get_leaderboard_version, get_submission_id, ingested, invalidate_leaderboard
+
+
+def score_fields(user="player", score=10, deaths=0, playtime=100.0, levels_completed=1, cheated=False):
+    '''
+    Leaderboard fields for a submission
+    '''
+    return {
+        'user': user,
+        'score': score,
+        'playtime': playtime,
+        'deaths': deaths,
+        'levels_completed': levels_completed,
+        'cheated': cheated,
+        'cheated_reason': "cheated" if cheated else ""
+    }
+
+
+class TestSubmissionId(TestCase):
+    '''
+    Test that retries of a submission the game sent an id with are saved once
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ingest = IngestQueue(os.path.join(self.tmp_dir, "ingest.journal"))
+        self.ingest.fh = open(self.ingest.path, "a")
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        self.ingest.fh.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_header(self):
+        '''
+        Only ids that look like the game's are used
+        '''
+        factory = RequestFactory()
+        submission_id = "0123456789abcdef0123456789abcdef"
+        request = factory.post("/leaderboard/submit/", HTTP_X_SUBMISSION_ID=submission_id)
+        self.assertEqual(get_submission_id(request), submission_id)
+
+        self.assertIsNone(get_submission_id(factory.post("/leaderboard/submit/")))
+        request = factory.post("/leaderboard/submit/", HTTP_X_SUBMISSION_ID="x' OR 1=1")
+        self.assertIsNone(get_submission_id(request))
+
+    def test_retries(self):
+        '''
+        Retries in the same batch and in later batches are dropped
+        '''
+        submission_id = "0123456789abcdef0123456789abcdef"
+        self.assertEqual(self.ingest.put(score_fields(), submission_id), submission_id)
+        self.ingest.put(score_fields(), submission_id)
+        self.ingest.write(self.ingest.get_batch())
+
+        self.ingest.put(score_fields(), submission_id)
+        self.ingest.write(self.ingest.get_batch())
+
+        self.assertEqual(Leaderboard.objects.filter(submission_id=submission_id).count(), 1)
+        self.assertEqual(self.ingest.outstanding, 0)
+
+
+class TestIngestQueue(TestCase):
+    '''
+    Test journaling and saving submissions with IngestQueue. The writer
+    thread isn't run. Batches are written on the test's thread
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "ingest.journal")
+        self.committed = []
+        self.ingest = self.create()
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        if self.ingest.fh is not None:
+            self.ingest.fh.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def create(self):
+        '''
+        Create a queue on the test's journal and start it without a writer
+        '''
+        ingest = IngestQueue(self.path, batch_size=10, batch_time=0, on_commit=self.committed.append)
+        ingest.run = lambda: None
+        ingest.start()
+        return ingest
+
+    def read_journal(self):
+        '''
+        Get the lines in the journal
+        '''
+        with open(self.path, "r") as fh:
+            return fh.read().splitlines()
+
+    def test_replay(self):
+        '''
+        Entries that weren't saved before a crash are saved on the next start.
+        A partly written last line is ignored
+        '''
+        first = self.ingest.put(score_fields(user="first"))
+        second = self.ingest.put(score_fields(user="second"))
+        self.ingest.put(score_fields(user="third"))
+        self.ingest.fh.write(json.dumps({"op": "done", "ids": [first]}) + "\n")
+        self.ingest.fh.write('{"op": "add", "id": "')
+        self.ingest.fh.close()
+
+        # Restarted after the crash
+        self.ingest = self.create()
+        self.assertEqual(self.ingest.outstanding, 2)
+        self.assertEqual(len(self.read_journal()), 2)
+
+        self.ingest.write(self.ingest.get_batch() + self.ingest.get_batch())
+        users = sorted(Leaderboard.objects.values_list("user", flat=True))
+        self.assertEqual(users, ["second", "third"])
+        self.assertTrue(Leaderboard.objects.filter(submission_id=second).exists())
+
+    def test_skip_saved(self):
+        '''
+        Entries already in the database aren't saved again
+        '''
+        submission_id = self.ingest.put(score_fields(user="saved"))
+        Leaderboard.objects.create(submission_id=submission_id, **score_fields(user="saved"))
+        self.ingest.put(score_fields(user="new"))
+
+        self.ingest.write([self.ingest.get_batch()[0], self.ingest.get_batch()[0]])
+        self.assertEqual(Leaderboard.objects.filter(user="saved").count(), 1)
+        self.assertEqual(Leaderboard.objects.filter(user="new").count(), 1)
+        self.assertEqual([[entry.user for entry in entries] for entries in self.committed], [["new"]])
+
+    def test_truncate(self):
+        '''
+        The journal is marked done while entries are outstanding and emptied once there are none
+        '''
+        first = self.ingest.put(score_fields(user="first"))
+        self.ingest.put(score_fields(user="second"))
+
+        self.ingest.write([self.ingest.get_batch()[0]])
+        lines = self.read_journal()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[-1]), {"op": "done", "ids": [first]})
+
+        self.ingest.write([self.ingest.get_batch()[0]])
+        self.assertEqual(self.ingest.outstanding, 0)
+        self.assertEqual(self.read_journal(), [])
+
+    def test_on_commit(self):
+        '''
+        on_commit gets the entries of each saved batch
+        '''
+        ids = [self.ingest.put(score_fields(user=str(i))) for i in range(3)]
+        self.ingest.write([self.ingest.get_batch()[0] for _ in ids])
+
+        self.assertEqual(len(self.committed), 1)
+        self.assertEqual([entry.submission_id for entry in self.committed[0]], ids)
+        self.assertEqual(Leaderboard.objects.count(), 3)
+
+
+class TestLeaderboardApi(TestCase):
+    '''
+    Test paging through the leaderboard and ranking users against a full ORDER BY
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run. Every RANKING field has ties
+        '''
+        rand = random.Random(0)
+        fields = []
+        for score, deaths, playtime, levels_completed in itertools.product(
+                (10, 20), (0, 1), (1.5, 2.5), (1, 2)):
+            for _ in range(2):
+                fields.append(score_fields(
+                    user="user{}".format(rand.randint(0, 5)), score=score, deaths=deaths,
+                    playtime=playtime, levels_completed=levels_completed))
+        rand.shuffle(fields)
+        for entry in fields:
+            Leaderboard.objects.create(**entry)
+
+    def get(self, name, **params):
+        '''
+        GET one of the API views
+        '''
+        return self.client.get(reverse("leaderboard:" + name), params)
+
+    def test_pages(self):
+        '''
+        Paging gives the whole leaderboard in rank order once
+        '''
+        expected = list(ranked().values_list("pk", flat=True))
+        for count in (1, 3, 7, len(expected), len(expected) + 1):
+            seen = []
+            params = {"count": count}
+            while True:
+                response = self.get("api_leaderboard", **params)
+                self.assertEqual(response.status_code, 200)
+                page = json.loads(response.content.decode("utf-8"))
+                self.assertLessEqual(len(page["entries"]), count)
+                seen.extend(entry["id"] for entry in page["entries"])
+                if page["next"] is None:
+                    break
+                params["after"] = page["next"]
+            self.assertEqual(seen, expected)
+
+    def test_rank(self):
+        '''
+        A user's rank is where their best entry is in the whole leaderboard
+        '''
+        expected = list(ranked())
+        for user in set(entry.user for entry in expected):
+            response = self.get("api_rank", user=user)
+            self.assertEqual(response.status_code, 200)
+            result = json.loads(response.content.decode("utf-8"))
+
+            rank = next(i for i, entry in enumerate(expected) if entry.user == user) + 1
+            self.assertEqual(result["rank"], rank)
+            self.assertEqual(result["entry"]["id"], expected[rank - 1].pk)
+
+        self.assertEqual(self.get("api_rank", user="nobody").status_code, 404)
+        self.assertEqual(self.get("api_rank").status_code, 400)
+
+    def test_bad_requests(self):
+        '''
+        Bad counts and cursors are rejected
+        '''
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+        for params in ({"count": 0}, {"count": -1}, {"count": "ten"},
+                       {"after": "not a cursor"}, {"after": cursor([10, 0, 1.5, 1])},
+                       {"after": cursor([10, 0, 1.5, 1, "1"])}, {"after": cursor([10, 0, 1.5, 1, True])},
+                       {"after": cursor({"score": 10})}):
+            self.assertEqual(self.get("api_leaderboard", **params).status_code, 400, params)
+
+
+class TestTopLeaderboard(TestCase):
+    '''
+    Test the in memory top of the leaderboard against the database
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        for score in (50, 40, 30):
+            Leaderboard.objects.create(**score_fields(score=score))
+        Leaderboard.objects.create(**score_fields(score=100, cheated=True))
+        self.top = TopLeaderboard(3, show_cheated=False)
+        self.top.rebuild(1)
+
+    def scores(self, top=None):
+        '''
+        Scores in the copy in order
+        '''
+        return [entry.score for entry in (top or self.top).entries]
+
+    def test_insert(self):
+        '''
+        Only entries that beat last place are inserted
+        '''
+        self.assertEqual(self.scores(), [50, 40, 30])
+        self.assertFalse(self.top.insert(Leaderboard.objects.create(**score_fields(score=20))))
+        self.assertFalse(self.top.insert(Leaderboard.objects.create(**score_fields(score=30))))
+        self.assertTrue(self.top.insert(Leaderboard.objects.create(**score_fields(score=45))))
+        self.assertEqual(self.scores(), [50, 45, 40])
+        self.assertEqual(self.top.check(), [])
+
+    def test_cheated(self):
+        '''
+        Cheated entries are left out unless they're shown
+        '''
+        cheated = Leaderboard.objects.create(**score_fields(score=200, cheated=True))
+        self.assertFalse(self.top.insert(cheated))
+        self.assertEqual(self.scores(), [50, 40, 30])
+
+        shown = TopLeaderboard(3, show_cheated=True)
+        shown.rebuild(1)
+        self.assertEqual(self.scores(shown), [200, 100, 50])
+
+    def test_version_jump(self):
+        '''
+        Entries are only applied on top of the version before. Otherwise the copy is rebuilt
+        '''
+        entry = Leaderboard.objects.create(**score_fields(score=60))
+        self.top.add([entry], 2)
+        self.assertEqual(self.top.version, 2)
+        self.assertEqual(self.scores(), [60, 50, 40])
+
+        # Another process saved this one
+        missed = Leaderboard.objects.create(**score_fields(score=70))
+        entry = Leaderboard.objects.create(**score_fields(score=65))
+        self.top.add([entry], 4)
+        self.assertIsNone(self.top.version)
+        self.assertEqual([entry.score for entry in self.top.get(4)], [70, 65, 60])
+        self.assertEqual(self.top.version, 4)
+        self.assertEqual(self.top.entries[0].pk, missed.pk)
+
+    def test_check(self):
+        '''
+        check() reports where the copy differs from the database
+        '''
+        self.assertEqual(self.top.check(), [])
+        first, second, third = [entry.pk for entry in self.top.entries]
+
+        # Saved without going through the copy
+        entry = Leaderboard.objects.create(**score_fields(score=45))
+        self.assertEqual(self.top.check(), [(2, entry.pk, second), (3, second, third)])
+        self.assertEqual(self.top.entries[0].pk, first)
+
+    def test_ingested(self):
+        '''
+        Saved batches bump the leaderboard version and go into the shared copy
+        '''
+        cache.clear()
+        version = invalidate_leaderboard()
+        self.assertEqual(invalidate_leaderboard(), version + 1)
+
+        TOP.rebuild(get_leaderboard_version())
+        entry = Leaderboard.objects.create(**score_fields(score=1000))
+        ingested([entry])
+        self.assertEqual(TOP.version, version + 2)
+        self.assertEqual(TOP.get(version + 2)[0].pk, entry.pk)
+
+    def test_command(self):
+        '''
+        rebuild_leaderboard --check passes when incremental updates match the
+        database and fails when they don't
+        '''
+        out = StringIO()
+        call_command("rebuild_leaderboard", "--check", stdout=out)
+        self.assertIn("match the database", out.getvalue())
+
+        def skip_cheated(top, entry):
+            return False if entry.cheated else insert(top, entry)
+
+        insert = TopLeaderboard.insert
+        with mock.patch.object(TopLeaderboard, "insert", skip_cheated):
+            with self.assertRaises(CommandError):
+                call_command("rebuild_leaderboard", "--check", stdout=StringIO(), stderr=StringIO())
+
+        err = StringIO()
+        call_command("rebuild_leaderboard", stdout=StringIO(), stderr=err)
+        self.assertIn("LocMemCache", err.getvalue())
+        self.assertEqual(TOP.version, get_leaderboard_version())
@@ -9,5 +9,7 @@ app_name = "leaderboard"
 urlpatterns = [
     url(r'^$', views.index, name="index"),
     url(r'submit/', views.submit, name="submit"),
-    url(r'lvlcomplete/', views.lvlcomplete, name="lvlcomplete")
+    url(r'lvlcomplete/', views.lvlcomplete, name="lvlcomplete"),
+    url(r'^api/leaderboard/$', views.api_leaderboard, name="api_leaderboard"),
+    url(r'^api/rank/$', views.api_rank, name="api_rank")
 ]
@@ -2,20 +2,65 @@
 Main view for the leaderboard app
 '''
 import os
+import re
 import sys
-import marshal
+import json
+import base64
+import hashlib
 import logging
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.template import loader
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET
 
 from jackitio.settings import REPO_BASE_DIR
-from .models import Leaderboard, LeaderboardForm
+from .ingest import IngestQueue
+from .models import RANKING, Leaderboard, LeaderboardForm
+from .ranking import RANKING_FIELDS, TopLeaderboard, rank_values, ranked, seek
+
+# The repo holds the code cache shared with the game
+if REPO_BASE_DIR not in sys.path:
+    sys.path.append(REPO_BASE_DIR)
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from codecache import SubmissionCode
 
 
 logger = logging.getLogger(__name__)
 
+# Cache keys for the leaderboard version, the rendered table for a version and when it last changed
+VERSION_CACHE_KEY = "leaderboard:version"
+TABLE_CACHE_KEY = "leaderboard:table:{}"
+MODIFIED_CACHE_KEY = "leaderboard:modified"
+
+# The game sends the id it journaled a submission under in this header. It's a uuid4 hex
+SUBMISSION_ID_HEADER = "HTTP_X_SUBMISSION_ID"
+SUBMISSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# In memory copy of the top of the leaderboard shown on the leaderboard page
+TOP = TopLeaderboard(settings.LEADERBOARD_PAGE_SIZE, settings.LEADERBOARD_SHOW_CHEATED)
+
+
+def ingested(entries):
+    '''
+    Called by the ingest writer thread after it saves submissions
+    '''
+    TOP.add(entries, invalidate_leaderboard())
+
+
+# Submissions are journaled and saved in batches by one writer thread
+INGEST = IngestQueue(
+    settings.LEADERBOARD_INGEST_JOURNAL,
+    settings.LEADERBOARD_INGEST_BATCH_SIZE,
+    settings.LEADERBOARD_INGEST_BATCH_TIME,
+    ingested
+)
+
 
 FLAGS = []
 with open(os.path.join(REPO_BASE_DIR, "flags.txt"), "r") as fh:
@@ -46,7 +91,7 @@ def validate_code(data, code):
         if lvl_data is not None:
             logger.info("Validating level %s", str(level_completed))
 
-        code_obj = marshal.load(open(os.path.join(REPO_BASE_DIR, "gen3.dump"), "rb"))
+        code_obj = SubmissionCode.load(os.path.join(REPO_BASE_DIR, "gen3.dump"))
 
         # pylint: disable=W0122
         exec(code_obj, {
@@ -83,8 +128,6 @@ def validate(data):
     '''
     Make sure everything looks tasty
     '''
-    sys.path.append(REPO_BASE_DIR)
-
     if not validate_code(data, data.get("game_id", None)):
         return True, "Invalid game_id"
 
@@ -128,32 +171,182 @@ def validate(data):
     return False, ""
 
 
-def get_leaderboard():
+def get_leaderboard(page_size=None, show_cheated=None):
     '''
-    Get all the entries in the leaderboard
+    Get the top page_size entries in the leaderboard. Pages that fit in TOP
+    come from memory. Others read only the page from the database, walking
+    the leaderboard_rank index in order
     '''
+    if page_size is None:
+        page_size = settings.LEADERBOARD_PAGE_SIZE
+    if show_cheated is None:
+        show_cheated = settings.LEADERBOARD_SHOW_CHEATED
+
     try:
-        ret = Leaderboard.objects.order_by("-score", "deaths", "playtime", "-levels_completed")
-        if len(ret) > 50:
-            ret = ret[:50]
-        return {'leaderboard': ret}
+        if page_size <= TOP.size and show_cheated == TOP.show_cheated:
+            return {'leaderboard': TOP.get(get_leaderboard_version(), page_size)}
+
+        ret = Leaderboard.objects.all()
+        if not show_cheated:
+            ret = ret.filter(cheated=False)
+        return {'leaderboard': list(ret.order_by(*RANKING)[:page_size])}
     except BaseException:
         return {'leaderboard': []}
 
 
+def new_leaderboard_version():
+    '''
+    Version to start from when there isn't one in the cache (evicted or restarted).
+    Based on the time so tables cached under an older version are never used
+    '''
+    return int(timezone.now().timestamp() * 1000)
+
+
+def get_leaderboard_version():
+    '''
+    Get the current leaderboard version
+    '''
+    return cache.get_or_set(VERSION_CACHE_KEY, new_leaderboard_version, None)
+
+
+def get_leaderboard_table():
+    '''
+    Get the rendered leaderboard table as {"html", "etag", "last_modified"}.
+    Rendered once and cached until the next submission. Tables are cached per
+    version so one rendered while a submission comes in is never used after it
+    '''
+    key = TABLE_CACHE_KEY.format(get_leaderboard_version())
+    table = cache.get(key)
+    if table is not None:
+        return table
+
+    html = loader.render_to_string('leaderboard/table.html', get_leaderboard())
+    etag = hashlib.md5(html.encode("utf-8")).hexdigest()
+
+    # Keep the old time if the cache expired but nothing changed
+    modified = cache.get(MODIFIED_CACHE_KEY)
+    if modified is None or modified[0] != etag:
+        modified = (etag, timezone.now().replace(microsecond=0))
+        cache.set(MODIFIED_CACHE_KEY, modified, None)
+
+    table = {"html": html, "etag": etag, "last_modified": modified[1]}
+    cache.set(key, table, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return table
+
+
+def invalidate_leaderboard():
+    '''
+    Move on to a new leaderboard version so the cached table isn't used
+    again. Called whenever the leaderboard changes. Returns the new version
+    '''
+    try:
+        return cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        version = new_leaderboard_version()
+        cache.set(VERSION_CACHE_KEY, version, None)
+        return version
+
+
+@condition(
+    etag_func=lambda request: get_leaderboard_table()["etag"],
+    last_modified_func=lambda request: get_leaderboard_table()["last_modified"]
+)
 def index(request):
     '''
-    Home page and load most recent leaderboard
+    Home page and load most recent leaderboard. Answers conditional GETs
+    with 304 if the leaderboard hasn't changed
     '''
     template = loader.get_template('leaderboard/index.html')
-    context = get_leaderboard()
+    context = {'leaderboard_table': mark_safe(get_leaderboard_table()["html"])}
     return HttpResponse(template.render(context, request))
 
 
+def encode_cursor(entry):
+    '''
+    Cursor for the page of the leaderboard after entry
+    '''
+    return base64.urlsafe_b64encode(json.dumps(rank_values(entry)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    '''
+    Get the RANKING field values in a cursor. Raises ValueError if it isn't valid
+    '''
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    if not isinstance(values, list) or len(values) != len(RANKING_FIELDS) or \
+       not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+@require_GET
+def api_leaderboard(request):
+    '''
+    Page through the leaderboard as JSON. Takes the number of entries to get
+    (count) and the cursor of the page to get (after). Pages are found by
+    seeking past the last entry of the page before, so deep pages cost the
+    same as the first
+    '''
+    try:
+        count = int(request.GET.get("count", settings.LEADERBOARD_PAGE_SIZE))
+        after = request.GET.get("after", None)
+        if after is not None:
+            after = decode_cursor(after)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid count or cursor")
+
+    if count < 1:
+        return HttpResponseBadRequest("Invalid count")
+    count = min(count, settings.LEADERBOARD_API_MAX_COUNT)
+
+    ret = ranked(settings.LEADERBOARD_SHOW_CHEATED)
+    if after is not None:
+        ret = ret.filter(seek(after))
+    entries = list(ret[:count])
+
+    return JsonResponse({
+        "entries": [entry.to_json() for entry in entries],
+        "next": encode_cursor(entries[-1]) if len(entries) == count else None
+    })
+
+
+@require_GET
+def api_rank(request):
+    '''
+    Get a user's best entry and its rank as JSON. The rank is a count of
+    the entries ahead of it on the leaderboard_rank index
+    '''
+    user = request.GET.get("user", None)
+    if not user:
+        return HttpResponseBadRequest("No user provided")
+
+    leaderboard = ranked(settings.LEADERBOARD_SHOW_CHEATED)
+    best = leaderboard.filter(user=user).first()
+    if best is None:
+        return JsonResponse({"error": "No entries for {}".format(user)}, status=404)
+
+    return JsonResponse({
+        "entry": best.to_json(),
+        "rank": leaderboard.filter(seek(rank_values(best), after=False)).count() + 1
+    })
+
+
+def get_submission_id(request):
+    '''
+    Get the id the game sent with a submission. None if it didn't send a valid one
+    '''
+    submission_id = request.META.get(SUBMISSION_ID_HEADER, None)
+    if submission_id is None or not SUBMISSION_ID_PATTERN.match(submission_id):
+        return None
+    return submission_id
+
+
 @csrf_exempt
 def submit(request):
     '''
-    Submit a score
+    Submit a score. Returns once the entry is journaled. It shows up on the
+    leaderboard when the ingest writer saves its batch a moment later.
+    Retries of a submission the game sent an id with are only saved once
     '''
     if request.POST:
         d = request.POST.dict()
@@ -161,7 +354,17 @@ def submit(request):
             form = LeaderboardForm(request.POST)
             leader = form.save(commit=False)
             leader.cheated, leader.cheated_reason = validate(d)
-            leader.save()
+
+            INGEST.start()
+            INGEST.put({
+                'user': leader.user,
+                'score': leader.score,
+                'playtime': leader.playtime,
+                'deaths': leader.deaths,
+                'levels_completed': leader.levels_completed,
+                'cheated': leader.cheated,
+                'cheated_reason': leader.cheated_reason
+            }, get_submission_id(request))
 
             if leader.cheated and leader.cheated_reason != "Invalid game_id":
                 logger.info("Cheated the good way!")
@@ -11,7 +11,8 @@ setup(
     options={
         "build_exe": {
             "includes": [
-                "deploy.py"
+                "deploy.py",
+                "codecache.py"
             ],
             "excludes": [
                 "django",
@@ -26,7 +27,8 @@ setup(
                 "OpenSSL",
                 "urllib3",
                 "ssl",
-                "requests"
+                "requests",
+                "numpy"
             ],
             "include_files": [
                 ("gen.dump", "lib/gen.dump"),
@@ -0,0 +1,74 @@
+'''
+Test the synthetic levels used by the benchmarks
+'''
+
+import unittest
+from benchmark import SyntheticLevel, SCENARIOS, COMPARED_PHASES, setup_engine, run_scenario
+from jackit.core.level import LevelMap
+from deploy import SiteDeployment
+
+class TestSyntheticLevel(unittest.TestCase):
+    '''
+    Test SyntheticLevel map generation
+    '''
+    def generate(self, seed=0):
+        '''
+        Generate a small map
+        '''
+        return SyntheticLevel.generate(
+            columns=40, rows=20, tiles=100, enemies=5, coin_density=0.1, seed=seed)
+
+    def test_generate(self):
+        '''
+        Maps are walled in and have what was asked for
+        '''
+        level_map = self.generate()
+        self.assertEqual(len(level_map), 20)
+        self.assertTrue(all(len(line) == 40 for line in level_map))
+        self.assertEqual(level_map[0], LevelMap.WALL * 40)
+        self.assertEqual(level_map[-1], LevelMap.WALL + LevelMap.FLOOR * 38 + LevelMap.WALL)
+
+        cells = "".join(level_map)
+        self.assertEqual(cells.count(LevelMap.SPAWN), 1)
+        enemies = sum(cells.count(kind) for kind in "BLRZ")
+        self.assertEqual(enemies, 5)
+
+    def test_deterministic(self):
+        '''
+        The same seed gives the same map
+        '''
+        self.assertEqual(self.generate(1), self.generate(1))
+        self.assertNotEqual(self.generate(1), self.generate(2))
+
+class TestRunScenario(unittest.TestCase):
+    '''
+    Run a short scenario through the real engine
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        # pylint: disable=protected-access
+        self.site_config = SiteDeployment._config
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        # The engine stays around but other tests expect the config to be unset
+        # pylint: disable=protected-access
+        SiteDeployment._config = self.site_config
+
+    def test_run_scenario(self):
+        '''
+        Every compared phase is timed and nothing is queued for the leaderboard
+        '''
+        engine = setup_engine()
+        phases = run_scenario(engine, SCENARIOS["small"], frames=10, warmup=2)
+        for phase in COMPARED_PHASES:
+            self.assertIn(phase, phases)
+            self.assertGreaterEqual(phases[phase]["p50"], 0)
+        self.assertGreater(phases["total"]["mean"], 0)
+
+        self.assertIsNone(engine.journal)
+        self.assertIsNone(engine.submissions.thread)
@@ -0,0 +1,73 @@
+'''
+Test loading code dumps through the CodeCache
+'''
+
+import os
+import shutil
+import marshal
+import tempfile
+import unittest
+from codecache import CodeCache, CodeCacheError
+
+class TestCodeCache(unittest.TestCase):
+    '''
+    Test the CodeCache methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "test.dump")
+        self.cache = CodeCache()
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        shutil.rmtree(self.tmp_dir)
+
+    def dump(self, source, mtime):
+        '''
+        Compile source into the dump file and set its modification time
+        '''
+        with open(self.path, "wb") as fh:
+            marshal.dump(compile(source, "<string>", "exec"), fh)
+        os.utime(self.path, (mtime, mtime))
+
+    def run_dump(self):
+        '''
+        Run the cached dump and get the result it sets
+        '''
+        scope = {}
+        exec(self.cache.load(self.path), scope) # pylint: disable=W0122
+        return scope["result"]
+
+    def test_cached(self):
+        '''
+        Dumps are only read again when they change
+        '''
+        self.dump("result = 1", 1000)
+        code_obj = self.cache.load(self.path)
+        self.assertIs(self.cache.load(self.path), code_obj)
+        self.assertEqual(self.run_dump(), 1)
+
+        self.dump("result = 2", 2000)
+        self.assertEqual(self.run_dump(), 2)
+
+    def test_bad_dump(self):
+        '''
+        Missing dumps and dumps that aren't code are rejected
+        '''
+        with self.assertRaises(CodeCacheError):
+            self.cache.load(self.path)
+
+        with open(self.path, "wb") as fh:
+            marshal.dump({"not": "code"}, fh)
+        with self.assertRaises(CodeCacheError):
+            self.cache.load(self.path)
+
+        with open(self.path, "wb") as fh:
+            fh.write(b"\xff")
+        with self.assertRaises(CodeCacheError):
+            self.cache.load(self.path)
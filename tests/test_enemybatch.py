@@ -0,0 +1,74 @@
+'''
+Test the batched enemy simulation
+'''
+
+import unittest
+import pygame
+from benchmark import SCENARIOS, setup_engine, run_scenario
+from deploy import SiteDeployment
+from jackit.core import CustomEvent
+from jackit.actors.enemybatch import EnemyBatch
+
+class TestEnemyBatch(unittest.TestCase):
+    '''
+    Test EnemyBatch against a synthetic level
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        # pylint: disable=protected-access
+        self.site_config = SiteDeployment._config
+
+        engine = setup_engine()
+        run_scenario(engine, SCENARIOS["small"], frames=1, warmup=0)
+        self.level = engine.current_level
+        self.player = self.level.player
+        self.enemies = list(self.level.enemies)
+        pygame.event.clear()
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        # pylint: disable=protected-access
+        SiteDeployment._config = self.site_config
+
+    def test_sleeping_enemies(self):
+        '''
+        Only the awake enemies are stepped
+        '''
+        batch = EnemyBatch(self.level, self.enemies, seed=0)
+        awake = self.enemies[:1]
+        positions = [enemy.rect.topleft for enemy in self.enemies]
+        for _ in range(30):
+            batch.update(awake)
+
+        self.assertNotEqual(awake[0].rect.topleft, positions[0])
+        for enemy, position in zip(self.enemies[1:], positions[1:]):
+            self.assertEqual(enemy.rect.topleft, position)
+            i = batch.index[enemy]
+            self.assertEqual((batch.x[i], batch.y[i]), position)
+
+    def test_stops_at_player(self):
+        '''
+        An enemy running into the player stops at their edge and kills them
+        '''
+        enemy = self.enemies[0]
+        enemy.rect.topleft = (
+            self.player.rect.left - enemy.rect.width - 3,
+            self.player.rect.bottom - enemy.rect.height)
+        enemy.go_right()
+        enemy.change_x = 6
+        enemy.change_y = 0
+
+        batch = EnemyBatch(self.level, self.enemies, seed=0)
+        batch.update([enemy])
+
+        self.assertEqual(enemy.rect.right, self.player.rect.left)
+        self.assertEqual(batch.x[batch.index[enemy]], enemy.rect.x)
+        kills = [
+            event for event in pygame.event.get()
+            if event.type == CustomEvent.KILL_SPRITE and event.sprite is self.player
+        ]
+        self.assertEqual(len(kills), 1)
@@ -0,0 +1,79 @@
+'''
+Test folding the user's patches into constants
+'''
+
+import unittest
+from jackit.core.folding import fold_patches
+from jackit.core.patch import UserPatch
+
+CHALLENGE = """# Tweak away
+def get_top_speed():
+    return 15
+def get_jump_speed():
+    '''Higher'''
+    return -2.5
+def get_x_acceleration():
+    return get_top_speed() / 10
+def is_moving_up(change_y):
+    return change_y < 0
+def is_moving_down(change_y):
+    return 0.5 <= change_y
+def get_grav_acceleration():
+    return 1
+get_grav_acceleration = lambda: 2
+"""
+
+class TestFolding(unittest.TestCase):
+    '''
+    Test fold_patches and patching folded functions
+    '''
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        UserPatch.fold(None)
+        UserPatch.unpatch()
+
+    def test_fold(self):
+        '''
+        Only functions returning a literal or comparing their argument to one are folded
+        '''
+        folded = fold_patches(CHALLENGE)
+        self.assertEqual(sorted(folded), ["get_jump_speed", "get_top_speed", "is_moving_down", "is_moving_up"])
+        self.assertEqual(folded["get_top_speed"].constant, 15)
+        self.assertEqual(folded["get_jump_speed"].constant, -2.5)
+
+        for change_y in (-1, 0, 0.25, 0.5, 3):
+            self.assertEqual(folded["is_moving_up"].predicate(change_y), change_y < 0)
+            self.assertEqual(folded["is_moving_down"].predicate(change_y), 0.5 <= change_y)
+
+        self.assertEqual(fold_patches("def broken(:"), {})
+
+    def test_patch(self):
+        '''
+        Folded functions are patched in without being called
+        '''
+        scope = {}
+        exec(compile(CHALLENGE, "<string>", "exec"), scope) # pylint: disable=W0122
+
+        UserPatch.fold(CHALLENGE)
+        UserPatch.patch_method("get_top_speed", scope["get_top_speed"], [int])
+        UserPatch.patch_method("get_x_acceleration", scope["get_x_acceleration"], [float])
+        UserPatch.patch_method("is_moving_up", scope["is_moving_up"], [bool], 0)
+        UserPatch.patch_method("get_grav_acceleration", scope["get_grav_acceleration"], [int])
+        UserPatch.fold(None)
+
+        self.assertEqual(UserPatch.constants, {"get_top_speed": 15})
+        self.assertEqual(list(UserPatch.predicates), ["is_moving_up"])
+        self.assertEqual(sorted(UserPatch.patch_map), ["get_grav_acceleration", "get_x_acceleration"])
+
+        self.assertEqual(UserPatch.get_top_speed(), 15)
+        self.assertEqual(UserPatch.get_x_acceleration(), 1.5)
+        self.assertEqual(UserPatch.get_grav_acceleration(), 2)
+        self.assertTrue(UserPatch.is_moving_up(-3))
+        self.assertFalse(UserPatch.is_moving_up(3))
+
+        # Patching again with something that can't be folded replaces the constant
+        UserPatch.patch_method("get_top_speed", lambda: 4, [int])
+        self.assertEqual(UserPatch.constants, {})
+        self.assertEqual(UserPatch.get_top_speed(), 4)
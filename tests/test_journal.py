@@ -0,0 +1,96 @@
+'''
+Test the SubmissionJournal class and flushing it
+'''
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from jackit.core.journal import SubmissionJournal
+from jackit.core.submission import SubmissionWorker
+
+class TestSubmissionJournal(unittest.TestCase):
+    '''
+    Test the SubmissionJournal methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "submissions.journal")
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reload(self):
+        '''
+        Only submissions that weren't marked done survive a reload
+        '''
+        journal = SubmissionJournal(self.path)
+        journal.load()
+        first = journal.add("score", ["url", "user", 10])
+        second = journal.add("level", ["url", "user", 10, 2])
+        journal.done(first)
+        journal.close()
+
+        journal = SubmissionJournal(self.path)
+        pending = journal.load()
+        journal.close()
+        self.assertEqual(pending, [{"id": second, "kind": "level", "args": ["url", "user", 10, 2]}])
+
+        # The journal is compacted down to the pending submission
+        with open(self.path) as fh:
+            self.assertEqual(len(fh.readlines()), 1)
+
+    def test_partial_line(self):
+        '''
+        A line cut off by a crash is ignored
+        '''
+        journal = SubmissionJournal(self.path)
+        journal.load()
+        submission_id = journal.add("score", [1])
+        journal.close()
+        with open(self.path, "a") as fh:
+            fh.write('{"op": "add", "id": "abc", "ki')
+
+        pending = SubmissionJournal(self.path).load()
+        self.assertEqual([entry["id"] for entry in pending], [submission_id])
+
+    def test_flush(self):
+        '''
+        The worker sends journaled submissions once each and marks them done
+        '''
+        journal = SubmissionJournal(self.path, sync_interval=0.01)
+        journal.load()
+        ids = [journal.add("score", [i]) for i in range(5)]
+
+        sent = []
+        sent_ids = []
+        def send(value, session=None, timeout=None, submission_id=None): # pylint: disable=unused-argument
+            sent.append(value)
+            sent_ids.append(submission_id)
+
+        def resolve(entry):
+            return ("Score", send, entry["args"])
+
+        worker = SubmissionWorker(journal=journal, resolve=resolve, batch_size=2)
+
+        # Already queued submissions aren't sent again by the flusher
+        worker.submit("Score", resolve({"args": [0]})[1], 0, submission_id=ids[0])
+        worker.submit("Score", resolve({"args": [0]})[1], 0, submission_id=ids[0])
+        worker.start()
+
+        end = time.time() + 5
+        while journal.pending and time.time() < end:
+            time.sleep(0.01)
+        worker.stop(5)
+        journal.close()
+
+        self.assertEqual(sorted(sent), [0, 1, 2, 3, 4])
+        self.assertEqual(sorted(sent_ids), sorted(ids))
+        self.assertEqual(SubmissionJournal(self.path).load(), [])
@@ -0,0 +1,85 @@
+'''
+Test compiling level maps and the compiled level cache
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from jackit.core.levelcompiler import CompiledLevel, LevelCompiler
+
+LEVEL_MAP = [
+    "WWWWW",
+    "W  1 E",
+    "WS",
+    "FFFFF",
+]
+
+def parse_map(level_map, block_width=24, block_height=24):
+    '''
+    Spawn table the way the level used to parse the map
+    '''
+    return [
+        (char, col * block_width, row * block_height)
+        for row, line in enumerate(level_map)
+        for col, char in enumerate(line) if char != " "
+    ]
+
+class TestCompiledLevel(unittest.TestCase):
+    '''
+    Test the CompiledLevel class
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        shutil.rmtree(self.cache_dir)
+
+    def test_from_map(self):
+        '''
+        Compiled level matches the map with short rows padded
+        '''
+        compiled = CompiledLevel.from_map(LEVEL_MAP, 24, 24)
+        self.assertEqual((compiled.rows, compiled.columns), (4, 6))
+        self.assertEqual((compiled.width, compiled.height), (144, 96))
+        self.assertEqual(compiled.death_zone, (-50, -50, 194, 146))
+        self.assertEqual(compiled.spawn_table(), parse_map(LEVEL_MAP))
+
+    def test_write_read(self):
+        '''
+        Reading a written level gives back the same level, memory mapped or not
+        '''
+        compiled = CompiledLevel.from_map(LEVEL_MAP, 24, 24)
+        path = os.path.join(self.cache_dir, "level.jkl")
+        compiled.write(path)
+
+        for threshold in (65536, 0):
+            loaded = CompiledLevel.read(path, mmap_threshold=threshold)
+            self.assertTrue(numpy.array_equal(loaded.tiles, compiled.tiles))
+            self.assertEqual(loaded.death_zone, compiled.death_zone)
+            self.assertEqual(loaded.spawn_table(), compiled.spawn_table())
+            del loaded
+
+    def test_cache(self):
+        '''
+        Maps are compiled once and edited maps get a new cache file
+        '''
+        compiler = LevelCompiler(self.cache_dir)
+        compiler.load(LEVEL_MAP)
+        self.assertTrue(os.path.exists(compiler.cache_file(LEVEL_MAP)))
+
+        edited = LEVEL_MAP[:-1] + ["GGGGG"]
+        self.assertNotEqual(compiler.cache_file(LEVEL_MAP), compiler.cache_file(edited))
+        self.assertEqual(compiler.load(edited).spawn_table(), parse_map(edited))
+
+        # Corrupt cache files are recompiled
+        with open(compiler.cache_file(LEVEL_MAP), "wb") as fh:
+            fh.write(b"junk")
+        self.assertEqual(compiler.load(LEVEL_MAP).spawn_table(), parse_map(LEVEL_MAP))
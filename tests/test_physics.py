@@ -0,0 +1,79 @@
+'''
+Test resolving Physics values with the user's patches
+'''
+
+import unittest
+from jackit.core.patch import UserPatch
+from jackit.core.physics import Physics
+
+class TestPhysics(unittest.TestCase):
+    '''
+    Test the Physics snapshot
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.stats = Physics()
+        self.stats.use_patch = True
+        self.calls = 0
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        UserPatch.unpatch()
+        UserPatch.watchdog.begin_frame()
+
+    def get_top_speed(self):
+        '''
+        Patched getter that counts its calls
+        '''
+        self.calls += 1
+        return 12
+
+    def test_patched(self):
+        '''
+        Patched getters are called once per patch change
+        '''
+        UserPatch.patch_method("get_top_speed", self.get_top_speed, [int])
+        self.calls = 0
+
+        for _ in range(10):
+            self.assertEqual(self.stats.resolve().top_speed, 12)
+            self.assertEqual(self.stats.top_speed, 12)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.stats.jump_speed, 8)
+
+        UserPatch.unpatch()
+        self.assertEqual(self.stats.top_speed, 6)
+
+        self.stats.use_patch = False
+        UserPatch.patch_method("get_top_speed", self.get_top_speed, [int])
+        self.assertEqual(self.stats.top_speed, 6)
+
+    def test_skipped(self):
+        '''
+        A getter skipped for running out of frame time is called again next frame
+        '''
+        UserPatch.patch_method("get_top_speed", self.get_top_speed, [int])
+
+        UserPatch.watchdog.begin_frame()
+        UserPatch.watchdog.frame_used = UserPatch.watchdog.frame_budget
+        self.assertEqual(self.stats.top_speed, 6)
+
+        UserPatch.watchdog.begin_frame()
+        self.assertEqual(self.stats.top_speed, 12)
+        self.assertEqual(self.stats.top_speed, 12)
+        self.assertEqual(self.calls, 2)
+
+    def test_setter(self):
+        '''
+        Setting a value is seen by the next snapshot
+        '''
+        snapshot = self.stats.resolve()
+        self.stats.air_braking = 0.5
+        self.stats.top_speed = 7
+        self.assertEqual(snapshot.air_braking, 0.15)
+        self.assertEqual(self.stats.resolve().air_braking, 0.5)
+        self.assertEqual(self.stats.resolve().top_speed, 7)
@@ -0,0 +1,171 @@
+'''
+Test the FrameProfiler class
+'''
+
+import os
+import csv
+import json
+import shutil
+import time
+import tempfile
+import unittest
+import pygame
+from jackit.core.profiler import FrameProfiler, PatchProfiler
+from jackit.core.patch import UserPatch, UserPatchSingleton
+
+class SlowFont:
+    '''
+    Font that takes a while to render
+    '''
+    @staticmethod
+    def get_linesize():
+        '''
+        Height of a line
+        '''
+        return 10
+
+    @staticmethod
+    def render(text, antialias, color, background): # pylint: disable=unused-argument
+        '''
+        Sleep then render nothing
+        '''
+        time.sleep(0.05)
+        return pygame.Surface((1, 1))
+
+class TestFrameProfiler(unittest.TestCase):
+    '''
+    Test the FrameProfiler methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.profiler = FrameProfiler(("update", "draw"), size=4)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        shutil.rmtree(self.tmp_dir)
+
+    def record(self, update, draw):
+        '''
+        Record a frame with the provided phase times
+        '''
+        self.profiler.begin_frame()
+        self.profiler.samples[self.profiler.index] = (update, draw)
+        self.profiler.end_frame()
+
+    def test_ring_buffer(self):
+        '''
+        Only the last size frames are kept, oldest first
+        '''
+        for i in range(6):
+            self.record(i, 0)
+        self.assertEqual(self.profiler.frames()[:, 0].tolist(), [2, 3, 4, 5])
+
+    def test_unfinished_frame_overwritten(self):
+        '''
+        A frame that wasn't ended isn't recorded
+        '''
+        self.profiler.begin_frame()
+        self.profiler.mark("update")
+        self.record(1, 2)
+        self.assertEqual(self.profiler.frames().tolist(), [[1, 2]])
+
+    def test_percentiles(self):
+        '''
+        Percentiles per phase and for the total frame time
+        '''
+        self.assertEqual(self.profiler.percentiles(), {})
+        for i in range(4):
+            self.record(i, 1)
+
+        result = self.profiler.percentiles((0, 100))
+        self.assertEqual(result["update"], [0, 3])
+        self.assertEqual(result["draw"], [1, 1])
+        self.assertEqual(result["total"], [1, 4])
+
+    def test_dump(self):
+        '''
+        Dump to CSV and JSON
+        '''
+        self.record(1, 2)
+        csv_path = os.path.join(self.tmp_dir, "frames.csv")
+        json_path = os.path.join(self.tmp_dir, "frames.json")
+        self.profiler.dump(csv_path)
+        self.profiler.dump(json_path)
+
+        with open(csv_path) as fh:
+            self.assertEqual(list(csv.reader(fh)), [["update", "draw"], ["1.0", "2.0"]])
+
+        with open(json_path) as fh:
+            raw = json.load(fh)
+        self.assertEqual(raw["phases"], ["update", "draw"])
+        self.assertEqual(raw["frames"], [[1, 2]])
+
+    def test_overlay_not_counted(self):
+        '''
+        Drawing the overlay doesn't add to the next phase
+        '''
+        self.profiler.visible = True
+        self.profiler.font = SlowFont()
+        self.profiler.overlay_lines = ["line"]
+
+        self.profiler.begin_frame()
+        self.profiler.draw(pygame.Surface((10, 10)))
+        self.profiler.mark("draw")
+        self.assertLess(self.profiler.samples[self.profiler.index, 1], 25)
+
+class TestPatchProfiler(unittest.TestCase):
+    '''
+    Test the PatchProfiler and profiling UserPatch
+    '''
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        UserPatch.set_profiler(None)
+        UserPatch.unpatch()
+
+    def test_record(self):
+        '''
+        Calls are counted per method and per frame
+        '''
+        profiler = PatchProfiler()
+        profiler.record("get_top_speed", 1.0)
+        profiler.record("is_moving_up", 0.5)
+        profiler.record("is_moving_up", 0.5)
+        profiler.begin_frame()
+        profiler.record("get_top_speed", 2.0)
+
+        self.assertEqual(profiler.methods, {"get_top_speed": [2, 3.0], "is_moving_up": [2, 1.0]})
+        self.assertEqual((profiler.last_frame_calls, profiler.last_frame_time), (3, 2.0))
+        self.assertEqual((profiler.frame_calls, profiler.frame_time), (1, 2.0))
+
+        summary = profiler.summary()
+        self.assertEqual(len(summary), 3)
+        self.assertTrue(summary[1].startswith("get_top_speed"))
+
+        profiler.reset()
+        self.assertEqual(profiler.methods, {})
+
+    def test_user_patch(self):
+        '''
+        Patched calls are only recorded while profiling
+        '''
+        self.assertNotIn("call_patch", vars(UserPatch))
+        UserPatch.patch_method("get_top_speed", lambda: 10, [int])
+
+        profiler = PatchProfiler()
+        UserPatch.set_profiler(profiler)
+        self.assertEqual(UserPatch.get_top_speed(), 10)
+        self.assertEqual(UserPatch.get_jump_speed(), None)
+        self.assertEqual(sorted(profiler.methods), ["get_jump_speed", "get_top_speed"])
+        self.assertEqual(profiler.frame_calls, 2)
+
+        UserPatch.set_profiler(None)
+        self.assertEqual(UserPatch.call_patch.__func__, UserPatchSingleton.call_patch)
+        UserPatch.get_top_speed()
+        self.assertEqual(profiler.frame_calls, 2)
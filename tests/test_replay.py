@@ -0,0 +1,81 @@
+'''
+Test recording and reading input logs
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import pygame
+from jackit.core.replay import InputRecorder, InputReplay, KeyState, ReplayError
+
+def key_event(event_type, key, mod=0):
+    '''
+    Create a key event
+    '''
+    return pygame.event.Event(event_type, {"key": key, "mod": mod})
+
+class TestReplay(unittest.TestCase):
+    '''
+    Test InputRecorder and InputReplay
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "input.jkr")
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        '''
+        A replay gives back what was recorded
+        '''
+        recorder = InputRecorder(self.path, 1234, 1000.0 / 60)
+        recorder.record(0, [key_event(pygame.KEYDOWN, pygame.K_d)])
+        recorder.record(5, [
+            key_event(pygame.KEYUP, pygame.K_d),
+            key_event(pygame.KEYDOWN, pygame.K_a, pygame.KMOD_LSHIFT)
+        ])
+        recorder.record_patch(7, "player.stats.top_speed = 10\n")
+        recorder.close(10)
+
+        replay = InputReplay(self.path)
+        self.assertEqual(replay.seed, 1234)
+        self.assertAlmostEqual(replay.frame_time, 1000.0 / 60)
+
+        events = replay.events(5)
+        self.assertEqual([e.type for e in events], [pygame.KEYUP, pygame.KEYDOWN])
+        self.assertEqual([e.key for e in events], [pygame.K_d, pygame.K_a])
+        self.assertEqual(events[1].mod, pygame.KMOD_LSHIFT)
+        self.assertEqual(replay.events(1), [])
+
+        self.assertTrue(replay.check_patch(7, "player.stats.top_speed = 10\n"))
+        self.assertFalse(replay.check_patch(8, "anything"))
+
+        self.assertFalse(replay.is_finished(9))
+        self.assertTrue(replay.is_finished(10))
+
+    def test_bad_log(self):
+        '''
+        Logs that aren't input logs are rejected
+        '''
+        with open(self.path, "wb") as fh:
+            fh.write(b"not a log at all")
+        with self.assertRaises(ReplayError):
+            InputReplay(self.path)
+
+    def test_key_state(self):
+        '''
+        Key state follows key events
+        '''
+        keys = KeyState()
+        keys.update([key_event(pygame.KEYDOWN, pygame.K_a), key_event(pygame.KEYDOWN, pygame.K_d)])
+        keys.update([key_event(pygame.KEYUP, pygame.K_a)])
+        self.assertFalse(keys[pygame.K_a])
+        self.assertTrue(keys[pygame.K_d])
@@ -0,0 +1,108 @@
+'''
+Test the SpatialHash class and spatially indexed sprite groups
+'''
+
+import random
+import unittest
+import pygame
+from jackit.core.spatialhash import SpatialHash
+from jackit.core.spritegroup import SpriteGroup
+
+class FakeSprite(pygame.sprite.Sprite):
+    '''
+    Minimal sprite with a rect
+    '''
+    def __init__(self, x_pos, y_pos, width=24, height=24, static=True, always_simulate=False):
+        super(FakeSprite, self).__init__()
+        self.rect = pygame.Rect(x_pos, y_pos, width, height)
+        self.static = static
+        self.always_simulate = always_simulate
+
+class TestSpatialHash(unittest.TestCase):
+    '''
+    Test the SpatialHash methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.spatial_hash = SpatialHash(24, 24)
+
+    def test_cells_for_rect(self):
+        '''
+        Test cells_for_rect() on and off the cell boundaries
+        '''
+        self.assertEqual(self.spatial_hash.cells_for_rect(pygame.Rect(0, 0, 24, 24)), [(0, 0)])
+        self.assertEqual(
+            self.spatial_hash.cells_for_rect(pygame.Rect(10, 0, 24, 24)), [(0, 0), (1, 0)])
+        self.assertEqual(
+            self.spatial_hash.cells_for_rect(pygame.Rect(-5, -5, 5, 5)), [(-1, -1)])
+
+    def test_add_remove(self):
+        '''
+        Test adding and removing a sprite
+        '''
+        sprite = FakeSprite(48, 48)
+        self.spatial_hash.add(sprite)
+        self.assertIn(sprite, self.spatial_hash.query(pygame.Rect(50, 50, 2, 2)))
+        self.assertNotIn(sprite, self.spatial_hash.query(pygame.Rect(0, 0, 24, 24)))
+
+        # Rects much bigger than the occupied area take the other path
+        self.assertIn(sprite, self.spatial_hash.query(pygame.Rect(-10000, -10000, 20000, 20000)))
+        self.assertNotIn(sprite, self.spatial_hash.query(pygame.Rect(-10000, -10000, 10000, 20000)))
+
+        self.spatial_hash.remove(sprite)
+        self.assertEqual(len(self.spatial_hash), 0)
+        self.assertEqual(self.spatial_hash.cells, {})
+
+class TestSpatialSpriteGroup(unittest.TestCase):
+    '''
+    Test SpriteGroup with a spatial hash
+    '''
+    def test_matches_linear_scan(self):
+        '''
+        Candidates must contain every colliding sprite in group order
+        '''
+        rand = random.Random(42)
+        group = SpriteGroup(SpatialHash(24, 24))
+        for _ in range(300):
+            group.add(FakeSprite(
+                rand.randrange(0, 2000), rand.randrange(0, 2000),
+                static=rand.random() < 0.9
+            ))
+
+        for _ in range(200):
+            rect = pygame.Rect(rand.randrange(-30, 2030), rand.randrange(-30, 2030), 19, 24)
+            expected = [s for s in group if s.rect.colliderect(rect)]
+            actual = [s for s in group.collision_candidates(rect) if s.rect.colliderect(rect)]
+            self.assertEqual(expected, actual)
+
+    def test_readd_keeps_group_order(self):
+        '''
+        A removed and re-added sprite goes to the end like the group does
+        '''
+        group = SpriteGroup(SpatialHash(24, 24))
+        first = FakeSprite(0, 0)
+        second = FakeSprite(0, 0)
+        group.add(first, second)
+        group.remove(first)
+        group.add(first)
+
+        rect = pygame.Rect(0, 0, 24, 24)
+        self.assertEqual(group.collision_candidates(rect), group.sprites())
+
+    def test_always_simulated(self):
+        '''
+        Static sprites that are always simulated are candidates wherever they are
+        '''
+        group = SpriteGroup(SpatialHash(24, 24))
+        far = FakeSprite(5000, 5000, always_simulate=True)
+        near = FakeSprite(0, 0)
+        group.add(far, near, FakeSprite(4000, 4000))
+
+        rect = pygame.Rect(0, 0, 24, 24)
+        self.assertEqual(group.collision_candidates(rect), [near])
+        self.assertEqual(group.simulation_candidates(rect), [far, near])
+
+        group.remove(far)
+        self.assertEqual(group.simulation_candidates(rect), [near])
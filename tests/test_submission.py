@@ -0,0 +1,203 @@
+'''
+Test the background SubmissionWorker
+'''
+
+import time
+import threading
+import unittest
+from jackit.core import SUBMISSION_ID_HEADER, submission_builtins
+from jackit.core.submission import SubmissionWorker
+
+class FakeResponse:
+    '''
+    Response with a status code
+    '''
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        '''
+        Raise like requests does for error codes
+        '''
+        if self.status_code >= 400:
+            raise IOError("HTTP {}".format(self.status_code))
+
+class FakeSession:
+    '''
+    Session that records posts
+    '''
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.posts = []
+
+    def post(self, url, **kwargs):
+        '''
+        Record the post
+        '''
+        self.posts.append((url, kwargs))
+        return FakeResponse(self.status_code)
+
+class FakeJournal:
+    '''
+    Journal that records what it's asked to do and the thread that asked
+    '''
+    sync_interval = 0.1
+
+    def __init__(self):
+        self.added = []
+        self.finished = []
+
+    @staticmethod
+    def new_id():
+        '''
+        Make up an id
+        '''
+        return "id"
+
+    def add(self, kind, args, submission_id=None):
+        '''
+        Record the submission
+        '''
+        self.added.append((submission_id, kind, args, threading.current_thread()))
+        return submission_id
+
+    def done(self, submission_id):
+        '''
+        Record the sent submission
+        '''
+        self.finished.append(submission_id)
+
+    def get_pending(self, exclude=(), limit=None): # pylint: disable=unused-argument
+        '''
+        Nothing left over from last time
+        '''
+        return []
+
+    def sync(self):
+        '''
+        Nothing to sync
+        '''
+        pass
+
+class TestSubmissionWorker(unittest.TestCase):
+    '''
+    Test the SubmissionWorker methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.worker = SubmissionWorker(timeout=1, retries=2, backoff=0)
+        self.calls = []
+        self.ids = []
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        self.worker.stop(5)
+
+    def wait_for_results(self):
+        '''
+        Poll until a submission finishes
+        '''
+        end = time.time() + 5
+        while time.time() < end:
+            results = self.worker.poll()
+            if results:
+                return results
+            time.sleep(0.01)
+        return []
+
+    def flaky(self, failures):
+        '''
+        Submission function that fails the first failures times
+        '''
+        def func(value, session=None, timeout=None, submission_id=None):
+            self.calls.append((value, session, timeout))
+            self.ids.append(submission_id)
+            if len(self.calls) <= failures:
+                raise IOError("Server unavailable")
+        return func
+
+    def test_retry(self):
+        '''
+        Failed submissions are retried with the worker's session
+        '''
+        self.worker.start()
+        self.worker.submit("Score", self.flaky(2), 42)
+
+        self.assertEqual(self.wait_for_results(), [("Score", True, None)])
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.calls[0], (42, self.worker.session, 1))
+
+    def test_give_up(self):
+        '''
+        Submissions fail after running out of retries
+        '''
+        self.worker.start()
+        self.worker.submit("Score", self.flaky(10), 42)
+
+        results = self.wait_for_results()
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0][1])
+        self.assertEqual(len(self.calls), 3)
+
+    def test_stop_skips_retries(self):
+        '''
+        Queued submissions get one try when the worker is stopped
+        '''
+        self.worker.backoff = 60
+        self.worker.start()
+        self.worker.submit("Score", self.flaky(10), 42)
+        self.assertTrue(self.worker.stop(5))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_session_requests(self):
+        '''
+        Submission code that imports requests posts through the session
+        '''
+        code = compile("import requests\nrequests.post(url, data={'a': 1})", "<string>", "exec")
+
+        session = FakeSession()
+        # pylint: disable=W0122
+        exec(code, {"__builtins__": submission_builtins(session, 3), "url": "http://test/"})
+        self.assertEqual(session.posts, [("http://test/", {"data": {"a": 1}, "timeout": 3})])
+
+        with self.assertRaises(IOError):
+            exec(code, {"__builtins__": submission_builtins(FakeSession(500), 3), "url": "http://test/"})
+
+        session = FakeSession()
+        exec(code, {"__builtins__": submission_builtins(session, 3, "abc"), "url": "http://test/"})
+        self.assertEqual(session.posts[0][1]["headers"], {SUBMISSION_ID_HEADER: "abc"})
+
+    def test_journal_on_worker(self):
+        '''
+        New submissions are journaled on the worker thread and marked done once sent
+        '''
+        journal = FakeJournal()
+        self.worker.journal = journal
+        self.worker.start()
+        self.worker.submit("Score", self.flaky(0), 42, journal_entry=("score", [42]))
+
+        self.assertEqual(self.wait_for_results(), [("Score", True, None)])
+        self.assertEqual(len(journal.added), 1)
+        submission_id, kind, args, thread = journal.added[0]
+        self.assertEqual((kind, args), ("score", [42]))
+        self.assertIsNot(thread, threading.main_thread())
+        self.assertEqual(journal.finished, [submission_id])
+        self.assertEqual(self.ids, [submission_id])
+
+    def test_journal_on_stop(self):
+        '''
+        Submissions the worker didn't get to before stopping are still journaled
+        '''
+        journal = FakeJournal()
+        self.worker.journal = journal
+        self.worker.submit("Score", self.flaky(0), 42, journal_entry=("score", [42]))
+        self.worker.thread = threading.Thread(target=time.sleep, args=(0.5,))
+        self.worker.thread.start()
+
+        self.assertFalse(self.worker.stop(0))
+        self.assertEqual([entry[1:3] for entry in journal.added], [("score", [42])])
+        self.assertEqual(journal.finished, [])
@@ -0,0 +1,95 @@
+'''
+Test the TextBuffer piece table
+'''
+
+import random
+import unittest
+from jackit.core.textbuffer import TextBuffer
+
+class TestTextBuffer(unittest.TestCase):
+    '''
+    Test TextBuffer edits against the same edits on a string
+    '''
+    def check(self, buf, text):
+        '''
+        Make sure every view of buf matches text
+        '''
+        self.assertEqual(str(buf), text)
+        self.assertEqual(len(buf), len(text))
+        self.assertEqual(''.join(buf), text)
+        self.assertEqual(list(buf.lines()), text.split("\n"))
+        self.assertEqual(
+            buf.line_starts(), [0] + [i + 1 for i, char in enumerate(text) if char == "\n"])
+
+    def test_typing(self):
+        '''
+        Typing in one spot grows a single piece
+        '''
+        buf = TextBuffer("def f():\n    return 1\n")
+        for i, char in enumerate("x = 2\n"):
+            buf.insert(9 + i, char)
+        self.check(buf, "def f():\nx = 2\n    return 1\n")
+        self.assertEqual(len(buf.pieces), 3)
+
+        buf.delete(9, 6)
+        self.check(buf, "def f():\n    return 1\n")
+
+    def test_random_edits(self):
+        '''
+        Random inserts and deletes match the string version
+        '''
+        rand = random.Random(42)
+        text = "Hello\nworld\n\nthis is the original text"
+        buf = TextBuffer(text)
+        for _ in range(2000):
+            pos = rand.randint(0, len(text))
+            if rand.random() < 0.6:
+                chars = rand.choice(["a", "\n", "    ", "bc"])
+                buf.insert(pos, chars)
+                text = text[:pos] + chars + text[pos:]
+            else:
+                length = rand.randint(1, 3)
+                buf.delete(pos, length)
+                text = text[:pos] + text[pos + length:]
+            self.assertEqual(len(buf), len(text))
+
+            start = rand.randint(0, len(text))
+            self.assertEqual(buf[start:start + 5], text[start:start + 5])
+        self.check(buf, text)
+
+    def test_line_starts(self):
+        '''
+        Line starts are updated in place by edits instead of being rebuilt
+        '''
+        rand = random.Random(7)
+        text = "a\nbb\n\nccc"
+        buf = TextBuffer(text)
+        starts = buf.line_starts()
+        for _ in range(1000):
+            pos = rand.randint(0, len(text))
+            if rand.random() < 0.6:
+                chars = rand.choice(["x", "\n", "y\nz", "\n\n", "ab"])
+                buf.insert(pos, chars)
+                text = text[:pos] + chars + text[pos:]
+            else:
+                length = rand.randint(1, 4)
+                buf.delete(pos, length)
+                text = text[:pos] + text[pos + length:]
+
+            self.assertIs(buf.line_starts(), starts)
+            self.assertEqual(starts, [0] + [i + 1 for i, char in enumerate(text) if char == "\n"])
+
+    def test_index(self):
+        '''
+        Characters and slices can be read without building the text
+        '''
+        buf = TextBuffer("abc")
+        buf.insert(1, "XY")
+        self.assertEqual(buf[0], "a")
+        self.assertEqual(buf[-1], "c")
+        self.assertEqual(buf[:3], "aXY")
+        self.assertEqual(buf[::2], "aYc")
+        with self.assertRaises(IndexError):
+            _ = buf[5]
+
+        self.check(TextBuffer(), "")
@@ -0,0 +1,76 @@
+'''
+Test the TileMap class
+'''
+
+import unittest
+import pygame
+from jackit.core.tilemap import TileMap, TileKind
+
+class FakeTile:
+    '''
+    Minimal tile with a rect
+    '''
+    def __init__(self, x_pos, y_pos, width=24, height=24, static=True, collideable=True):
+        self.rect = pygame.Rect(x_pos, y_pos, width, height)
+        self.static = static
+        self.collideable = collideable
+
+    def is_collideable(self):
+        '''
+        Getter for collideable
+        '''
+        return self.collideable
+
+class TestTileMap(unittest.TestCase):
+    '''
+    Test the TileMap methods
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.tile_map = TileMap(10, 5, 24, 24)
+
+    def test_static_tiles(self):
+        '''
+        Block aligned static tiles go in the array
+        '''
+        floor = FakeTile(24, 48)
+        plug = FakeTile(48, 48, collideable=False)
+        self.tile_map.add(floor, TileKind.SOLID)
+        self.tile_map.add(plug, TileKind.CODE)
+
+        self.assertEqual(self.tile_map.kind_at(30, 50), TileKind.SOLID)
+        self.assertEqual(self.tile_map.kind_at(50, 50), TileKind.CODE)
+        self.assertTrue(self.tile_map.is_solid_at(24, 48))
+        self.assertFalse(self.tile_map.is_solid_at(48, 48))
+        self.assertFalse(self.tile_map.is_solid_at(23, 48))
+        self.assertEqual(self.tile_map.dynamic, [])
+
+        self.assertEqual(self.tile_map.collideables_in_rect(pygame.Rect(30, 26, 19, 24)), [floor])
+        self.assertEqual(self.tile_map.collideables_in_rect(pygame.Rect(30, 24, 19, 24)), [])
+
+        self.tile_map.remove(floor)
+        self.assertEqual(self.tile_map.kind_at(30, 50), TileKind.EMPTY)
+
+    def test_dynamic_tiles(self):
+        '''
+        Moving or misaligned tiles are checked separately
+        '''
+        moving = FakeTile(24, 48, static=False)
+        offset = FakeTile(100, 10)
+        self.tile_map.add(moving, TileKind.SOLID)
+        self.tile_map.add(offset, TileKind.SOLID)
+
+        self.assertEqual(self.tile_map.dynamic, [moving, offset])
+        self.assertEqual(self.tile_map.kind_at(30, 50), TileKind.EMPTY)
+        self.assertTrue(self.tile_map.is_solid_at(30, 50))
+        self.assertEqual(self.tile_map.collideables_in_rect(moving.rect, ignore=moving), [])
+
+    def test_out_of_bounds(self):
+        '''
+        Rects outside the map don't wrap around to the other side
+        '''
+        self.tile_map.add(FakeTile(0, 0), TileKind.SOLID)
+        self.assertEqual(self.tile_map.collideables_in_rect(pygame.Rect(-30, -30, 19, 24)), [])
+        self.assertEqual(self.tile_map.kind_at(-1, -1), TileKind.EMPTY)
@@ -0,0 +1,112 @@
+'''
+Test the time budget for patched callbacks
+'''
+
+import time
+import unittest
+from jackit.core.patch import UserPatch, PatchError
+from jackit.core.watchdog import PatchWatchdog
+
+def spin():
+    '''
+    Never returns unless interrupted
+    '''
+    while True:
+        pass
+
+def stubborn():
+    '''
+    Ignores the first interrupt
+    '''
+    try:
+        spin()
+    except BaseException: # pylint: disable=broad-except
+        pass
+    spin()
+
+class TestPatchWatchdog(unittest.TestCase):
+    '''
+    Test PatchWatchdog and how UserPatch uses it
+    '''
+    def setUp(self):
+        '''
+        Called before each test method is run
+        '''
+        self.watchdog = PatchWatchdog(call_budget=20, frame_budget=50)
+
+    def tearDown(self):
+        '''
+        Called after each test method is run
+        '''
+        UserPatch.unpatch()
+        UserPatch.pop_removed()
+        UserPatch.watchdog.begin_frame()
+
+    def test_within_budget(self):
+        '''
+        Fast callbacks return their value
+        '''
+        self.assertEqual(self.watchdog.call("get_top_speed", lambda x: x + 1, 1), (2, None))
+        self.assertEqual(self.watchdog.violations, 0)
+
+    def test_frame_budget(self):
+        '''
+        Calls that go over what's left of the frame's budget are violations.
+        Calls after the budget is used up are skipped without a violation
+        '''
+        self.watchdog.call_budget = 0
+        self.watchdog.frame_budget = 5
+        self.assertIsNotNone(self.watchdog.call("get_top_speed", time.sleep, 0.01)[1])
+        self.assertEqual(self.watchdog.call("get_jump_speed", lambda: 1), (None, None))
+        self.assertEqual(self.watchdog.skipped, 1)
+
+        self.watchdog.begin_frame()
+        self.assertEqual(self.watchdog.call("get_jump_speed", lambda: 1), (1, None))
+        self.assertEqual(self.watchdog.method_violations, {"get_top_speed": 1})
+
+    @unittest.skipUnless(PatchWatchdog().has_timers, "No interval timers")
+    def test_interrupt(self):
+        '''
+        Callbacks that never return are interrupted, even if they catch it
+        '''
+        for func in (spin, stubborn):
+            ret, violation = self.watchdog.call("get_top_speed", func)
+            self.assertIsNone(ret)
+            self.assertIn("get_top_speed", violation)
+        self.assertEqual(self.watchdog.violations, 2)
+
+    @unittest.skipUnless(PatchWatchdog().has_timers, "No interval timers")
+    def test_unpatch(self):
+        '''
+        Patches that can't be tested in time are rejected and ones that
+        slow down later are removed
+        '''
+        with self.assertRaises(PatchError):
+            UserPatch.patch_method("get_top_speed", spin, [int])
+
+        slow = [False]
+        def get_top_speed():
+            if slow[0]:
+                spin()
+            return 10
+
+        UserPatch.patch_method("get_top_speed", get_top_speed, [int])
+        self.assertEqual(UserPatch.get_top_speed(), 10)
+
+        slow[0] = True
+        self.assertIsNone(UserPatch.get_top_speed())
+        self.assertNotIn("get_top_speed", UserPatch.patch_map)
+        self.assertEqual(len(UserPatch.pop_removed()), 1)
+
+    def test_skipped_patch_kept(self):
+        '''
+        Patches skipped because the frame ran out of time aren't removed
+        '''
+        UserPatch.patch_method("get_top_speed", lambda: 10, [int])
+        UserPatch.watchdog.frame_used = UserPatch.watchdog.frame_budget
+        self.assertIsNone(UserPatch.get_top_speed())
+        self.assertIn("get_top_speed", UserPatch.patch_map)
+        self.assertEqual(UserPatch.pop_removed(), [])
+
+        UserPatch.watchdog.begin_frame()
+        self.assertEqual(UserPatch.get_top_speed(), 10)